@@ -8,25 +8,116 @@ import docker
 import requests
 import shutil
 import base64
+import fcntl
+import multiprocessing
+import gzip
+import json
+import mmap
+import random
+import threading
+import time
+import calendar
+import collections
+import re
+import uuid
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify,
+                   Response, stream_with_context, g, has_request_context)
 from pathlib import Path
 from werkzeug.utils import secure_filename
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
+from node_core import (APPNAME, VANTAGE6_CONFIG_DIR, VANTAGE6_DATA_DIR,
+                       DOCKER_HOSTS, DEFAULT_DOCKER_HOST, DOCKER_HOST_TIMEOUT, DOCKER_CALL_TIMEOUT,
+                       YAML_LOADER, HostListing, state_version, state_etag, config_registry,
+                       get_node_configs, get_node_config, write_file_atomic, get_container_name,
+                       get_node_host, node_statuses, resolve_node_statuses, NODE_NAME_PATTERN)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
-# Configuration - use environment variables for container flexibility
-VANTAGE6_CONFIG_DIR = Path(os.environ.get('VANTAGE6_CONFIG_DIR', '/root/.config/vantage6/node'))
-VANTAGE6_SYSTEM_CONFIG_DIR = Path(os.environ.get('VANTAGE6_SYSTEM_CONFIG_DIR', '/etc/vantage6/node'))
-VANTAGE6_DATA_DIR = Path(os.environ.get('VANTAGE6_DATA_DIR', '/data'))
-APPNAME = 'vantage6'
+# Docker client pooling - one client (and connection pool) shared by all requests
+DOCKER_POOL_SIZE = int(os.environ.get('DOCKER_POOL_SIZE', '10'))
+DOCKER_HEALTH_CHECK_INTERVAL = float(os.environ.get('DOCKER_HEALTH_CHECK_INTERVAL', '30'))
 
-# Ensure config directory exists
-VANTAGE6_CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+# Server version lookups - cached per (server_url, api_path), failures for a shorter time
+SERVER_VERSION_TIMEOUT = float(os.environ.get('SERVER_VERSION_TIMEOUT', '5'))
+SERVER_VERSION_CACHE_TTL = float(os.environ.get('SERVER_VERSION_CACHE_TTL', '300'))
+SERVER_VERSION_NEGATIVE_TTL = float(os.environ.get('SERVER_VERSION_NEGATIVE_TTL', '30'))
+
+# Container log streaming
+LOG_TAIL_LINES = int(os.environ.get('LOG_TAIL_LINES', '100'))
+LOG_STREAM_MAX_SECONDS = float(os.environ.get('LOG_STREAM_MAX_SECONDS', '300'))
+LOG_HISTORY_MAX_LINES = int(os.environ.get('LOG_HISTORY_MAX_LINES', '1000'))
+
+# In-memory log buffers, fed by one background follower per running node
+LOG_BUFFER_NODE_BYTES = int(os.environ.get('LOG_BUFFER_NODE_BYTES', str(2 * 1024 * 1024)))
+LOG_BUFFER_TOTAL_BYTES = int(os.environ.get('LOG_BUFFER_TOTAL_BYTES', str(64 * 1024 * 1024)))
+LOG_BUFFER_INITIAL_LINES = int(os.environ.get('LOG_BUFFER_INITIAL_LINES', '1000'))
+LOG_FOLLOWER_SYNC_INTERVAL = float(os.environ.get('LOG_FOLLOWER_SYNC_INTERVAL', '15'))
+DEFAULT_LOG_FORMAT = '%(asctime)s - %(name)-14s - %(levelname)-8s - %(message)s'
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+LOG_LEVEL_NAMES = {10: 'DEBUG', 20: 'INFO', 30: 'WARNING', 40: 'ERROR', 50: 'CRITICAL'}
+
+# Background jobs for start/stop/restart
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_HISTORY = int(os.environ.get('JOB_HISTORY', '200'))
+DEFAULT_NODE_IMAGE = 'harbor2.vantage6.ai/infrastructure/node:latest'
+BULK_ACTION_TIMEOUT = float(os.environ.get('BULK_ACTION_TIMEOUT', '600'))
+
+# Multi-worker serving: job state shared on disk and one elected background worker,
+# which shares its results on disk. All are unset for a single process, see gunicorn.conf.py.
+JOB_STATE_DIR = os.environ.get('JOB_STATE_DIR')
+BACKGROUND_LOCK_FILE = os.environ.get('BACKGROUND_LOCK_FILE')
+SHARED_STATE_DIR = os.environ.get('SHARED_STATE_DIR')
+
+# Background pre-pull of node images and index of images present locally
+IMAGE_PREFETCH_ENABLED = os.environ.get('IMAGE_PREFETCH_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+IMAGE_PREFETCH_INTERVAL = float(os.environ.get('IMAGE_PREFETCH_INTERVAL', '600'))
+IMAGE_PREFETCH_WORKERS = int(os.environ.get('IMAGE_PREFETCH_WORKERS', '2'))
+IMAGE_INDEX_TTL = float(os.environ.get('IMAGE_INDEX_TTL', '60'))
+
+# Background resource usage sampling of node and algorithm containers
+STATS_SAMPLE_INTERVAL = float(os.environ.get('STATS_SAMPLE_INTERVAL', '10'))
+STATS_HISTORY_POINTS = int(os.environ.get('STATS_HISTORY_POINTS', '360'))
+STATS_SYNC_INTERVAL = float(os.environ.get('STATS_SYNC_INTERVAL', '15'))
+
+# Disk usage of node volumes and log directories, measured in the background
+DISK_USAGE_INTERVAL = float(os.environ.get('DISK_USAGE_INTERVAL', '300'))
+DISK_USAGE_FULL_RESCAN_INTERVAL = float(os.environ.get('DISK_USAGE_FULL_RESCAN_INTERVAL', '3600'))
+NODE_VOLUME_SUFFIXES = ('vol', 'vpn-vol', 'ssh-vol', 'squid-vol')
+
+# Background server connectivity probes
+SERVER_PROBE_ENABLED = os.environ.get('SERVER_PROBE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+SERVER_PROBE_INTERVAL = float(os.environ.get('SERVER_PROBE_INTERVAL', '60'))
+SERVER_PROBE_JITTER = float(os.environ.get('SERVER_PROBE_JITTER', '0.1'))
+SERVER_PROBE_WORKERS = int(os.environ.get('SERVER_PROBE_WORKERS', '8'))
+SERVER_PROBE_HISTORY = int(os.environ.get('SERVER_PROBE_HISTORY', '60'))
+SERVER_PROBE_SYNC_INTERVAL = float(os.environ.get('SERVER_PROBE_SYNC_INTERVAL', '15'))
+
+# Conditional GET and long-polling on the node APIs
+LONG_POLL_MAX_SECONDS = float(os.environ.get('LONG_POLL_MAX_SECONDS', '60'))
+LONG_POLL_RECHECK_INTERVAL = float(os.environ.get('LONG_POLL_RECHECK_INTERVAL', '2'))
+
+# Log streams, long-polls and waiting bulk actions hold a server thread for
+# minutes; at most this many at once per process, by default half the threads
+LONG_REQUEST_SLOTS = int(os.environ.get('LONG_REQUEST_SLOTS',
+                                        str(max(1, int(os.environ.get('WEB_THREADS', '16')) // 2))))
+
+# Response compression for JSON and log responses
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '5'))
+GZIP_MIMETYPES = ('application/json', 'text/plain', 'text/html')
+
+# Pre-generated RSA key pairs for node encryption, generated in worker processes
+RSA_KEY_SIZE = int(os.environ.get('RSA_KEY_SIZE', '4096'))
+RSA_KEY_POOL_SIZE = int(os.environ.get('RSA_KEY_POOL_SIZE', '4'))
+RSA_KEY_POOL_WORKERS = int(os.environ.get('RSA_KEY_POOL_WORKERS', '2'))
 
 
 def container_path_to_host_path(container_path):
@@ -73,18 +164,305 @@ def container_path_to_host_path(container_path):
         return None
 
 
-def get_docker_client():
-    """Get Docker client instance"""
+class Counter:
+    """Monotonic counter with labels, in Prometheus text format"""
+    
+    type = 'counter'
+    
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+    
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+    
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in values.items():
+            yield self.name, dict(zip(self.labels, label_values)), value
+
+
+class Histogram:
+    """Histogram with fixed buckets and labels, in Prometheus text format"""
+    
+    type = 'histogram'
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+    
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the duration of a block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+    
+    def samples(self):
+        with self._lock:
+            values = {key: (list(series[0]), series[1], series[2]) for key, series in self._values.items()}
+        for label_values, (counts, total, count) in values.items():
+            labels = dict(zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', dict(labels, le=repr(float(bound))), cumulative
+            yield f'{self.name}_bucket', dict(labels, le='+Inf'), count
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered by the /metrics endpoint"""
+    
+    def __init__(self):
+        self._metrics = []
+    
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name, help_text, labels=(), **kwargs):
+        metric = Histogram(name, help_text, labels, **kwargs)
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for sample_name, labels, value in metric.samples():
+                if labels:
+                    label_text = ','.join(f'{key}="{escape_label_value(val)}"'
+                                          for key, val in labels.items())
+                    lines.append(f'{sample_name}{{{label_text}}} {value}')
+                else:
+                    lines.append(f'{sample_name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label_value(value):
+    """Escape a label value for the Prometheus text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'node_manager_http_request_duration_seconds',
+    'Time spent handling HTTP requests, per route', ('endpoint', 'method', 'status'))
+DOCKER_CALLS = metrics.counter(
+    'node_manager_docker_calls_total',
+    'Docker API calls, per operation and outcome', ('operation', 'outcome'))
+DOCKER_CALL_SECONDS = metrics.histogram(
+    'node_manager_docker_call_duration_seconds',
+    'Latency of Docker API calls until response headers, per operation', ('operation',))
+SERVER_VERSION_SECONDS = metrics.histogram(
+    'node_manager_server_version_lookup_duration_seconds',
+    'Latency of server version lookups', ('cache',))
+SERVER_VERSION_ERRORS = metrics.counter(
+    'node_manager_server_version_errors_total',
+    'Server version lookups that returned an error')
+SERVER_PROBE_SECONDS = metrics.histogram(
+    'node_manager_server_probe_duration_seconds',
+    'Round-trip time of background server connectivity probes', ('result',))
+RSA_KEY_SECONDS = metrics.histogram(
+    'node_manager_rsa_key_generation_duration_seconds',
+    'Time spent generating RSA key pairs')
+RSA_KEY_POOL_MISSES = metrics.counter(
+    'node_manager_rsa_key_pool_misses_total',
+    'RSA key pairs requested while the key pool was empty')
+LONG_REQUESTS_DECLINED = metrics.counter(
+    'node_manager_long_requests_declined_total',
+    'Log streams, long-polls and bulk waits answered right away because all slots were in use',
+    ('kind',))
+
+# Docker Engine API endpoints, mapped to the SDK operation that issues them.
+# containers.run shows up as containers.create followed by containers.start.
+DOCKER_OPERATIONS = [(method, re.compile(pattern), operation) for method, pattern, operation in (
+    ('GET', r'^/containers/json$', 'containers.list'),
+    ('GET', r'^/containers/[^/]+/json$', 'containers.get'),
+    ('GET', r'^/containers/[^/]+/logs$', 'logs'),
+    ('GET', r'^/containers/[^/]+/stats$', 'stats'),
+    ('POST', r'^/containers/create$', 'containers.create'),
+    ('POST', r'^/containers/[^/]+/start$', 'containers.start'),
+    ('POST', r'^/containers/[^/]+/stop$', 'containers.stop'),
+    ('POST', r'^/containers/[^/]+/restart$', 'containers.restart'),
+    ('DELETE', r'^/containers/[^/]+$', 'containers.remove'),
+    ('GET', r'^/volumes/[^/]+$', 'volumes.get'),
+    ('POST', r'^/volumes/create$', 'volumes.create'),
+    ('GET', r'^/images/json$', 'images.list'),
+    ('GET', r'^/images/.+/json$', 'images.get'),
+    ('POST', r'^/images/create$', 'images.pull'),
+    ('GET', r'^/events$', 'events'),
+    ('GET', r'^/_ping$', 'ping'),
+    ('GET', r'^/version$', 'version'),
+)]
+DOCKER_API_VERSION_PREFIX = re.compile(r'^/v[0-9.]+')
+
+
+def docker_operation_name(method, url):
+    """Map a Docker Engine API request to the SDK operation name used in metrics"""
+    path = DOCKER_API_VERSION_PREFIX.sub('', requests.utils.urlparse(url).path)
+    for operation_method, pattern, operation in DOCKER_OPERATIONS:
+        if method == operation_method and pattern.match(path):
+            return operation
+    return 'other'
+
+
+def instrument_docker_client(client):
+    """
+    Count and time every HTTP request a Docker client sends to the daemon.
+    
+    Hooks the low-level API client's send(), so every SDK call is measured
+    without touching the call sites.
+    """
+    send = client.api.send
+    
+    def instrumented_send(prepared_request, **kwargs):
+        operation = docker_operation_name(prepared_request.method, prepared_request.url)
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = send(prepared_request, **kwargs)
+            outcome = 'ok' if response.status_code < 400 else str(response.status_code)
+            return response
+        finally:
+            DOCKER_CALL_SECONDS.observe(time.perf_counter() - started, operation)
+            DOCKER_CALLS.inc(operation, outcome)
+    
+    client.api.send = instrumented_send
+    return client
+
+
+_docker_clients = {}
+_docker_clients_lock = threading.Lock()
+_docker_host_locks = {host: threading.Lock() for host in DOCKER_HOSTS}
+
+
+def get_shared_docker_client(host=None):
+    """
+    Get the process-wide Docker client of a host, connecting on first use.
+    
+    The client keeps its own connection pool and is shared between threads.
+    Its health is checked lazily (at most once per DOCKER_HEALTH_CHECK_INTERVAL
+    seconds); if the daemon stopped answering, e.g. after a restart, a fresh
+    client is created transparently.
+    
+    Args:
+        host: Name of the Docker host in DOCKER_HOSTS; the default host if None
+    
+    Returns:
+        docker.DockerClient
+    
+    Raises:
+        docker.errors.DockerException: if the Docker daemon is not reachable
+                                       or the host is not configured
+    """
+    host = host or DEFAULT_DOCKER_HOST
+    if host not in DOCKER_HOSTS:
+        raise docker.errors.DockerException(f'Unknown Docker host "{host}"')
+    
+    # One lock per host, so a slow host does not hold up the others
+    with _docker_host_locks[host]:
+        now = time.monotonic()
+        client, checked_at = _docker_clients.get(host, (None, 0.0))
+        if client is not None:
+            if now - checked_at < DOCKER_HEALTH_CHECK_INTERVAL:
+                return client
+            try:
+                client.ping()
+                with _docker_clients_lock:
+                    _docker_clients[host] = (client, now)
+                return client
+            except Exception as e:
+                print(f"Docker client health check failed for {host}, reconnecting: {e}")
+                try:
+                    client.close()
+                except Exception:
+                    pass
+                with _docker_clients_lock:
+                    _docker_clients.pop(host, None)
+        
+        # Creating the client negotiates the API version, so this fails fast
+        # when the daemon is down and we never cache a broken client
+        if DOCKER_HOSTS[host]:
+            client = docker.DockerClient(base_url=DOCKER_HOSTS[host], max_pool_size=DOCKER_POOL_SIZE,
+                                         timeout=DOCKER_CALL_TIMEOUT)
+        else:
+            client = docker.from_env(max_pool_size=DOCKER_POOL_SIZE, timeout=DOCKER_CALL_TIMEOUT)
+        client = instrument_docker_client(client)
+        with _docker_clients_lock:
+            _docker_clients[host] = (client, now)
+        return client
+
+
+def reset_docker_client(host=None):
+    """Force the next get_shared_docker_client() call to re-check the daemon"""
+    host = host or DEFAULT_DOCKER_HOST
+    with _docker_clients_lock:
+        if host in _docker_clients:
+            _docker_clients[host] = (_docker_clients[host][0], 0.0)
+
+
+def get_docker_client(host=None):
+    """Get the shared Docker client instance of a host"""
     try:
-        return docker.from_env()
+        return get_shared_docker_client(host)
     except Exception as e:
         flash(f'Docker is not running or not accessible: {str(e)}', 'error')
         return None
 
 
-def get_server_version(server_url, api_path='/api'):
+_http_session = None
+_http_session_lock = threading.Lock()
+
+_server_version_cache = {}
+_server_version_cache_lock = threading.Lock()
+_server_version_fetch_locks = {}
+
+
+def get_http_session():
+    """Get the shared keep-alive HTTP session used for upstream lookups"""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+        return _http_session
+
+
+def fetch_server_version(server_url, api_path='/api'):
     """
-    Get the Vantage6 server version from the server's version endpoint.
+    Fetch the Vantage6 server version from the server's version endpoint.
+    
+    Always makes an HTTP request; use get_server_version() for cached lookups.
     
     Args:
         server_url: Base URL of the Vantage6 server
@@ -105,7 +483,7 @@ def get_server_version(server_url, api_path='/api'):
         version_url = f"{server_url}{api_path}/version"
         
         # Make request to version endpoint with timeout
-        response = requests.get(version_url, timeout=5)
+        response = get_http_session().get(version_url, timeout=SERVER_VERSION_TIMEOUT)
         response.raise_for_status()
         
         # Parse version from response
@@ -132,38 +510,254 @@ def get_server_version(server_url, api_path='/api'):
         return None, f"Error retrieving server version: {str(e)}"
 
 
-def generate_rsa_key_pair():
+def get_server_version(server_url, api_path='/api', refresh=False):
     """
-    Generate a new RSA key pair for encryption.
+    Get the Vantage6 server version, served from cache when possible.
+    
+    Successful lookups are cached for SERVER_VERSION_CACHE_TTL seconds and
+    failures for SERVER_VERSION_NEGATIVE_TTL seconds, per (server_url, api_path).
+    Concurrent lookups of the same server wait for a single request.
+    
+    Args:
+        server_url: Base URL of the Vantage6 server
+        api_path: API path (default: '/api')
+        refresh: Ignore a cached answer and ask the server again
     
     Returns:
-        tuple: (private_key_pem, public_key_pem) as strings
+        tuple: (version_string, error_message)
+               Returns (None, error_msg) if version cannot be retrieved
     """
-    try:
-        # Generate private key (4096 bits for strong security)
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=4096,
-            backend=default_backend()
-        )
+    key = server_version_key(server_url, api_path)
+    requested_at = time.monotonic()
+    
+    with _server_version_cache_lock:
+        cached = _server_version_cache.get(key)
+        if cached and cached['expires_at'] > requested_at and not refresh:
+            SERVER_VERSION_SECONDS.observe(time.monotonic() - requested_at, 'hit')
+            return cached['version'], cached['error']
+        fetch_lock = _server_version_fetch_locks.setdefault(key, threading.Lock())
+    
+    with fetch_lock:
+        # Another thread may have fetched the version while we were waiting
+        with _server_version_cache_lock:
+            cached = _server_version_cache.get(key)
+            if cached and cached['fetched_at'] >= requested_at:
+                SERVER_VERSION_SECONDS.observe(time.monotonic() - requested_at, 'shared')
+                return cached['version'], cached['error']
+        
+        version, error = fetch_server_version(server_url, api_path)
+        fetched_at = time.monotonic()
+        SERVER_VERSION_SECONDS.observe(fetched_at - requested_at, 'miss')
+        if error:
+            SERVER_VERSION_ERRORS.inc()
+        cache_server_version(key, version, error, fetched_at)
+        return version, error
+
+
+def server_version_key(server_url, api_path='/api'):
+    """Normalized (server_url, api_path) key of a server"""
+    return server_url.rstrip('/'), '/' + (api_path or '').strip('/')
+
+
+def cache_server_version(key, version, error, fetched_at=None):
+    """
+    Store the outcome of a version request in the version cache.
+    
+    Args:
+        key: Key from server_version_key()
+        version: Version string, or None if the lookup failed
+        error: Error message, or None
+        fetched_at: time.monotonic() of the request, defaults to now
+    """
+    fetched_at = time.monotonic() if fetched_at is None else fetched_at
+    ttl = SERVER_VERSION_CACHE_TTL if version else SERVER_VERSION_NEGATIVE_TTL
+    with _server_version_cache_lock:
+        _server_version_cache[key] = {
+            'fetched_at': fetched_at,
+            'expires_at': fetched_at + ttl,
+            'version': version,
+            'error': error
+        }
+
+
+def create_rsa_key_pair(key_size=RSA_KEY_SIZE):
+    """
+    Generate an RSA key pair and serialize it to PEM.
+    
+    Runs in the worker processes of the key pool, so it must stay a
+    module-level function.
+    
+    Args:
+        key_size: Key size in bits
+    
+    Returns:
+        tuple: (private_key_pem, public_key_pem, seconds spent generating)
+    """
+    started = time.perf_counter()
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=key_size,
+        backend=default_backend()
+    )
+    seconds = time.perf_counter() - started
+    
+    # Serialize private key to PEM format
+    private_key_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption()
+    ).decode('utf-8')
+    
+    # Generate public key from private key
+    public_key = private_key.public_key()
+    
+    # Serialize public key to PEM format
+    public_key_pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode('utf-8')
+    
+    return private_key_pem, public_key_pem, seconds
+
+
+class RSAKeyPool:
+    """
+    Pool of pre-generated RSA key pairs.
+    
+    Keys are generated in a separate process pool, so generation does not
+    hold the GIL of the web process, and the pool is refilled whenever a key
+    is taken. Every key is handed out exactly once and only ever kept in
+    memory. When the pool runs dry, the requested key is generated in a
+    worker process on demand.
+    """
+    
+    def __init__(self, size, key_size, workers):
+        """
+        Args:
+            size: Number of key pairs to keep ready
+            key_size: Key size in bits
+            workers: Number of worker processes generating keys
+        """
+        self.size = size
+        self.key_size = key_size
+        self.workers = workers
+        self._keys = collections.deque()
+        self._pending = 0
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self):
+        # Spawned rather than forked: forking a threaded web process is unsafe
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(self.workers, 1),
+                    mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+    
+    def start(self):
+        """Start filling the pool"""
+        self.refill()
+    
+    def refill(self):
+        """Generate keys until the ready and pending keys fill the pool"""
+        with self._lock:
+            missing = self.size - len(self._keys) - self._pending
+            if missing <= 0:
+                return
+            self._pending += missing
+        executor = self._get_executor()
+        for _ in range(missing):
+            executor.submit(create_rsa_key_pair, self.key_size).add_done_callback(self._add)
+    
+    def _add(self, future):
+        with self._lock:
+            self._pending -= 1
+        try:
+            private_key_pem, public_key_pem, seconds = future.result()
+        except Exception as e:
+            # Not refilled here, so a failing pool does not spin; the next take() retries
+            print(f"Error generating RSA key pair: {e}")
+            if isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+            return
+        RSA_KEY_SECONDS.observe(seconds)
+        with self._lock:
+            self._keys.append((private_key_pem, public_key_pem))
+    
+    def ready(self):
+        """Number of key pairs ready to be taken"""
+        return len(self._keys)
+    
+    def take(self):
+        """
+        Take a key pair out of the pool.
+        
+        Returns:
+            tuple: (private_key_pem, public_key_pem) as strings
+        """
+        return self.take_many(1)[0].result()
+    
+    def take_many(self, count):
+        """
+        Take count key pairs, generating the ones the pool lacks in parallel.
         
-        # Serialize private key to PEM format
-        private_key_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption()
-        ).decode('utf-8')
+        Args:
+            count: Number of key pairs
         
-        # Generate public key from private key
-        public_key = private_key.public_key()
+        Returns:
+            list: Futures of (private_key_pem, public_key_pem) tuples; keys
+            from the pool are already done, a failed generation only fails
+            its own future
+        """
+        futures = []
+        with self._lock:
+            while self._keys and len(futures) < count:
+                future = Future()
+                future.set_result(self._keys.popleft())
+                futures.append(future)
         
-        # Serialize public key to PEM format
-        public_key_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        ).decode('utf-8')
+        missing = count - len(futures)
+        if missing:
+            RSA_KEY_POOL_MISSES.inc(amount=missing)
+            executor = self._get_executor()
+            for _ in range(missing):
+                future = Future()
+                executor.submit(create_rsa_key_pair, self.key_size).add_done_callback(
+                    lambda generated, future=future: self._resolve(generated, future))
+                futures.append(future)
         
-        return private_key_pem, public_key_pem
+        self.refill()
+        return futures
+    
+    def _resolve(self, generated, future):
+        try:
+            private_key_pem, public_key_pem, seconds = generated.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+            future.set_exception(e)
+            return
+        RSA_KEY_SECONDS.observe(seconds)
+        future.set_result((private_key_pem, public_key_pem))
+
+
+rsa_key_pool = RSAKeyPool(RSA_KEY_POOL_SIZE, RSA_KEY_SIZE, RSA_KEY_POOL_WORKERS)
+
+
+def generate_rsa_key_pair():
+    """
+    Generate a new RSA key pair for encryption.
+    
+    Taken from the pre-generated key pool, so this normally returns at once.
+    
+    Returns:
+        tuple: (private_key_pem, public_key_pem) as strings
+    """
+    try:
+        return rsa_key_pool.take()
     except Exception as e:
         print(f"Error generating RSA key pair: {e}")
         return None, None
@@ -194,115 +788,2450 @@ def get_node_image_for_version(version):
         return f"harbor2.vantage6.ai/infrastructure/node:{version}"
 
 
-def get_node_configs():
-    """Get all available node configurations"""
-    configs = []
+# Concurrent per-host Docker calls; more workers than hosts, so a hung host does not starve the rest
+docker_fanout = ThreadPoolExecutor(max_workers=max(4, 2 * len(DOCKER_HOSTS)),
+                                   thread_name_prefix='docker-fanout')
+
+
+def list_node_containers(hosts=None):
+    """
+    List all vantage6 node containers, running or not, on all Docker hosts.
     
-    # User configurations
-    if VANTAGE6_CONFIG_DIR.exists():
-        for config_file in VANTAGE6_CONFIG_DIR.glob('*.yaml'):
-            try:
-                with open(config_file, 'r') as f:
-                    config_data = yaml.safe_load(f)
-                configs.append({
-                    'name': config_file.stem,
-                    'path': str(config_file),
-                    'type': 'user',
-                    'data': config_data
-                })
-            except Exception as e:
-                print(f"Error loading {config_file}: {e}")
+    Hosts whose events watcher is in sync are answered from memory. The
+    others are listed concurrently, with one Docker API call per host and a
+    label filter so the daemon does the filtering and no per-container
+    inspect calls are made. Hosts that do not answer within
+    DOCKER_HOST_TIMEOUT are left out, so a slow host does not hold up the
+    others.
+    
+    Args:
+        hosts: Names of the Docker hosts to list; all hosts if None
+    
+    Returns:
+        HostListing: Container summaries as returned by the Docker list
+                     endpoint, plus the name of their 'Host', or None if no
+                     host could be listed
+    """
+    hosts = list(hosts or DOCKER_HOSTS)
+    containers = HostListing()
+    pending = {}
+    for host in hosts:
+        # The events watcher keeps the same listing up to date in memory
+        watcher = node_state_watchers[host]
+        watcher.start()
+        snapshot = watcher.snapshot()
+        if snapshot is not None:
+            containers.extend(snapshot)
+        else:
+            pending[docker_fanout.submit(query_node_containers, host)] = host
     
-    # System configurations
-    if VANTAGE6_SYSTEM_CONFIG_DIR.exists():
-        for config_file in VANTAGE6_SYSTEM_CONFIG_DIR.glob('*.yaml'):
+    if pending:
+        done, not_done = wait(pending, timeout=DOCKER_HOST_TIMEOUT)
+        for future in not_done:
+            print(f"Listing node containers on {pending[future]} timed out")
+            containers.unavailable.add(pending[future])
+        for future in done:
+            host = pending[future]
             try:
-                with open(config_file, 'r') as f:
-                    config_data = yaml.safe_load(f)
-                configs.append({
-                    'name': config_file.stem,
-                    'path': str(config_file),
-                    'type': 'system',
-                    'data': config_data
-                })
+                listing = future.result()
             except Exception as e:
-                print(f"Error loading {config_file}: {e}")
+                print(f"Error listing node containers on {host}: {e}")
+                reset_docker_client(host)
+                containers.unavailable.add(host)
+                continue
+            # Without the watcher, changes are only noticed when listing
+            state_version.observe(('containers', host), container_states(listing))
+            containers.extend(listing)
+    
+    if len(containers.unavailable) == len(hosts):
+        if has_request_context():
+            flash('Docker is not running or not accessible', 'error')
+        return None
+    return containers
+
+
+def query_node_containers(host=None):
+    """List all node containers of a host straight from its Docker daemon"""
+    host = host or DEFAULT_DOCKER_HOST
+    containers = get_shared_docker_client(host).api.containers(
+        all=True, filters={'label': f'{APPNAME}-type=node'})
+    for summary in containers:
+        summary['Host'] = host
+    return containers
+
+
+def container_states(containers):
+    """Fingerprint of a container listing: the name and state of every container"""
+    return frozenset((summary['Id'], tuple(summary.get('Names') or ()), summary.get('State'))
+                     for summary in containers)
+
+
+def get_node_statuses(containers=None):
+    """
+    Get a (host, container name) -> state map for all node containers.
+    
+    Args:
+        containers: Container summaries from list_node_containers(); listed
+                    if not given
+    
+    Returns:
+        HostStatuses: (Docker host, container name) to state (e.g. 'running',
+                      'exited'), or None if Docker is not available
+    """
+    if containers is None:
+        containers = list_node_containers()
+    if containers is None:
+        return None
     
-    return configs
+    return node_statuses(containers)
 
 
-def get_running_nodes():
-    """Get all running vantage6 node containers"""
-    client = get_docker_client()
-    if not client:
+def get_running_nodes(containers=None):
+    """
+    Get all running vantage6 node containers
+    
+    Args:
+        containers: Container summaries from list_node_containers(); listed
+                    if not given
+    """
+    if containers is None:
+        containers = list_node_containers()
+    if not containers:
         return []
     
     running_nodes = []
-    try:
-        containers = client.containers.list()
-        for container in containers:
-            if APPNAME in container.name:
-                running_nodes.append({
-                    'name': container.name,
-                    'id': container.id[:12],
-                    'status': container.status,
-                    'image': container.image.tags[0] if container.image.tags else 'unknown',
-                    'created': container.attrs['Created']
-                })
-    except Exception as e:
-        print(f"Error getting running nodes: {e}")
+    for summary in containers:
+        if summary.get('State') != 'running':
+            continue
+        names = summary.get('Names') or ['']
+        created = summary.get('Created')
+        running_nodes.append({
+            'name': names[0].lstrip('/'),
+            'id': summary['Id'][:12],
+            'host': summary.get('Host', DEFAULT_DOCKER_HOST),
+            'status': summary['State'],
+            'image': get_image_name(summary.get('Image'), summary.get('ImageID')),
+            'created': datetime.fromtimestamp(created).isoformat() if created else None
+        })
     
     return running_nodes
 
 
-def get_node_status(node_name, system_folders=False):
-    """Check if a specific node is running"""
-    postfix = "system" if system_folders else "user"
-    container_name = f"{APPNAME}-{node_name}-{postfix}"
+def get_image_name(reference, image_id=None):
+    """
+    Get a readable image name for a container without inspecting its image.
+    
+    Containers carry the reference they were created from (in the list
+    endpoint's 'Image' and the inspect 'Config.Image'); only when that is a
+    bare image ID are the tags looked up, in the image index.
+    
+    Args:
+        reference: Image reference of the container
+        image_id: Image ID of the container, if known
+    
+    Returns:
+        str: Image name, e.g. 'harbor2.vantage6.ai/infrastructure/node:4.7.1'
+    """
+    if reference and not reference.startswith('sha256:'):
+        return reference
+    image_id = image_id or reference
+    tags = image_index.tags(image_id) if image_id else []
+    return tags[0] if tags else 'unknown'
+
+
+class DockerLookups:
+    """
+    Docker object lookups memoized for the lifetime of one request or job.
+    
+    Containers, volumes and images are fetched at most once per Docker host
+    and name, so a route that needs an object for both its status and its
+    details makes a single daemon round-trip. Objects that do not exist are
+    remembered as None; errors are not cached. Routes get theirs from
+    docker_lookups(); node start jobs create their own.
+    """
+    
+    def __init__(self):
+        self._objects = {}
+    
+    def _get(self, collection, name, host):
+        host = host or DEFAULT_DOCKER_HOST
+        key = (collection, host, name)
+        if key not in self._objects:
+            # Jobs run outside requests, where there is nothing to flash an error to
+            client = get_docker_client(host) if has_request_context() else get_shared_docker_client(host)
+            if not client:
+                raise docker.errors.DockerException(f'Docker host {host} not available')
+            try:
+                self._objects[key] = getattr(client, collection).get(name)
+            except docker.errors.NotFound:
+                self._objects[key] = None
+        return self._objects[key]
+    
+    def container(self, name, host=None):
+        """Get a container by name or ID, or None if it does not exist"""
+        return self._get('containers', name, host)
+    
+    def volume(self, name, host=None):
+        """Get a volume by name, or None if it does not exist"""
+        return self._get('volumes', name, host)
+    
+    def image(self, name, host=None):
+        """Get an image by reference or ID, or None if it does not exist"""
+        return self._get('images', name, host)
+
+
+def docker_lookups():
+    """Get the memoized Docker lookups of the current request (uncached outside requests)"""
+    if not has_request_context():
+        return DockerLookups()
+    if 'docker_lookups' not in g:
+        g.docker_lookups = DockerLookups()
+    return g.docker_lookups
+
+
+def get_node_status(node_name, system_folders=False, host=None):
+    """Check if a specific node is running on its Docker host"""
+    container_name = get_container_name(node_name, system_folders)
+    host = host or DEFAULT_DOCKER_HOST
+    if host not in DOCKER_HOSTS:
+        return 'unknown'
+    
+    watcher = node_state_watchers[host]
+    watcher.start()
+    snapshot = watcher.snapshot()
+    if snapshot is not None:
+        return get_node_statuses(snapshot).get((host, container_name), 'stopped')
     
-    client = get_docker_client()
-    if not client:
+    if not get_docker_client(host):
         return 'unknown'
     
     try:
-        container = client.containers.get(container_name)
-        return container.status
-    except docker.errors.NotFound:
-        return 'stopped'
+        # Memoized, so a route showing the container's details reuses this inspect
+        container = docker_lookups().container(container_name, host)
+        status = container.status if container else 'stopped'
     except Exception as e:
         print(f"Error checking node status: {e}")
+        reset_docker_client(host)
         return 'error'
+    
+    state_version.observe(('container', host, container_name), status)
+    return status
 
 
-@app.route('/')
-def index():
-    """Dashboard showing overview of all nodes"""
-    configs = get_node_configs()
-    running_nodes = get_running_nodes()
+class NodeStateWatcher:
+    """
+    Live table of node containers, kept up to date from Docker events.
     
-    # Enrich configs with running status
-    for config in configs:
-        status = get_node_status(config['name'], config['type'] == 'system')
-        config['status'] = status
+    The table starts from a full listing and is then updated from the
+    events stream (filtered on the vantage6-type=node label), so status
+    queries need no Docker round trip. After the stream disconnects the
+    table is marked out of sync and rebuilt from a new listing; events are
+    replayed from just before each listing so no change is missed. There is
+    one watcher per Docker host.
+    """
     
-    return render_template('index.html', 
-                         configs=configs, 
-                         running_nodes=running_nodes,
-                         total_configs=len(configs),
-                         running_count=len([c for c in configs if c['status'] == 'running']))
+    # Container event actions and the state they leave the container in
+    EVENT_STATES = {
+        'create': 'created',
+        'start': 'running',
+        'restart': 'running',
+        'unpause': 'running',
+        'pause': 'paused',
+        'die': 'exited',
+        'stop': 'exited',
+    }
+    
+    def __init__(self, host):
+        self.host = host
+        self._containers = {}
+        self._in_sync = False
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self):
+        """Start watching, if not watching yet"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name=f'node-state-watcher-{self.host}',
+                                                daemon=True)
+                self._thread.start()
+    
+    def snapshot(self):
+        """
+        Get the container summaries of all node containers.
+        
+        Returns:
+            list: Summaries in the format of the Docker list endpoint,
+                  or None while the table is not in sync
+        """
+        with self._lock:
+            if not self._in_sync:
+                return None
+            return [dict(summary) for summary in self._containers.values()]
+    
+    def _watch(self):
+        retry_delay = 1
+        while True:
+            try:
+                client = get_shared_docker_client(self.host)
+                since = int(time.time()) - 1
+                containers = query_node_containers(self.host)
+                with self._lock:
+                    changed = container_states(containers) != container_states(self._containers.values())
+                    self._containers = {summary['Id']: summary for summary in containers}
+                    self._in_sync = True
+                if changed:
+                    state_version.bump()
+                retry_delay = 1
+                
+                events = client.api.events(since=since, decode=True, filters={
+                    'type': 'container', 'label': f'{APPNAME}-type=node'})
+                try:
+                    for event in events:
+                        self.apply_event(event)
+                finally:
+                    events.close()
+            except Exception as e:
+                print(f"Docker events stream of {self.host} interrupted: {e}")
+            
+            with self._lock:
+                self._in_sync = False
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+    
+    def apply_event(self, event):
+        """Update the table from one Docker container event"""
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        actor = event.get('Actor') or {}
+        container_id = actor.get('ID') or event.get('id')
+        attributes = actor.get('Attributes') or {}
+        if not container_id:
+            return
+        
+        with self._lock:
+            if action == 'destroy':
+                if self._containers.pop(container_id, None) is not None:
+                    state_version.bump()
+                return
+            
+            summary = self._containers.get(container_id)
+            before = summary and (summary['Names'], summary['State'])
+            if summary is None:
+                summary = {
+                    'Id': container_id,
+                    'Names': [f"/{attributes.get('name', container_id[:12])}"],
+                    'Image': attributes.get('image'),
+                    'Created': event.get('time'),
+                    'Host': self.host,
+                    'State': 'created',
+                    'Labels': {key: value for key, value in attributes.items()
+                               if key not in ('name', 'image')}
+                }
+                self._containers[container_id] = summary
+            
+            if action == 'rename' and attributes.get('name'):
+                summary['Names'] = [f"/{attributes['name']}"]
+            if action in self.EVENT_STATES:
+                summary['State'] = self.EVENT_STATES[action]
+                summary['StateChangedAt'] = event.get('time')
+            changed = before != (summary['Names'], summary['State'])
+        
+        if changed:
+            state_version.bump()
 
 
-@app.route('/nodes')
-def list_nodes():
-    """List all node configurations"""
-    configs = get_node_configs()
+node_state_watchers = {host: NodeStateWatcher(host) for host in DOCKER_HOSTS}
+
+
+def parse_log_cursor(cursor):
+    """
+    Parse a log cursor of the form '<seconds>.<nanoseconds>'.
+    
+    Returns:
+        tuple: (seconds, nanoseconds), or None if the cursor is invalid
+    """
+    try:
+        seconds, _, nanos = str(cursor).partition('.')
+        return int(seconds), int(nanos.ljust(9, '0')[:9] or 0)
+    except ValueError:
+        return None
+
+
+def split_log_timestamp(line):
+    """
+    Split a Docker log line written with timestamps=True.
+    
+    Docker prefixes each line with an RFC3339Nano timestamp, e.g.
+    '2024-01-01T12:00:00.123456789Z message'.
+    
+    Returns:
+        tuple: ((seconds, nanoseconds), message), or (None, line) if the
+               line has no timestamp
+    """
+    stamp, _, message = line.partition(' ')
+    try:
+        date_part, _, fraction = stamp.rstrip('Z').partition('.')
+        seconds = calendar.timegm(time.strptime(date_part, '%Y-%m-%dT%H:%M:%S'))
+        return (seconds, int(fraction.ljust(9, '0')[:9] or 0)), message
+    except ValueError:
+        return None, line
+
+
+def iter_log_lines(chunks):
+    """Re-assemble a Docker log byte stream into decoded lines"""
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        while b'\n' in buffer:
+            line, buffer = buffer.split(b'\n', 1)
+            yield line.decode('utf-8', errors='replace').rstrip('\r')
+    if buffer:
+        yield buffer.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def stream_container_logs(container, cursor=None):
+    """
+    Follow a container's logs and yield them as Server-Sent Events.
+    
+    Every event carries a '<seconds>.<nanoseconds>' cursor as its id, so a
+    client (or EventSource, via Last-Event-ID) can resume without receiving
+    lines it already has. Without a cursor the last LOG_TAIL_LINES lines are
+    sent first. The stream is closed after LOG_STREAM_MAX_SECONDS so idle
+    connections do not hold a worker forever; EventSource reconnects by itself.
+    
+    Args:
+        container: Docker container to follow
+        cursor: (seconds, nanoseconds) tuple to resume after, or None
+    """
+    if cursor:
+        # Docker's 'since' has second resolution, lines up to the cursor are skipped below
+        log_stream = container.logs(stream=True, follow=True, timestamps=True,
+                                    since=cursor[0] or 1)
+    else:
+        log_stream = container.logs(stream=True, follow=True, timestamps=True,
+                                    tail=LOG_TAIL_LINES)
+    
+    timer = threading.Timer(LOG_STREAM_MAX_SECONDS, log_stream.close)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield 'retry: 3000\n\n'
+        for line in iter_log_lines(log_stream):
+            stamp, message = split_log_timestamp(line)
+            if stamp is not None:
+                if cursor and stamp <= cursor:
+                    continue
+                cursor = stamp
+                yield f'id: {stamp[0]}.{stamp[1]:09d}\n'
+            yield f'data: {message}\n\n'
+    except Exception as e:
+        # Closing the stream from the timer surfaces as a read error
+        print(f"Log stream for {container.name} ended: {e}")
+    finally:
+        timer.cancel()
+        log_stream.close()
+
+
+def get_node_log_dir(config):
+    """
+    Get the directory a node writes its log files to, as seen by the manager.
+    
+    This is the directory start_node mounts as /mnt/log: the directory of
+    an absolute logging.file, otherwise <data dir>/<node name>/log.
+    """
+    log_file = ((config['data'] or {}).get('logging') or {}).get('file')
+    if log_file and Path(log_file).is_absolute():
+        return Path(log_file).parent
+    return VANTAGE6_DATA_DIR / config['name'] / 'log'
+
+
+def get_node_log_files(config):
+    """
+    Get the log file of a node and its rotated backups, newest first.
+    
+    Returns:
+        list: Paths of the files that exist, e.g. node.log, node.log.1, ...
+    """
+    logging_config = (config['data'] or {}).get('logging') or {}
+    file_name = Path(logging_config.get('file') or f"{config['name']}.log").name
+    log_dir = get_node_log_dir(config)
+    
+    paths = [log_dir / file_name]
+    paths += [log_dir / f'{file_name}.{i}' for i in range(1, int(logging_config.get('backup_count') or 0) + 1)]
+    return [path for path in paths if path.is_file()]
+
+
+def parse_log_file_cursor(cursor):
+    """
+    Parse a log file cursor of the form '<inode>-<checksum>:<offset>'.
+    
+    Returns:
+        tuple: (inode, checksum, offset), or None if the cursor is invalid
+    """
+    try:
+        file_id, offset = str(cursor).split(':')
+        inode, checksum = file_id.split('-')
+        cursor = int(inode), int(checksum), int(offset)
+    except ValueError:
+        return None
+    return cursor if cursor[2] > 0 else None
+
+
+def format_log_file_cursor(cursor):
+    return f'{cursor[0]}-{cursor[1]}:{cursor[2]}'
+
+
+def log_file_checksum(path, offset):
+    """Checksum of the start of a log file, which tells files apart when an inode is reused"""
+    with open(path, 'rb') as f:
+        return zlib.crc32(f.read(min(offset, 64)))
+
+
+def read_log_history(paths, cursor=None, limit=LOG_TAIL_LINES):
+    """
+    Read the lines before a cursor from a log file and its rotated backups.
+    
+    Files are memory-mapped and scanned backwards for line breaks, so only
+    the returned lines are ever copied into memory, however large the files
+    are. Cursors hold the inode of the file and a byte offset in it; log
+    rotation renames files but keeps their inodes, so a cursor stays valid
+    while its file moves through the backups. A checksum of the start of
+    the file guards against the inode being reused after the file was
+    rotated out.
+    
+    Args:
+        paths: Log file and its backups, newest first
+        cursor: (inode, checksum, offset) to read backwards from, or None
+                to start at the end of the newest file
+        limit: Maximum number of lines to return
+    
+    Returns:
+        tuple: (lines, cursor) with the lines oldest first and the cursor to
+               pass for the page before them, or None at the start of history
+    
+    Raises:
+        LookupError: If the file of the cursor was rotated out of the backups
+    """
+    files = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((path, stat.st_ino, stat.st_size))
+    if not files:
+        return [], None
+    
+    if cursor is None:
+        index, offset = 0, files[0][2]
+    else:
+        inode, checksum, offset = cursor
+        index = next((i for i, (path, file_inode, size) in enumerate(files)
+                      if file_inode == inode and size >= offset
+                      and log_file_checksum(path, offset) == checksum), None)
+        if index is None:
+            raise LookupError('Log file was rotated out of the backups')
+    
+    lines = []
+    while len(lines) < limit:
+        path, inode, size = files[index]
+        offset = min(offset, size)
+        if offset > 0:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                offset = min(offset, len(mapped))
+                while offset > 0 and len(lines) < limit:
+                    # The line break before the offset ends the previous line
+                    line_end = offset - 1 if mapped[offset - 1] == 0x0A else offset
+                    line_start = mapped.rfind(b'\n', 0, line_end) + 1
+                    lines.append(mapped[line_start:line_end].decode('utf-8', 'replace').rstrip('\r'))
+                    offset = line_start
+        if offset > 0:
+            break
+        # Continue in the next older file with content; a cursor never points at offset 0
+        index = next((i for i in range(index + 1, len(files)) if files[i][2] > 0), None)
+        if index is None:
+            return lines[::-1], None
+        offset = files[index][2]
+    
+    path, inode, _ = files[index]
+    return lines[::-1], (inode, log_file_checksum(path, offset), offset)
+
+
+def compile_log_format(log_format):
+    """
+    Build a regular expression that parses lines written with a logging format.
+    
+    Every '%(field)s' placeholder (with optional padding, e.g. '%(name)-14s')
+    becomes a named group; the literal text between them must match exactly.
+    
+    Args:
+        log_format: Python logging format string, e.g. the 'logging.format'
+                    of a node configuration
+    
+    Returns:
+        re.Pattern, or None if the format cannot be compiled
+    """
+    try:
+        pattern = ''
+        position = 0
+        seen = set()
+        for match in re.finditer(r'%\((\w+)\)[-#0 +]*\d*(?:\.\d+)?[sdfr]', log_format):
+            pattern += re.escape(log_format[position:match.start()])
+            field = match.group(1)
+            if field in seen:
+                pattern += '.*?'
+            elif field == 'message':
+                pattern += f'(?P<{field}>.*)'
+            else:
+                pattern += f'\\s*(?P<{field}>.*?)\\s*'
+            seen.add(field)
+            position = match.end()
+        pattern += re.escape(log_format[position:])
+        return re.compile(f'^{pattern}$')
+    except (re.error, TypeError):
+        return None
+
+
+class LogRingBuffer:
+    """
+    Bounded buffer with the most recent log lines of one node container.
+    
+    Lines are parsed once on the way in, so queries by level only compare
+    integers. Lines that do not match the log format (e.g. tracebacks) take
+    the level of the line before them. The buffer is filled from the
+    container's recent logs once (under fill_lock, see LogBufferManager),
+    after which lines only come from its follower.
+    """
+    
+    # Rough per-line overhead of the tuple and its members, on top of the text
+    LINE_OVERHEAD = 120
+    
+    def __init__(self, log_format, max_bytes):
+        self.pattern = compile_log_format(log_format or DEFAULT_LOG_FORMAT)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.cursor = None
+        self._lines = collections.deque()
+        self._level = None
+        self._lock = threading.Lock()
+        self.fill_lock = threading.Lock()
+        self.filled_at = None
+    
+    def append(self, stamp, line):
+        """
+        Add one line; returns the change in buffer size in bytes.
+        
+        Args:
+            stamp: (seconds, nanoseconds) Docker timestamp of the line
+            line: Log line without its Docker timestamp
+        """
+        entry_size = len(line) + self.LINE_OVERHEAD
+        with self._lock:
+            if stamp is not None:
+                if self.cursor and stamp <= self.cursor:
+                    return 0
+                self.cursor = stamp
+            # The level carries over to continuation lines, so track it in line order
+            match = self.pattern.match(line) if self.pattern else None
+            if match:
+                fields = match.groupdict()
+                self._level = LOG_LEVELS.get((fields.get('levelname') or '').upper())
+            self._lines.append((stamp, self._level, line))
+            self.size += entry_size
+            freed = 0
+            while self.size > self.max_bytes and len(self._lines) > 1:
+                freed += self._evict()
+            return entry_size - freed
+    
+    def _evict(self):
+        _, _, line = self._lines.popleft()
+        freed = len(line) + self.LINE_OVERHEAD
+        self.size -= freed
+        return freed
+    
+    def evict_oldest(self):
+        """Drop the oldest line; returns the number of bytes freed"""
+        with self._lock:
+            return self._evict() if self._lines else 0
+    
+    def query(self, level=None, grep=None, since=None, limit=100):
+        """
+        Get the most recent lines matching all given filters, oldest first.
+        
+        Args:
+            level: Minimum level number (see LOG_LEVELS)
+            grep: Case-insensitive substring the line must contain
+            since: (seconds, nanoseconds); only lines after this are returned
+            limit: Maximum number of lines
+        """
+        grep = grep.lower() if grep else None
+        result = []
+        with self._lock:
+            for stamp, line_level, line in reversed(self._lines):
+                if len(result) >= limit:
+                    break
+                if since and stamp is not None and stamp <= since:
+                    break
+                if level is not None and (line_level is None or line_level < level):
+                    continue
+                if grep and grep not in line.lower():
+                    continue
+                result.append((stamp, line_level, line))
+        result.reverse()
+        return result
+
+
+class LogBufferManager:
+    """
+    Keeps a LogRingBuffer per node container, fed by background followers.
+    
+    A supervisor thread starts a follower for every running node container
+    every LOG_FOLLOWER_SYNC_INTERVAL seconds. Memory is capped per buffer
+    (LOG_BUFFER_NODE_BYTES) and across all buffers (LOG_BUFFER_TOTAL_BYTES);
+    over the total, the oldest lines of the largest buffer go first.
+    """
+    
+    def __init__(self, node_bytes, total_bytes):
+        self.node_bytes = node_bytes
+        self.total_bytes = total_bytes
+        self.size = 0
+        self._buffers = {}
+        self._followers = {}
+        self._lock = threading.Lock()
+        self._supervisor = None
+    
+    def start(self):
+        """Start the supervisor thread, if it is not running yet"""
+        with self._lock:
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, name='log-buffers',
+                                                    daemon=True)
+                self._supervisor.start()
+    
+    def get(self, container_name):
+        """Get the buffer of a container, or None if it is not buffered"""
+        with self._lock:
+            return self._buffers.get(container_name)
+    
+    def load(self, container, log_format):
+        """
+        Fill a buffer for a container from its recent logs and start following it.
+        
+        Returns:
+            LogRingBuffer
+        """
+        with self._lock:
+            buffer = self._buffers.get(container.name)
+            if buffer is None:
+                buffer = LogRingBuffer(log_format, self.node_bytes)
+                self._buffers[container.name] = buffer
+        
+        self._fill(container, buffer)
+        self._follow(container.name, buffer)
+        return buffer
+    
+    def _fill(self, container, buffer):
+        """
+        Load a buffer from the container's recent logs, once.
+        
+        The request thread and the follower may both get here first; the
+        fill lock makes the other one wait and then skip the initial load,
+        so lines never arrive from two threads out of order.
+        """
+        with buffer.fill_lock:
+            if buffer.filled_at is not None:
+                return
+            filled_at = int(time.time())
+            output = container.logs(timestamps=True, tail=LOG_BUFFER_INITIAL_LINES)
+            for line in iter_log_lines([output]):
+                self._append(buffer, *split_log_timestamp(line))
+            buffer.filled_at = filled_at
+    
+    def _append(self, buffer, stamp, line):
+        grown = buffer.append(stamp, line)
+        with self._lock:
+            self.size += grown
+            while self.size > self.total_bytes:
+                largest = max(self._buffers.values(), key=lambda b: b.size)
+                freed = largest.evict_oldest()
+                if not freed:
+                    break
+                self.size -= freed
+    
+    def _follow(self, container_name, buffer):
+        with self._lock:
+            follower = self._followers.get(container_name)
+            if follower and follower.is_alive():
+                return
+            follower = threading.Thread(target=self._run_follower, args=(container_name, buffer),
+                                        name=f'log-follower-{container_name}', daemon=True)
+            self._followers[container_name] = follower
+            follower.start()
+    
+    def _run_follower(self, container_name, buffer):
+        """Append new lines of one container until its log stream ends"""
+        try:
+            container = get_shared_docker_client().containers.get(container_name)
+            self._fill(container, buffer)
+            # Lines up to the cursor are skipped by the buffer, Docker's 'since' has second resolution
+            since = buffer.cursor[0] if buffer.cursor else buffer.filled_at
+            log_stream = container.logs(stream=True, follow=True, timestamps=True, since=since or 1)
+            try:
+                for line in iter_log_lines(log_stream):
+                    self._append(buffer, *split_log_timestamp(line))
+            finally:
+                log_stream.close()
+        except Exception as e:
+            print(f"Log follower for {container_name} stopped: {e}")
+    
+    def _supervise(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing log followers: {e}")
+            time.sleep(LOG_FOLLOWER_SYNC_INTERVAL)
+    
+    def sync(self):
+        """Start followers for running node containers that are not followed yet"""
+        # Buffers are kept for nodes on the default host only
+        containers = list_node_containers([DEFAULT_DOCKER_HOST]) or []
+        for summary in containers:
+            if summary.get('State') != 'running':
+                continue
+            container_name = (summary.get('Names') or [''])[0].lstrip('/')
+            with self._lock:
+                follower = self._followers.get(container_name)
+                buffer = self._buffers.get(container_name)
+            if follower and follower.is_alive():
+                continue
+            if buffer is None:
+                config = get_node_config((summary.get('Labels') or {}).get('name', ''))
+                log_format = ((config or {}).get('data') or {}).get('logging', {}).get('format')
+                with self._lock:
+                    buffer = self._buffers.setdefault(container_name,
+                                                      LogRingBuffer(log_format, self.node_bytes))
+            self._follow(container_name, buffer)
+
+
+log_buffers = LogBufferManager(LOG_BUFFER_NODE_BYTES, LOG_BUFFER_TOTAL_BYTES)
+
+
+class Job:
+    """
+    A node action (start, stop, restart) running in the background.
+    
+    Jobs record named steps, flash-style messages and progress, so the UI
+    and API clients can follow them through /api/jobs/<id>.
+    """
+    
+    def __init__(self, action, node_name):
+        self.id = uuid.uuid4().hex
+        self.action = action
+        self.node_name = node_name
+        self.status = 'queued'
+        self.steps = []
+        self.messages = []
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.store = None
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+    
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def wait(self, timeout=None):
+        """Wait for the job to finish; returns False on timeout"""
+        return self._done.wait(timeout)
+    
+    @contextmanager
+    def step(self, name):
+        """Record a named step; the step fails if the block raises"""
+        entry = {'name': name, 'status': 'running', 'started': time.time(), 'finished': None}
+        with self._lock:
+            self.steps.append(entry)
+        self.save()
+        try:
+            yield entry
+        except Exception:
+            entry['status'] = 'failed'
+            raise
+        else:
+            entry['status'] = 'done'
+        finally:
+            entry['finished'] = time.time()
+            self.save()
+    
+    def message(self, text, category='info'):
+        """Add a message, the job counterpart of flash()"""
+        with self._lock:
+            self.messages.append({'category': category, 'message': text})
+        self.save()
+    
+    def set_progress(self, key, value):
+        with self._lock:
+            self.progress[key] = value
+        # Pull progress changes many times per second, persist it at most once a second
+        self.save(min_interval=1.0)
+    
+    def save(self, min_interval=0.0):
+        """Write the job to the shared job store, if there is one"""
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if min_interval and now - self._saved_at < min_interval:
+            return
+        self._saved_at = now
+        self.store.save(self.to_dict())
+    
+    def to_dict(self):
+        with self._lock:
+            return {
+                'id': self.id,
+                'action': self.action,
+                'node': self.node_name,
+                'status': self.status,
+                'steps': [dict(step) for step in self.steps],
+                'messages': list(self.messages),
+                'progress': dict(self.progress),
+                'result': self.result,
+                'error': self.error,
+                'created': self.created,
+                'started': self.started,
+                'finished': self.finished
+            }
+
+
+class JobStore:
+    """
+    Job state shared between worker processes as JSON files in a directory.
+    
+    Lets any worker answer /api/jobs/<id> for a job another worker runs,
+    and serializes jobs on the same node across processes with file locks.
+    """
+    
+    def __init__(self, directory, history):
+        self.directory = Path(directory)
+        self.history = history
+        (self.directory / 'locks').mkdir(parents=True, exist_ok=True)
+    
+    def save(self, job_dict):
+        """Atomically write a job, so readers never see a partial file"""
+        path = self.directory / f"{job_dict['id']}.json"
+        temp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(job_dict, f)
+        os.replace(temp_path, path)
+    
+    def load(self, job_id):
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+            return None
+        try:
+            with open(self.directory / f'{job_id}.json') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def list(self):
+        jobs = []
+        for path in self.directory.glob('*.json'):
+            job_dict = self.load(path.stem)
+            if job_dict:
+                jobs.append(job_dict)
+        return sorted(jobs, key=lambda job_dict: job_dict['created'])
+    
+    def prune(self):
+        """Remove the oldest finished jobs beyond the history size"""
+        jobs = self.list()
+        for job_dict in jobs[:max(0, len(jobs) - self.history)]:
+            if job_dict['status'] in ('succeeded', 'failed'):
+                try:
+                    os.remove(self.directory / f"{job_dict['id']}.json")
+                except OSError:
+                    pass
+    
+    @contextmanager
+    def node_lock(self, node_name):
+        """Hold an exclusive lock on a node across worker processes"""
+        with open(self.directory / 'locks' / f'{secure_filename(node_name) or "_"}.lock', 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps recent jobs for polling.
+    
+    Jobs on different nodes run concurrently; jobs on the same node wait for
+    each other, so e.g. a restart never overlaps a start of the same node.
+    With a JobStore, jobs are also visible to (and serialized with) other
+    worker processes.
+    """
+    
+    def __init__(self, workers, history, store=None):
+        self.history = history
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = collections.OrderedDict()
+        self._node_locks = collections.defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+    
+    def submit(self, action, node_name, function, *args):
+        """
+        Queue function(job, *args) and return the Job immediately.
+        
+        The function's return value becomes the job result.
+        """
+        job = Job(action, node_name)
+        job.store = self.store
+        job.save()
+        if self.store:
+            self.store.prune()
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs beyond the history size
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.history:
+                    break
+                if self._jobs[job_id].done:
+                    del self._jobs[job_id]
+            node_lock = self._node_locks[node_name]
+        self._executor.submit(self._run, job, node_lock, function, args)
+        return job
+    
+    def _run(self, job, node_lock, function, args):
+        with node_lock, (self.store.node_lock(job.node_name) if self.store else nullcontext()):
+            job.status = 'running'
+            job.started = time.time()
+            job.save()
+            try:
+                job.result = function(job, *args)
+                job.status = 'succeeded'
+            except Exception as e:
+                import sys
+                import traceback
+                print(f"ERROR in {job.action} job for {job.node_name}: {str(e)}", file=sys.stderr, flush=True)
+                traceback.print_exc()
+                job.error = str(e)
+                job.message(f'Error during {job.action} of node "{job.node_name}": {str(e)}', 'error')
+                job.status = 'failed'
+            finally:
+                job.finished = time.time()
+                job.save()
+                job._done.set()
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def describe(self, job_id):
+        """Get a job as a dict, also if another worker process runs it"""
+        job = self.get(job_id)
+        if job:
+            return job.to_dict()
+        return self.store.load(job_id) if self.store else None
+    
+    def describe_all(self, node_name=None):
+        """Get recent jobs as dicts, oldest first"""
+        if self.store:
+            jobs = self.store.list()
+        else:
+            with self._lock:
+                jobs = [job.to_dict() for job in self._jobs.values()]
+        return [job for job in jobs if node_name is None or job['node'] == node_name]
+
+
+job_manager = JobManager(JOB_WORKERS, JOB_HISTORY,
+                         JobStore(JOB_STATE_DIR, JOB_HISTORY) if JOB_STATE_DIR else None)
+
+
+_background_lock_file = None
+
+
+def is_background_leader():
+    """
+    Check if this process runs the singleton background work.
+    
+    With several worker processes, one of them holds an exclusive lock on
+    BACKGROUND_LOCK_FILE and does work that should happen only once per
+    host, like pre-pulling images. Others keep trying, so a replacement
+    worker takes over when the leader exits. Without a lock file configured
+    every process is the leader.
+    """
+    global _background_lock_file
+    if not BACKGROUND_LOCK_FILE or _background_lock_file is not None:
+        return True
+    lock_file = open(BACKGROUND_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _background_lock_file = lock_file
+    print(f"Process {os.getpid()} elected as background worker")
+    return True
+
+
+class SharedSnapshot:
+    """
+    Results of the elected background worker, shared with the other workers.
+    
+    Background work that should happen once per host, like probing servers,
+    runs in the elected worker (see is_background_leader()), which publishes
+    its results as a JSON file in SHARED_STATE_DIR. Other workers read the
+    file, parsing it again only when it changed. Without SHARED_STATE_DIR
+    there is a single process and nothing is written.
+    """
+    
+    def __init__(self, name):
+        self.path = Path(SHARED_STATE_DIR) / f'{name}.json' if SHARED_STATE_DIR else None
+        self._signature = None
+        self._data = None
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self):
+        return self.path is not None
+    
+    def publish(self, data):
+        """Atomically replace the shared results with JSON-able data"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(self.path, json.dumps(data))
+    
+    def load(self):
+        """Get the last published results, or None if there are none yet"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                try:
+                    with open(self.path) as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Error reading {self.path}: {e}")
+                    return self._data
+                self._signature = signature
+            return self._data
+
+
+def pull_image(client, image, job=None):
+    """
+    Pull an image, reporting aggregated download progress to a job.
+    
+    Progress is stored under job.progress['pull'] as bytes downloaded and
+    total bytes over all layers reported so far.
+    """
+    repository, tag = docker.utils.parse_repository_tag(image)
+    layers = {}
+    for event in client.api.pull(repository, tag=tag or 'latest', stream=True, decode=True):
+        if 'error' in event:
+            raise docker.errors.APIError(event['error'])
+        layer = event.get('id')
+        detail = event.get('progressDetail') or {}
+        if layer and event.get('status') == 'Downloading' and detail.get('total'):
+            layers[layer] = [detail.get('current', 0), detail['total']]
+        elif layer in layers and event.get('status') in ('Download complete', 'Pull complete'):
+            layers[layer][0] = layers[layer][1]
+        if job and layers:
+            job.set_progress('pull', {
+                'image': image,
+                'layers': len(layers),
+                'current': sum(current for current, _ in layers.values()),
+                'total': sum(total for _, total in layers.values())
+            })
+
+
+class ImageIndex:
+    """
+    Index of the images present on the local Docker daemon, by tag and by ID.
+    
+    Refreshed with a single image listing when stale: at most every
+    IMAGE_INDEX_TTL seconds, and right after any image event (pull, tag,
+    untag, delete, ...) seen by a background events watcher. Pulls made by
+    the manager add their tag immediately.
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._tags = set()
+        self._ids = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+        self._watcher = None
+    
+    def start(self):
+        """Start watching image events, if not watching yet"""
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='image-events', daemon=True)
+                self._watcher.start()
+    
+    def _watch(self):
+        retry_delay = 1
+        while True:
+            try:
+                events = get_shared_docker_client().api.events(decode=True, filters={'type': 'image'})
+                # Events may have been missed while not connected
+                self.invalidate()
+                retry_delay = 1
+                try:
+                    for _ in events:
+                        self.invalidate()
+                finally:
+                    events.close()
+            except Exception as e:
+                print(f"Docker image events stream interrupted: {e}")
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+    
+    def invalidate(self):
+        """Mark the index stale, so the next lookup re-lists images"""
+        with self._lock:
+            self._refreshed_at = None
+    
+    def refresh(self, client=None):
+        """Re-list local images"""
+        client = client or get_shared_docker_client()
+        tags = set()
+        ids = {}
+        for image in client.api.images():
+            repo_tags = [tag for tag in image.get('RepoTags') or [] if tag != '<none>:<none>']
+            tags.update(repo_tags)
+            ids[image['Id']] = repo_tags
+        with self._lock:
+            self._tags = tags
+            self._ids = ids
+            self._refreshed_at = time.monotonic()
+    
+    def _refresh_if_stale(self):
+        self.start()
+        with self._lock:
+            stale = self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.ttl
+        if stale:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing image index: {e}")
+    
+    def has(self, image):
+        """Check if an image tag is present locally, refreshing the index if stale"""
+        self._refresh_if_stale()
+        if ':' not in image.rsplit('/', 1)[-1]:
+            image = f'{image}:latest'
+        with self._lock:
+            return image in self._tags
+    
+    def tags(self, image_id):
+        """Get the tags of a local image by its ID, refreshing the index if stale"""
+        self._refresh_if_stale()
+        if not image_id.startswith('sha256:'):
+            image_id = f'sha256:{image_id}'
+        with self._lock:
+            return list(self._ids.get(image_id, ()))
+    
+    def add(self, image):
+        if ':' not in image.rsplit('/', 1)[-1]:
+            image = f'{image}:latest'
+        with self._lock:
+            self._tags.add(image)
+
+
+image_index = ImageIndex(IMAGE_INDEX_TTL)
+
+
+class ImagePrefetcher:
+    """
+    Resolves the node image of every configured node and pulls missing ones.
+    
+    Runs every IMAGE_PREFETCH_INTERVAL seconds in the background and pulls
+    at most IMAGE_PREFETCH_WORKERS images at a time, so the first start
+    after a server upgrade does not wait for a multi-hundred-MB pull.
+    
+    With several worker processes only the elected worker pulls; the other
+    workers show the node images and their states it shares.
+    """
+    
+    def __init__(self, workers, interval):
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-prefetch')
+        self._node_images = {}
+        self._image_states = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shared = SharedSnapshot('node-images')
+        self._prefetching = False
+    
+    def start(self):
+        """Start the prefetch loop, if enabled and not running yet"""
+        with self._lock:
+            if IMAGE_PREFETCH_ENABLED and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='image-prefetcher', daemon=True)
+                self._thread.start()
+    
+    def _loop(self):
+        while True:
+            try:
+                # Pulls are host-wide, only one worker process does them
+                if is_background_leader():
+                    self._prefetching = True
+                    self.prefetch()
+            except Exception as e:
+                print(f"Error prefetching node images: {e}")
+            time.sleep(self.interval)
+    
+    def prefetch(self):
+        """Resolve images for all configs and wait for missing ones to be pulled"""
+        node_images = {}
+        for config in get_node_configs():
+            server_url = (config['data'] or {}).get('server_url')
+            if not server_url:
+                continue
+            version, _ = get_server_version(server_url, config['data'].get('api_path', '/api'))
+            if version:
+                node_images[(config['name'], config['type'])] = get_node_image_for_version(version)
+        
+        client = get_shared_docker_client()
+        image_index.refresh(client)
+        with self._lock:
+            self._node_images = node_images
+        
+        pulls = []
+        for image in set(node_images.values()):
+            if image_index.has(image):
+                self._set_state(image, 'ready')
+            else:
+                self._set_state(image, 'pulling')
+                pulls.append(self._executor.submit(self._pull, client, image))
+        self.publish()
+        for pull in pulls:
+            pull.result()
+    
+    def _pull(self, client, image):
+        try:
+            pull_image(client, image)
+            image_index.add(image)
+            self._set_state(image, 'ready')
+        except Exception as e:
+            print(f"Error pre-pulling {image}: {e}")
+            self._set_state(image, 'error')
+        self.publish()
+    
+    def _set_state(self, image, state):
+        with self._lock:
+            self._image_states[image] = state
+    
+    def publish(self):
+        """Share the node images and their states with the other worker processes"""
+        if self._shared.enabled:
+            with self._lock:
+                data = {
+                    'nodes': {f'{node_type}/{name}': image
+                              for (name, node_type), image in self._node_images.items()},
+                    'images': dict(self._image_states)
+                }
+            self._shared.publish(data)
+    
+    def states(self):
+        """
+        Get the images of all nodes and the states of those images.
+        
+        Returns:
+            tuple: ({'<type>/<name>': image}, {image: state}); from this
+                   process if it pulls, else from the elected worker
+        """
+        if self._shared.enabled and not self._prefetching:
+            data = self._shared.load() or {}
+            return data.get('nodes') or {}, data.get('images') or {}
+        with self._lock:
+            return ({f'{node_type}/{name}': image for (name, node_type), image in self._node_images.items()},
+                    dict(self._image_states))
+    
+    def node_image_state(self, config, states=None):
+        """
+        Get the prefetched image of a node and whether it is present locally.
+        
+        Args:
+            config: Node configuration
+            states: Result of states(), when looking up many nodes
+        
+        Returns:
+            tuple: (image, state) where state is 'ready', 'pulling', 'error'
+                   or None if the node's image has not been resolved yet
+        """
+        node_images, image_states = states or self.states()
+        image = node_images.get(f"{config['type']}/{config['name']}")
+        return image, image_states.get(image)
+
+
+image_prefetcher = ImagePrefetcher(IMAGE_PREFETCH_WORKERS, IMAGE_PREFETCH_INTERVAL)
+
+
+class ServerProber:
+    """
+    Background connectivity checks of the vantage6 servers of all nodes.
+    
+    Every distinct (server_url, api_path) is probed once per interval, no
+    matter how many nodes share it, with at most `workers` probes in flight.
+    Each server's next probe is jittered, so servers added together do not
+    stay in lockstep. Probes request the version endpoint and keep the
+    server version cache warm as a side effect. Pages only read the
+    recorded history, they never wait for a probe.
+    
+    With several worker processes only the elected worker probes, so every
+    server sees the configured probe rate once; the other workers show the
+    histories it shares, at most SERVER_PROBE_SYNC_INTERVAL seconds old.
+    """
+    
+    def __init__(self, workers, interval, jitter, history):
+        """
+        Args:
+            workers: Maximum number of probes in flight
+            interval: Seconds between probes of the same server
+            jitter: Fraction of the interval by which probes are spread
+            history: Number of probe results kept per server
+        """
+        self.interval = interval
+        self.jitter = jitter
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='server-probe')
+        self._servers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shared = SharedSnapshot('server-probes')
+        self._probing = False
+        self._changed = False
+    
+    def start(self):
+        """Start the probe loop, if enabled and not running yet"""
+        with self._lock:
+            if SERVER_PROBE_ENABLED and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='server-prober', daemon=True)
+                self._thread.start()
+    
+    def _loop(self):
+        while True:
+            delay = SERVER_PROBE_SYNC_INTERVAL
+            try:
+                # Servers are probed once per host, other workers read the shared results
+                if is_background_leader():
+                    self._probing = True
+                    delay = self.schedule()
+                    self.publish()
+            except Exception as e:
+                print(f"Error scheduling server probes: {e}")
+                delay = self.interval
+            # Wake up in time to pick up servers of newly added configs
+            time.sleep(min(delay, SERVER_PROBE_SYNC_INTERVAL))
+    
+    def schedule(self):
+        """
+        Submit probes for the servers that are due.
+        
+        Returns:
+            float: Seconds until the next probe is due
+        """
+        keys = set()
+        for config in get_node_configs():
+            data = config['data'] or {}
+            if data.get('server_url'):
+                keys.add(server_version_key(data['server_url'], data.get('api_path', '/api')))
+        
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for key in list(self._servers):
+                if key not in keys:
+                    del self._servers[key]
+                    self._changed = True
+            for key in keys:
+                server = self._servers.get(key)
+                if server is None:
+                    # Spread the first probes of many servers over the jitter window
+                    server = self._servers[key] = {
+                        'next_due': now + random.uniform(0, self.interval * self.jitter),
+                        'in_flight': False,
+                        'history': collections.deque(maxlen=self.history)
+                    }
+                if not server['in_flight'] and server['next_due'] <= now:
+                    server['in_flight'] = True
+                    due.append(key)
+            next_due = min((server['next_due'] for server in self._servers.values()
+                            if not server['in_flight']), default=now + self.interval)
+        
+        for key in due:
+            self._executor.submit(self._probe, key)
+        return max(0.0, next_due - now)
+    
+    def _probe(self, key):
+        server_url, api_path = key
+        started = time.perf_counter()
+        try:
+            version, error = fetch_server_version(server_url, api_path)
+        except Exception as e:
+            version, error = None, str(e)
+        seconds = time.perf_counter() - started
+        SERVER_PROBE_SECONDS.observe(seconds, 'reachable' if error is None else 'unreachable')
+        cache_server_version(key, version, error)
+        
+        with self._lock:
+            server = self._servers.get(key)
+            if server is None:
+                return
+            server['history'].append({
+                'time': time.time(),
+                'reachable': error is None,
+                'latency_ms': round(seconds * 1000, 1),
+                'error': error
+            })
+            server['in_flight'] = False
+            server['next_due'] = time.monotonic() + self.interval * random.uniform(
+                1 - self.jitter, 1 + self.jitter)
+            self._changed = True
+    
+    def publish(self):
+        """Share the probe histories with the other worker processes, if they changed"""
+        if not self._shared.enabled:
+            return
+        with self._lock:
+            if not self._changed:
+                return
+            self._changed = False
+            servers = [{'server_url': key[0], 'api_path': key[1], 'history': list(server['history'])}
+                       for key, server in self._servers.items()]
+        self._shared.publish(servers)
+    
+    def histories(self):
+        """
+        Get the probe history of every server.
+        
+        Returns:
+            dict: (server_url, api_path) to probe results, oldest first; from
+                  this process if it probes, else from the elected worker
+        """
+        if self._shared.enabled and not self._probing:
+            return {(server['server_url'], server['api_path']): server['history']
+                    for server in self._shared.load() or []}
+        with self._lock:
+            return {key: list(server['history']) for key, server in self._servers.items()}
+    
+    def summary(self, server_url, api_path='/api', histories=None):
+        """
+        Get the connectivity of a server from its recorded probes.
+        
+        Args:
+            server_url: Base URL of the Vantage6 server
+            api_path: API path (default: '/api')
+            histories: Result of histories(), when summarizing many servers
+        
+        Returns:
+            dict: Last result, average latency of successful probes,
+                  availability and the probe history, or None if the server
+                  has not been probed yet
+        """
+        key = server_version_key(server_url, api_path)
+        history = (self.histories() if histories is None else histories).get(key)
+        if not history:
+            return None
+        
+        latencies = [probe['latency_ms'] for probe in history if probe['reachable']]
+        last = history[-1]
+        return {
+            'server_url': key[0],
+            'api_path': key[1],
+            'reachable': last['reachable'],
+            'latency_ms': last['latency_ms'],
+            'error': last['error'],
+            'checked_at': last['time'],
+            'avg_latency_ms': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            'availability_percent': round(len(latencies) / len(history) * 100, 1),
+            'history': history
+        }
+    
+    def summaries(self):
+        """Get the summary of every probed server"""
+        histories = self.histories()
+        return [summary for summary in (self.summary(*key, histories=histories) for key in histories)
+                if summary]
+    
+    def node_summary(self, config, histories=None):
+        """Get the connectivity summary of a node's server, or None"""
+        data = config['data'] or {}
+        if not data.get('server_url'):
+            return None
+        return self.summary(data['server_url'], data.get('api_path', '/api'), histories)
+
+
+server_prober = ServerProber(SERVER_PROBE_WORKERS, SERVER_PROBE_INTERVAL,
+                             SERVER_PROBE_JITTER, SERVER_PROBE_HISTORY)
+
+
+def latency_sparkline(history, width=80, height=18):
+    """
+    Polyline points of a latency chart for the dashboard.
+    
+    Args:
+        history: Probe results, oldest first
+        width: Width of the chart in pixels
+        height: Height of the chart in pixels
+    
+    Returns:
+        str: SVG polyline points, unreachable probes drawn at the top
+    """
+    if len(history) < 2:
+        return ''
+    peak = max((probe['latency_ms'] for probe in history if probe['reachable']), default=0) or 1
+    step = width / (len(history) - 1)
+    points = []
+    for i, probe in enumerate(history):
+        level = min(probe['latency_ms'] / peak, 1) if probe['reachable'] else 1
+        points.append(f'{i * step:.1f},{height - 1 - level * (height - 2):.1f}')
+    return ' '.join(points)
+
+
+def parse_container_stats(stats):
+    """
+    Extract the counters we keep from one Docker stats sample.
+    
+    Handles both cgroup v1 and v2 memory and block I/O layouts.
+    
+    Returns:
+        dict: cpu_percent, memory_rss, memory_limit and cumulative
+              net_rx, net_tx, block_read and block_write bytes
+    """
+    cpu = stats.get('cpu_stats') or {}
+    precpu = stats.get('precpu_stats') or {}
+    cpu_delta = (cpu.get('cpu_usage', {}).get('total_usage', 0)
+                 - precpu.get('cpu_usage', {}).get('total_usage', 0))
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    online_cpus = cpu.get('online_cpus') or len(cpu.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+    
+    memory = stats.get('memory_stats') or {}
+    memory_detail = memory.get('stats') or {}
+    memory_rss = memory_detail.get('rss', memory_detail.get('anon'))
+    if memory_rss is None:
+        memory_rss = memory.get('usage', 0) - memory_detail.get('inactive_file', memory_detail.get('cache', 0))
+    
+    networks = (stats.get('networks') or {}).values()
+    block_read = block_write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        operation = (entry.get('op') or '').lower()
+        if operation == 'read':
+            block_read += entry.get('value', 0)
+        elif operation == 'write':
+            block_write += entry.get('value', 0)
+    
+    return {
+        'cpu_percent': cpu_percent,
+        'memory_rss': max(memory_rss, 0),
+        'memory_limit': memory.get('limit', 0),
+        'net_rx': sum(network.get('rx_bytes', 0) for network in networks),
+        'net_tx': sum(network.get('tx_bytes', 0) for network in networks),
+        'block_read': block_read,
+        'block_write': block_write
+    }
+
+
+class ContainerStatsSeries:
+    """
+    Downsampled resource usage of one container in a fixed-size buffer.
+    
+    Docker streams a stats sample about every second; samples are folded
+    into one point per STATS_SAMPLE_INTERVAL seconds with the average CPU,
+    the latest memory and network/block I/O rates in bytes per second.
+    """
+    
+    def __init__(self, container_name, labels, max_points, interval):
+        self.container_name = container_name
+        self.labels = labels
+        self.interval = interval
+        self.points = collections.deque(maxlen=max_points)
+        self._window = []
+        self._window_start = None
+        self._last_counters = None
+        self._lock = threading.Lock()
+    
+    def add(self, sample, now=None):
+        now = now or time.time()
+        with self._lock:
+            if self._window_start is None:
+                self._window_start = now
+            self._window.append(sample)
+            if now - self._window_start >= self.interval:
+                self._flush(now)
+    
+    def _flush(self, now):
+        latest = self._window[-1]
+        point = {
+            't': round(now, 3),
+            'cpu_percent': round(sum(s['cpu_percent'] for s in self._window) / len(self._window), 2),
+            'memory_rss': latest['memory_rss'],
+            'memory_limit': latest['memory_limit']
+        }
+        if self._last_counters:
+            elapsed = max(now - self._last_counters[0], 1e-3)
+            for counter in ('net_rx', 'net_tx', 'block_read', 'block_write'):
+                delta = latest[counter] - self._last_counters[1][counter]
+                point[f'{counter}_rate'] = round(max(delta, 0) / elapsed, 1)
+        self._last_counters = (now, latest)
+        self.points.append(point)
+        self._window = []
+        self._window_start = now
+    
+    def to_list(self, limit=None):
+        with self._lock:
+            points = list(self.points)
+        return points[-limit:] if limit else points
+
+
+class StatsSampler:
+    """
+    Follows the Docker stats stream of every running vantage6 container.
+    
+    A supervisor lists node and algorithm containers (anything carrying the
+    vantage6-type label) every STATS_SYNC_INTERVAL seconds and starts one
+    streaming sampler per container, so requests never wait for a stats call.
+    """
+    
+    def __init__(self, max_points, interval):
+        self.max_points = max_points
+        self.interval = interval
+        self._series = {}
+        self._samplers = {}
+        self._lock = threading.Lock()
+        self._supervisor = None
+    
+    def start(self):
+        """Start the supervisor thread, if it is not running yet"""
+        with self._lock:
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, name='stats-sampler',
+                                                    daemon=True)
+                self._supervisor.start()
+    
+    def _supervise(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing stats samplers: {e}")
+            time.sleep(STATS_SYNC_INTERVAL)
+    
+    def sync(self):
+        """Start samplers for new containers and drop series of removed ones"""
+        client = get_shared_docker_client()
+        containers = client.api.containers(filters={'label': f'{APPNAME}-type'})
+        running = set()
+        for summary in containers:
+            container_name = (summary.get('Names') or [''])[0].lstrip('/')
+            running.add(container_name)
+            with self._lock:
+                sampler = self._samplers.get(container_name)
+                if sampler and sampler.is_alive():
+                    continue
+                series = self._series.get(container_name)
+                if series is None:
+                    series = ContainerStatsSeries(container_name, summary.get('Labels') or {},
+                                                  self.max_points, self.interval)
+                    self._series[container_name] = series
+                sampler = threading.Thread(target=self._sample, args=(client, summary['Id'], series),
+                                           name=f'stats-{container_name}', daemon=True)
+                self._samplers[container_name] = sampler
+            sampler.start()
+        
+        with self._lock:
+            for container_name in list(self._series):
+                if container_name not in running:
+                    del self._series[container_name]
+    
+    def _sample(self, client, container_id, series):
+        try:
+            for stats in client.api.stats(container_id, stream=True, decode=True):
+                if not stats.get('read') or stats['read'].startswith('0001-'):
+                    # A stopped container reports one empty sample
+                    break
+                series.add(parse_container_stats(stats))
+        except Exception as e:
+            print(f"Stats sampler for {series.container_name} stopped: {e}")
+    
+    def get(self, container_name):
+        with self._lock:
+            return self._series.get(container_name)
+    
+    def algorithm_series(self, node_name):
+        """Get the series of algorithm containers started by a node"""
+        with self._lock:
+            return [series for series in self._series.values()
+                    if series.labels.get(f'{APPNAME}-type') == 'algorithm'
+                    and series.labels.get('node') == node_name]
+
+
+stats_sampler = StatsSampler(STATS_HISTORY_POINTS, STATS_SAMPLE_INTERVAL)
+
+
+def disk_bytes(stat):
+    """Bytes a file takes on disk, like du, or its size where blocks are not reported"""
+    blocks = getattr(stat, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else stat.st_size
+
+
+class DirectoryUsageCache:
+    """
+    Disk usage of directory trees, with per-directory totals cached by mtime.
+    
+    A directory's mtime changes when entries are added to, removed from or
+    renamed in it. A directory whose mtime is unchanged is not listed again:
+    its own file total is reused and only its subdirectories are checked,
+    one stat each, so an unchanged tree costs one stat per directory instead
+    of one per file. Files that grow in place do not change the mtime of
+    their directory; a full rescan picks those up.
+    """
+    
+    def __init__(self):
+        self._dirs = {}
+        self._lock = threading.Lock()
+    
+    def usage(self, path, full=False):
+        """
+        Measure a directory tree, rescanning only changed directories.
+        
+        Args:
+            path: Root of the tree
+            full: List every directory again, ignoring the cache
+        
+        Returns:
+            dict: 'bytes', 'files', 'errors' (unreadable entries) and
+                  'rescanned' (number of directories that were listed)
+        """
+        path = os.path.abspath(path)
+        seen = set()
+        rescanned = [0]
+        with self._lock:
+            total_bytes, files, errors = self._walk(path, full, seen, rescanned)
+            # Forget directories of the tree that are gone
+            prefix = path.rstrip('/') + '/'
+            for key in [key for key in self._dirs if key == path or key.startswith(prefix)]:
+                if key not in seen:
+                    del self._dirs[key]
+        return {'bytes': total_bytes, 'files': files, 'errors': errors, 'rescanned': rescanned[0]}
+    
+    def _walk(self, path, full, seen, rescanned):
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return 0, 0, 1
+        seen.add(path)
+        
+        # Stat before listing: a change in between leaves a stale mtime, so it is listed again next time
+        entry = self._dirs.get(path)
+        if full or entry is None or entry['mtime_ns'] != stat.st_mtime_ns:
+            own_bytes = own_files = own_errors = 0
+            subdirs = []
+            try:
+                with os.scandir(path) as dir_entries:
+                    for dir_entry in dir_entries:
+                        try:
+                            if dir_entry.is_dir(follow_symlinks=False):
+                                subdirs.append(dir_entry.name)
+                            else:
+                                own_bytes += disk_bytes(dir_entry.stat(follow_symlinks=False))
+                                own_files += 1
+                        except OSError:
+                            own_errors += 1
+            except OSError:
+                own_errors += 1
+            entry = self._dirs[path] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'own': (own_bytes + disk_bytes(stat), own_files, own_errors),
+                'subdirs': subdirs
+            }
+            rescanned[0] += 1
+        
+        total_bytes, files, errors = entry['own']
+        for name in entry['subdirs']:
+            sub_bytes, sub_files, sub_errors = self._walk(os.path.join(path, name), full, seen, rescanned)
+            total_bytes += sub_bytes
+            files += sub_files
+            errors += sub_errors
+        entry['total'] = (total_bytes, files, errors)
+        return total_bytes, files, errors
+    
+    def subtree(self, path):
+        """
+        Get the totals of a directory measured as part of an earlier usage() call.
+        
+        Returns:
+            dict: 'bytes', 'files' and 'errors', or None if not measured
+        """
+        with self._lock:
+            entry = self._dirs.get(os.path.abspath(path))
+            if not entry or 'total' not in entry:
+                return None
+            total_bytes, files, errors = entry['total']
+        return {'bytes': total_bytes, 'files': files, 'errors': errors}
+
+
+class DiskUsageMonitor:
+    """
+    Measures the disk usage of every node in the background.
+    
+    Every DISK_USAGE_INTERVAL seconds, a node's log directory and its four
+    named volumes are measured with a DirectoryUsageCache, so only changed
+    directories are listed again; every DISK_USAGE_FULL_RESCAN_INTERVAL
+    seconds all directories are. Volumes whose mountpoint this process
+    cannot read, e.g. when running in a container without the Docker data
+    root mounted, fall back to the sizes of Docker's disk usage report.
+    Requests only read the last reports.
+    
+    With several worker processes only the elected worker measures and
+    shares its reports; refresh requests of other workers reach it through
+    a marker file it checks every REFRESH_POLL_SECONDS.
+    """
+    
+    REFRESH_POLL_SECONDS = 5
+    
+    def __init__(self, interval, full_rescan_interval):
+        self.interval = interval
+        self.full_rescan_interval = full_rescan_interval
+        self.cache = DirectoryUsageCache()
+        self._reports = {}
+        self._fleet = None
+        self._last_full_scan = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._shared = SharedSnapshot('disk-usage')
+        self._refresh_marker = self._shared.path and self._shared.path.with_name('disk-usage.refresh')
+        self._measuring = False
+    
+    def start(self):
+        """Start the measuring thread, if it is not running yet"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='disk-usage', daemon=True)
+                self._thread.start()
+    
+    def request_refresh(self):
+        """Measure again soon, without waiting for the interval"""
+        if self._shared.enabled and not self._measuring:
+            try:
+                self._refresh_marker.parent.mkdir(parents=True, exist_ok=True)
+                self._refresh_marker.touch()
+            except OSError as e:
+                print(f"Error requesting a disk usage refresh: {e}")
+        self._wake.set()
+    
+    def _refresh_requested(self, since):
+        """Check if another worker asked for a refresh after the given time"""
+        try:
+            return self._shared.enabled and os.stat(self._refresh_marker).st_mtime > since
+        except OSError:
+            return False
+    
+    def _loop(self):
+        while True:
+            # Walking the volumes is host-wide work, other workers read the shared reports
+            if not is_background_leader():
+                self._wake.wait(self.REFRESH_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._measuring = True
+            measured_at = time.time()
+            try:
+                self.refresh()
+                self.publish()
+            except Exception as e:
+                print(f"Error measuring disk usage: {e}")
+            deadline = time.monotonic() + self.interval
+            while time.monotonic() < deadline and not self._refresh_requested(measured_at):
+                if self._wake.wait(min(self.REFRESH_POLL_SECONDS, max(0, deadline - time.monotonic()))):
+                    break
+            self._wake.clear()
+    
+    def refresh(self):
+        """Measure all nodes and replace the reports"""
+        started = time.perf_counter()
+        now = time.monotonic()
+        full = self._last_full_scan is None or now - self._last_full_scan >= self.full_rescan_interval
+        if full:
+            self._last_full_scan = now
+        
+        # One volume listing for all nodes; Docker's own (slow) measurement only if needed
+        try:
+            client = get_shared_docker_client()
+            volumes = {volume.name: volume.attrs.get('Mountpoint') for volume in client.volumes.list()}
+        except Exception as e:
+            print(f"Error listing Docker volumes: {e}")
+            client, volumes = None, {}
+        docker_sizes = None
+        
+        reports = {}
+        rescanned = 0
+        for config in get_node_configs():
+            host = get_node_host(config)
+            container_name = get_container_name(config['name'], config['type'] == 'system')
+            parts = []
+            
+            log_dir = get_node_log_dir(config)
+            part = {'kind': 'log', 'name': log_dir.name, 'path': str(log_dir), 'source': None,
+                    'bytes': 0, 'files': 0, 'errors': 0}
+            if log_dir.is_dir():
+                usage = self.cache.usage(log_dir, full)
+                rescanned += usage['rescanned']
+                part.update(source='scan', bytes=usage['bytes'], files=usage['files'],
+                            errors=usage['errors'])
+            parts.append(part)
+            
+            task_dir = None
+            for suffix in NODE_VOLUME_SUFFIXES:
+                volume_name = f'{container_name}-{suffix}'
+                part = {'kind': 'volume', 'name': volume_name, 'path': None, 'source': None,
+                        'bytes': None, 'files': None, 'errors': 0}
+                if host != DEFAULT_DOCKER_HOST:
+                    part['error'] = 'Only volumes on the default Docker host are measured'
+                elif volume_name not in volumes:
+                    continue
+                elif volumes[volume_name] and os.access(volumes[volume_name], os.R_OK | os.X_OK):
+                    part['path'] = volumes[volume_name]
+                    usage = self.cache.usage(part['path'], full)
+                    rescanned += usage['rescanned']
+                    part.update(source='scan', bytes=usage['bytes'], files=usage['files'],
+                                errors=usage['errors'])
+                    if suffix == 'vol':
+                        task_dir = self._task_dir_usage(config, part['path'])
+                else:
+                    if docker_sizes is None:
+                        docker_sizes = self._docker_volume_sizes(client)
+                    size = docker_sizes.get(volume_name)
+                    if size is not None and size >= 0:
+                        part.update(source='docker', bytes=size)
+                    else:
+                        part['error'] = 'Volume size not available'
+                parts.append(part)
+            
+            reports[f"{config['type']}/{config['name']}"] = {
+                'name': config['name'],
+                'type': config['type'],
+                'host': host,
+                'total_bytes': sum(part['bytes'] or 0 for part in parts),
+                'parts': parts,
+                'task_dir': task_dir,
+                'measured_at': time.time()
+            }
+        
+        fleet = {
+            'measured_at': time.time(),
+            'scan_seconds': round(time.perf_counter() - started, 3),
+            'full_scan': full,
+            'rescanned_dirs': rescanned,
+            'total_bytes': sum(report['total_bytes'] for report in reports.values()),
+            'filesystems': self._filesystems(client),
+            'nodes': sorted(({'name': report['name'], 'type': report['type'],
+                              'total_bytes': report['total_bytes'],
+                              'task_dir_bytes': (report['task_dir'] or {}).get('bytes')}
+                             for report in reports.values()),
+                            key=lambda node: node['total_bytes'], reverse=True)
+        }
+        with self._lock:
+            self._reports = reports
+            self._fleet = fleet
+    
+    def _task_dir_usage(self, config, data_mountpoint):
+        """Usage of the node's task_dir, a subtree of its data volume (mounted at /mnt/data)"""
+        task_dir = (config['data'] or {}).get('task_dir') or '/mnt/data/tasks'
+        relative = os.path.relpath(task_dir, '/mnt/data')
+        if relative.startswith('..'):
+            return None
+        usage = self.cache.subtree(os.path.join(data_mountpoint, relative))
+        return dict(usage or {'bytes': 0, 'files': 0, 'errors': 0}, path=task_dir)
+    
+    def _docker_volume_sizes(self, client):
+        """Volume sizes from Docker's disk usage report, which measures every volume"""
+        try:
+            return {volume['Name']: (volume.get('UsageData') or {}).get('Size')
+                    for volume in client.df().get('Volumes') or []}
+        except Exception as e:
+            print(f"Error getting Docker disk usage: {e}")
+            return {}
+    
+    def _filesystems(self, client):
+        """Usage of the filesystems holding node data and Docker's data root, where readable"""
+        paths = [str(VANTAGE6_DATA_DIR)]
+        try:
+            paths.append(client.info()['DockerRootDir'])
+        except Exception:
+            pass
+        filesystems = []
+        devices = set()
+        for path in paths:
+            try:
+                device = os.stat(path).st_dev
+                if device in devices:
+                    continue
+                devices.add(device)
+                usage = shutil.disk_usage(path)
+            except OSError:
+                continue
+            filesystems.append({
+                'path': path,
+                'total_bytes': usage.total,
+                'used_bytes': usage.used,
+                'free_bytes': usage.free,
+                'used_percent': round(usage.used / usage.total * 100, 1) if usage.total else None
+            })
+        return filesystems
+    
+    def publish(self):
+        """Share the last reports with the other worker processes"""
+        if self._shared.enabled:
+            with self._lock:
+                data = {'reports': self._reports, 'fleet': self._fleet}
+            self._shared.publish(data)
+    
+    def _state(self):
+        """(reports, fleet) from this process if it measures, else from the elected worker"""
+        if self._shared.enabled and not self._measuring:
+            data = self._shared.load() or {}
+            return data.get('reports') or {}, data.get('fleet')
+        with self._lock:
+            return self._reports, self._fleet
+    
+    def report(self, config):
+        """Get the last disk usage report of a node, or None if not measured yet"""
+        reports, _ = self._state()
+        return reports.get(f"{config['type']}/{config['name']}")
+    
+    def fleet(self):
+        """Get the last fleet-wide disk usage summary, or None if not measured yet"""
+        return self._state()[1]
+
+
+disk_usage_monitor = DiskUsageMonitor(DISK_USAGE_INTERVAL, DISK_USAGE_FULL_RESCAN_INTERVAL)
+
+
+@app.after_request
+def compress_response(response):
+    """Gzip-compress large JSON, log and page responses for clients that accept it"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in GZIP_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or 'gzip' not in request.accept_encodings):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < GZIP_MIN_BYTES:
+        return response
+    
+    response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_duration(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                     endpoint, request.method, response.status_code)
+    return response
+
+
+class LongRequestSlots:
+    """
+    Limit on requests that hold a server thread for long.
+    
+    Log streams, long-polls and bulk actions that wait for their jobs each
+    keep a thread busy for up to minutes, and EventSource reconnects on its
+    own. They share a fixed number of slots per process, so the remaining
+    threads stay free for pages, short API calls and the health check.
+    Requests without a slot are answered right away instead of waiting.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._semaphore = threading.BoundedSemaphore(size)
+    
+    def acquire(self, kind):
+        """
+        Take a slot without blocking.
+        
+        Args:
+            kind: Kind of request, for the declined requests metric
+        
+        Returns:
+            bool: True if a slot was taken and must be released
+        """
+        if self._semaphore.acquire(blocking=False):
+            return True
+        LONG_REQUESTS_DECLINED.inc(kind)
+        return False
+    
+    def release(self):
+        """Give back a slot taken with acquire()"""
+        self._semaphore.release()
+
+
+long_request_slots = LongRequestSlots(LONG_REQUEST_SLOTS)
+
+
+def config_fingerprint(configs):
+    """Fingerprint of node configurations: their files' (mtime, size) as loaded"""
+    return sorted((config['path'], config_registry.signature(config['path'])) for config in configs)
+
+
+def statuses_fingerprint(statuses):
+    """Fingerprint of a get_node_statuses() map, in a process-independent order"""
+    if statuses is None:
+        return None
+    return sorted(statuses.items()), sorted(statuses.unavailable)
+
+
+def conditional_state_response(load_state, build_payload, fingerprint):
+    """
+    JSON response for node state, with conditional GET and long-polling.
+    
+    The ETag is a hash of the state's fingerprint (config file signatures
+    and container states), so every worker process gives the same state the
+    same ETag, and a request with a matching If-None-Match is answered with
+    304 without building the payload. With ?wait=<seconds> the request is
+    held until the ETag differs from the client's (or, without
+    If-None-Match, from the one at the time of the request), up to
+    LONG_POLL_MAX_SECONDS; after that the normal response is returned.
+    When all long request slots are taken the request is answered without
+    waiting, and the client simply polls again.
+    
+    Args:
+        load_state: Callable that loads the current state; loading it is
+                    what makes the registry and watcher notice changes
+        build_payload: Callable turning the loaded state into a response
+                       value, e.g. a JSON-able payload or a (payload, status)
+                       or (payload, status, headers) tuple
+        fingerprint: Callable turning the loaded state into a value for
+                     state_etag(), covering everything the payload shows
+    """
+    # Read the version first, so a change while loading ends the next wait
+    version = state_version.value
+    state = load_state()
+    etag = state_etag(fingerprint(state))
+    initial_etag = etag
+    
+    wait = min(request.args.get('wait', 0, type=float), LONG_POLL_MAX_SECONDS)
+    if wait > 0 and not long_request_slots.acquire('long_poll'):
+        wait = 0
+    deadline = time.monotonic() + wait
+    try:
+        while wait > 0:
+            if request.if_none_match:
+                if not request.if_none_match.contains_weak(etag):
+                    break
+            elif etag != initial_etag:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Config files and (without the events watcher) containers are only
+            # checked when loaded, so re-load now and then while waiting
+            state_version.wait(version, min(remaining, LONG_POLL_RECHECK_INTERVAL))
+            version = state_version.value
+            state = load_state()
+            etag = state_etag(fingerprint(state))
+    finally:
+        if wait > 0:
+            long_request_slots.release()
+    
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = app.make_response(build_payload(state))
+    # Weak, as the same state is sent both plain and gzip-compressed
+    response.set_etag(etag, weak=True)
+    response.last_modified = state_version.changed_at
+    response.cache_control.no_cache = True
+    return response
+
+
+@app.route('/')
+def index():
+    """Dashboard showing overview of all nodes"""
+    configs = get_node_configs()
+    
+    # One container listing serves both the status column and the running table
+    containers = list_node_containers()
+    running_nodes = get_running_nodes(containers)
+    resolve_node_statuses(configs, get_node_statuses(containers))
+    
+    # Image readiness comes from the background prefetcher, never blocks the page
+    image_prefetcher.start()
+    server_prober.start()
+    probe_histories = server_prober.histories()
+    image_states = image_prefetcher.states()
+    for config in configs:
+        config['image'], config['image_state'] = image_prefetcher.node_image_state(config, image_states)
+        config['server_probe'] = server_prober.node_summary(config, probe_histories)
+        if config['server_probe']:
+            config['server_probe']['sparkline'] = latency_sparkline(config['server_probe']['history'])
+    
+    return render_template('index.html', 
+                         configs=configs, 
+                         running_nodes=running_nodes,
+                         total_configs=len(configs),
+                         running_count=len([c for c in configs if c['status'] == 'running']))
+
+
+@app.route('/nodes')
+def list_nodes():
+    """List all node configurations"""
+    configs = get_node_configs()
+    
+    # Add status to each config
+    resolve_node_statuses(configs, get_node_statuses())
+    
+    return render_template('nodes.html', configs=configs)
+
+
+def get_private_key_path(name, filename=None):
+    """
+    Get the path a node's private key is saved at, without saving it.
+    
+    Args:
+        name: Node name, used as file name prefix
+        filename: Name of an uploaded key file, or None for a generated key
+    
+    Returns:
+        str: Path of the key relative to the config directory's parent, as
+        stored in the node configuration
+    """
+    # Node name prefix to avoid conflicts; relative path in the config for portability
+    private_key_path = VANTAGE6_CONFIG_DIR / 'private_keys' / (
+        f"{name}_{filename}" if filename else f"{name}_private_key.pem")
+    return str(private_key_path.relative_to(VANTAGE6_CONFIG_DIR.parent))
+
+
+def save_private_key(name, private_key_pem, filename=None):
+    """
+    Save a node's private key in the private_keys directory.
+    
+    Args:
+        name: Node name, used as file name prefix
+        private_key_pem: Private key in PEM format, as text or as the bytes
+            of an uploaded file, which are written unchanged
+        filename: Name of an uploaded key file, or None for a generated key
+    
+    Returns:
+        str: Path of the key relative to the config directory's parent, as
+        stored in the node configuration
+    """
+    relative_path = get_private_key_path(name, filename)
+    private_key_path = VANTAGE6_CONFIG_DIR.parent / relative_path
+    private_key_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Read-only for owner
+    write_file_atomic(private_key_path, private_key_pem, mode=0o600)
+    os.chmod(str(private_key_path), 0o600)
+    return relative_path
+
+
+def build_node_config(name, server_url, api_key, port=None, api_path='/api',
+                      task_dir='/mnt/data/tasks', databases=None, private_key_path=None,
+                      docker_host=None):
+    """
+    Build the configuration of a new node.
+    
+    Args:
+        name: Node name
+        server_url: URL of the vantage6 server
+        api_key: API key of the node
+        port: Server port, or None for the default
+        api_path: API path on the server
+        task_dir: Directory for task data
+        databases: List of {'label', 'uri', 'type'} dicts
+        private_key_path: Path of the node's private key, or None to
+            disable encryption
+        docker_host: Docker host to run the node on, or None for the default
+    
+    Returns:
+        dict: Node configuration
+    
+    Raises:
+        ValueError: If docker_host is not a configured Docker host
+    """
+    config = {
+        'api_key': api_key,
+        'server_url': server_url,
+        'port': int(port) if port else None,
+        'api_path': api_path,
+        'task_dir': task_dir,
+        'databases': databases or [],
+        'logging': {
+            'backup_count': 5,
+            'datefmt': '%Y-%m-%d %H:%M:%S',
+            'file': f'{name}.log',
+            'format': DEFAULT_LOG_FORMAT,
+            'level': 'INFO',
+            'max_size': 1024,
+            'use_console': True,
+            'loggers': [
+                {'name': 'urllib3', 'level': 'warning'},
+                {'name': 'requests', 'level': 'warning'},
+                {'name': 'engineio.client', 'level': 'warning'},
+                {'name': 'docker.utils.config', 'level': 'warning'},
+                {'name': 'docker.auth', 'level': 'warning'}
+            ]
+        },
+        'encryption': {
+            'enabled': private_key_path is not None,
+            'private_key': private_key_path
+        }
+    }
+    if docker_host and docker_host != DEFAULT_DOCKER_HOST:
+        if docker_host not in DOCKER_HOSTS:
+            raise ValueError(f'Unknown Docker host: {docker_host}')
+        config['docker_host'] = docker_host
+    return config
+
+
+def save_node_config(name, config):
+    """
+    Atomically write a node configuration to the user config directory.
     
-    # Add status to each config
-    for config in configs:
-        status = get_node_status(config['name'], config['type'] == 'system')
-        config['status'] = status
+    Args:
+        name: Node name
+        config: Node configuration
     
-    return render_template('nodes.html', configs=configs)
+    Returns:
+        Path: Path of the written file
+    """
+    VANTAGE6_CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+    config_file = VANTAGE6_CONFIG_DIR / f'{name}.yaml'
+    write_file_atomic(config_file, yaml.dump(config, default_flow_style=False))
+    config_registry.invalidate(config_file)
+    return config_file
 
 
 @app.route('/nodes/new', methods=['GET', 'POST'])
@@ -325,7 +3254,8 @@ def new_node():
             
             # Encryption configuration
             encryption_enabled = request.form.get('encryption_enabled') == 'on'
-            private_key_path = None
+            private_key = None
+            filename = None
             
             if encryption_enabled:
                 # Check if key was generated or uploaded
@@ -333,28 +3263,8 @@ def new_node():
                 
                 if key_source == 'generate':
                     # Handle generated private key
-                    generated_private_key = request.form.get('generated_private_key')
-                    if generated_private_key:
-                        # Create a private_keys subdirectory if it doesn't exist
-                        keys_dir = VANTAGE6_CONFIG_DIR / 'private_keys'
-                        keys_dir.mkdir(parents=True, exist_ok=True)
-                        
-                        # Save with node name
-                        safe_filename = f"{name}_private_key.pem"
-                        private_key_path = keys_dir / safe_filename
-                        
-                        # Write the generated key to file
-                        with open(private_key_path, 'w') as f:
-                            f.write(generated_private_key)
-                        
-                        # Set proper permissions (read-only for owner)
-                        os.chmod(str(private_key_path), 0o600)
-                        
-                        # Store relative path in config for portability
-                        private_key_path = str(private_key_path.relative_to(VANTAGE6_CONFIG_DIR.parent))
-                        
-                        flash(f'Generated private key saved securely', 'success')
-                    else:
+                    private_key = request.form.get('generated_private_key')
+                    if not private_key:
                         flash('Encryption enabled but no private key was generated', 'error')
                         encryption_enabled = False
                 else:
@@ -362,25 +3272,9 @@ def new_node():
                     if 'private_key_file' in request.files:
                         private_key_file = request.files['private_key_file']
                         if private_key_file and private_key_file.filename:
-                            # Secure the filename and save to config directory
+                            # Secure the filename; the key is stored as uploaded
                             filename = secure_filename(private_key_file.filename)
-                            
-                            # Create a private_keys subdirectory if it doesn't exist
-                            keys_dir = VANTAGE6_CONFIG_DIR / 'private_keys'
-                            keys_dir.mkdir(parents=True, exist_ok=True)
-                            
-                            # Save with node name prefix to avoid conflicts
-                            safe_filename = f"{name}_{filename}"
-                            private_key_path = keys_dir / safe_filename
-                            private_key_file.save(str(private_key_path))
-                            
-                            # Set proper permissions (read-only for owner)
-                            os.chmod(str(private_key_path), 0o600)
-                            
-                            # Store relative path in config for portability
-                            private_key_path = str(private_key_path.relative_to(VANTAGE6_CONFIG_DIR.parent))
-                            
-                            flash(f'Private key uploaded and saved securely', 'success')
+                            private_key = private_key_file.read()
                         else:
                             flash('Encryption enabled but no private key file provided', 'error')
                             encryption_enabled = False
@@ -388,44 +3282,19 @@ def new_node():
                         flash('Encryption enabled but no private key file uploaded', 'error')
                         encryption_enabled = False
             
-            # Build configuration
-            config = {
-                'api_key': api_key,
-                'server_url': server_url,
-                'port': int(port) if port else None,
-                'api_path': api_path,
-                'task_dir': task_dir,
-                'databases': [{
-                    'label': db_label,
-                    'uri': db_uri,
-                    'type': db_type
-                }],
-                'logging': {
-                    'backup_count': 5,
-                    'datefmt': '%Y-%m-%d %H:%M:%S',
-                    'file': f'{name}.log',
-                    'format': '%(asctime)s - %(name)-14s - %(levelname)-8s - %(message)s',
-                    'level': 'INFO',
-                    'max_size': 1024,
-                    'use_console': True,
-                    'loggers': [
-                        {'name': 'urllib3', 'level': 'warning'},
-                        {'name': 'requests', 'level': 'warning'},
-                        {'name': 'engineio.client', 'level': 'warning'},
-                        {'name': 'docker.utils.config', 'level': 'warning'},
-                        {'name': 'docker.auth', 'level': 'warning'}
-                    ]
-                },
-                'encryption': {
-                    'enabled': encryption_enabled,
-                    'private_key': private_key_path if encryption_enabled else None
-                }
-            }
-            
-            # Save configuration
-            config_file = VANTAGE6_CONFIG_DIR / f'{name}.yaml'
-            with open(config_file, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False)
+            # Build the configuration first, so an invalid form leaves no key behind
+            config = build_node_config(
+                name, server_url, api_key, port=port, api_path=api_path, task_dir=task_dir,
+                databases=[{'label': db_label, 'uri': db_uri, 'type': db_type}],
+                private_key_path=get_private_key_path(name, filename) if encryption_enabled else None,
+                docker_host=request.form.get('docker_host'))
+            if encryption_enabled:
+                save_private_key(name, private_key, filename)
+                if filename:
+                    flash(f'Private key uploaded and saved securely', 'success')
+                else:
+                    flash(f'Generated private key saved securely', 'success')
+            save_node_config(name, config)
             
             if encryption_enabled:
                 flash(f'Node configuration "{name}" created successfully with encryption enabled!', 'success')
@@ -436,80 +3305,72 @@ def new_node():
         except Exception as e:
             flash(f'Error creating configuration: {str(e)}', 'error')
     
-    return render_template('new_node.html')
+    # Have keys ready by the time the form asks for one
+    rsa_key_pool.start()
+    return render_template('new_node.html', docker_hosts=list(DOCKER_HOSTS))
 
 
 @app.route('/nodes/<name>')
 def view_node(name):
     """View details of a specific node"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+    config = get_node_config(name)
     
     if not config:
         flash(f'Node configuration "{name}" not found', 'error')
         return redirect(url_for('list_nodes'))
     
     # Get node status and logs
-    status = get_node_status(name, config['type'] == 'system')
+    config['host'] = get_node_host(config)
+    status = get_node_status(name, config['type'] == 'system', config['host'])
     config['status'] = status
     
     # Get container details if running
     container_info = None
     if status == 'running':
-        client = get_docker_client()
-        if client:
-            postfix = "system" if config['type'] == 'system' else "user"
-            container_name = f"{APPNAME}-{name}-{postfix}"
-            try:
-                container = client.containers.get(container_name)
+        container_name = get_container_name(name, config['type'] == 'system')
+        try:
+            container = docker_lookups().container(container_name, config['host'])
+            if container:
                 container_info = {
                     'id': container.id[:12],
-                    'image': container.image.tags[0] if container.image.tags else 'unknown',
+                    'image': get_image_name(container.attrs['Config'].get('Image'),
+                                            container.attrs.get('Image')),
                     'created': container.attrs['Created'],
                     'ports': container.ports,
                     'labels': container.labels
                 }
-            except Exception as e:
-                print(f"Error getting container info: {e}")
+        except Exception as e:
+            print(f"Error getting container info: {e}")
     
-    return render_template('view_node.html', config=config, container_info=container_info)
+    # Show progress of a start/stop/restart job that was just submitted
+    job = job_manager.describe(request.args.get('job', ''))
+    
+    return render_template('view_node.html', config=config, container_info=container_info,
+                           job=job)
 
 
-@app.route('/nodes/<name>/start', methods=['POST'])
-def start_node(name):
+def run_start_node(job, config, image=None):
     """Start a node container following official vantage6 implementation"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
-    
-    if not config:
-        flash(f'Node configuration "{name}" not found', 'error')
-        return redirect(url_for('list_nodes'))
-    
-    client = get_docker_client()
-    if not client:
-        return redirect(url_for('view_node', name=name))
+    host = get_node_host(config)
+    client = get_shared_docker_client(host)
+    lookups = DockerLookups()
+    name = config['name']
+    container_name = get_container_name(name, config['type'] == 'system')
     
-    try:
-        postfix = "system" if config['type'] == 'system' else "user"
-        container_name = f"{APPNAME}-{name}-{postfix}"
-        
-        # Check if already running
-        try:
-            existing = client.containers.get(container_name)
+    with job.step('check-existing'):
+        # None if the container doesn't exist, it is created below
+        existing = lookups.container(container_name, host)
+        if existing is not None:
             if existing.status == 'running':
-                flash(f'Node "{name}" is already running', 'warning')
-                return redirect(url_for('view_node', name=name))
+                job.message(f'Node "{name}" is already running', 'warning')
+                return {'container': existing.id[:12], 'already_running': True}
             else:
                 # Remove the existing stopped container and recreate it
                 existing.remove()
-                flash(f'Removed existing stopped container, creating new one...', 'info')
-        except docker.errors.NotFound:
-            # Container doesn't exist, will create below
-            pass
-        
-        # Determine image version from server if not specified
-        image = request.form.get('image')
-        
+                job.message(f'Removed existing stopped container, creating new one...', 'info')
+    
+    # Determine image version from server if not specified
+    with job.step('resolve-image'):
         if not image:
             # Get server version to determine appropriate node image
             server_url = config['data'].get('server_url')
@@ -519,64 +3380,68 @@ def start_node(name):
                 version, error = get_server_version(server_url, api_path)
                 if version:
                     image = get_node_image_for_version(version)
-                    flash(f'Using node image for server version {version}', 'info')
+                    job.message(f'Using node image for server version {version}', 'info')
                 else:
-                    image = 'harbor2.vantage6.ai/infrastructure/node:latest'
-                    flash(f'Could not detect server version ({error}). Using latest node image.', 'warning')
+                    image = DEFAULT_NODE_IMAGE
+                    job.message(f'Could not detect server version ({error}). Using latest node image.', 'warning')
             else:
-                image = 'harbor2.vantage6.ai/infrastructure/node:latest'
-                flash('No server URL configured. Using latest node image.', 'warning')
-        
-        # Create Docker volumes (similar to official implementation)
-        # These volumes persist data, VPN config, SSH config, and Squid proxy config
+                image = DEFAULT_NODE_IMAGE
+                job.message('No server URL configured. Using latest node image.', 'warning')
+    
+    # Pull explicitly instead of letting containers.run() do it, so progress is visible
+    with job.step('pull-image'):
+        # The image index covers the default host; other hosts are asked for the image directly
+        if host == DEFAULT_DOCKER_HOST:
+            present = image_index.has(image)
+        else:
+            present = lookups.image(image, host) is not None
+        if not present:
+            job.message(f'Pulling image {image}...', 'info')
+            pull_image(client, image, job)
+            if host == DEFAULT_DOCKER_HOST:
+                image_index.add(image)
+    
+    # Create Docker volumes (similar to official implementation)
+    # These volumes persist data, VPN config, SSH config, and Squid proxy config
+    with job.step('create-volumes'):
         data_volume_name = f"{container_name}-vol"
         vpn_volume_name = f"{container_name}-vpn-vol"
         ssh_volume_name = f"{container_name}-ssh-vol"
         squid_volume_name = f"{container_name}-squid-vol"
         
         # Create volumes if they don't exist
-        try:
-            data_volume = client.volumes.get(data_volume_name)
-        except docker.errors.NotFound:
+        data_volume = lookups.volume(data_volume_name, host)
+        if data_volume is None:
             data_volume = client.volumes.create(data_volume_name)
-            flash(f'Created data volume: {data_volume_name}', 'info')
+            job.message(f'Created data volume: {data_volume_name}', 'info')
         
-        try:
-            vpn_volume = client.volumes.get(vpn_volume_name)
-        except docker.errors.NotFound:
+        vpn_volume = lookups.volume(vpn_volume_name, host)
+        if vpn_volume is None:
             vpn_volume = client.volumes.create(vpn_volume_name)
-            flash(f'Created VPN volume: {vpn_volume_name}', 'info')
+            job.message(f'Created VPN volume: {vpn_volume_name}', 'info')
         
-        try:
-            ssh_volume = client.volumes.get(ssh_volume_name)
-        except docker.errors.NotFound:
+        ssh_volume = lookups.volume(ssh_volume_name, host)
+        if ssh_volume is None:
             ssh_volume = client.volumes.create(ssh_volume_name)
-            flash(f'Created SSH volume: {ssh_volume_name}', 'info')
+            job.message(f'Created SSH volume: {ssh_volume_name}', 'info')
         
-        try:
-            squid_volume = client.volumes.get(squid_volume_name)
-        except docker.errors.NotFound:
+        squid_volume = lookups.volume(squid_volume_name, host)
+        if squid_volume is None:
             squid_volume = client.volumes.create(squid_volume_name)
-            flash(f'Created Squid volume: {squid_volume_name}', 'info')
-        
+            job.message(f'Created Squid volume: {squid_volume_name}', 'info')
+    
+    with job.step('prepare-mounts'):
         # Convert container path to host path for config directory
         config_path = Path(config['path'])
         config_dir_host_path = container_path_to_host_path(str(config_path.parent))
         
         if not config_dir_host_path:
-            flash(f'Error: Cannot mount config directory - path not in mounted volume', 'error')
-            return redirect(url_for('view_node', name=name))
-        
-        # Get log directory from config
-        log_dir_path = config['data'].get('logging', {}).get('file')
-        if log_dir_path:
-            log_dir = Path(log_dir_path).parent
-            log_dir_host_path = container_path_to_host_path(str(log_dir))
-        else:
-            # Default log directory
-            log_dir = VANTAGE6_DATA_DIR / name / 'log'
-            log_dir.mkdir(parents=True, exist_ok=True)
-            log_dir_host_path = container_path_to_host_path(str(log_dir))
+            raise RuntimeError('Cannot mount config directory - path not in mounted volume')
+        
+        # Get log directory from config; relative log file names use the default directory
+        log_dir = get_node_log_dir(config)
+        log_dir.mkdir(parents=True, exist_ok=True)
+        log_dir_host_path = container_path_to_host_path(str(log_dir))
         
         # Build volume mounts similar to official vantage6 implementation
         # Format: host_path:container_path or volume_name:container_path
@@ -612,8 +3477,9 @@ def start_node(name):
         # This is the critical missing piece - the container needs a command!
         system_folders_option = "--system" if config['type'] == 'system' else "--user"
         cmd = f"vnode-local start --name {name} --config /mnt/config/{config_path.name} --dockerized {system_folders_option}"
-        
-        # Create and start the container
+    
+    # Create and start the container
+    with job.step('create-container'):
         container = client.containers.run(
             image,
             command=cmd,
@@ -629,119 +3495,254 @@ def start_node(name):
             auto_remove=False,
             tty=True
         )
-        
-        flash(f'Node "{name}" started successfully', 'success')
-    
-    except Exception as e:
-        import sys
-        print(f"ERROR starting node: {str(e)}", file=sys.stderr, flush=True)
-        import traceback
-        traceback.print_exc()
-        flash(f'Error starting node: {str(e)}', 'error')
     
-    return redirect(url_for('view_node', name=name))
+    job.message(f'Node "{name}" started successfully', 'success')
+    return {'container': container.id[:12], 'image': image}
 
 
-@app.route('/nodes/<name>/stop', methods=['POST'])
-def stop_node(name):
+def run_stop_node(job, config):
     """Stop a running node"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+    client = get_shared_docker_client(get_node_host(config))
+    container_name = get_container_name(config['name'], config['type'] == 'system')
+    
+    with job.step('stop-container'):
+        try:
+            container = client.containers.get(container_name)
+        except docker.errors.NotFound:
+            job.message(f'Node "{config["name"]}" is not running', 'warning')
+            return {'stopped': False}
+        container.stop()
+    
+    job.message(f'Node "{config["name"]}" stopped successfully', 'success')
+    return {'stopped': True}
+
+
+def run_restart_node(job, config):
+    """Restart a node"""
+    client = get_shared_docker_client(get_node_host(config))
+    container_name = get_container_name(config['name'], config['type'] == 'system')
+    
+    with job.step('restart-container'):
+        try:
+            container = client.containers.get(container_name)
+        except docker.errors.NotFound:
+            job.message(f'Node "{config["name"]}" is not running', 'warning')
+            return {'restarted': False}
+        container.restart()
+    
+    job.message(f'Node "{config["name"]}" restarted successfully', 'success')
+    return {'restarted': True}
+
+
+NODE_ACTIONS = {
+    'start': run_start_node,
+    'stop': run_stop_node,
+    'restart': run_restart_node,
+}
+
+
+def submit_node_action(action, config, *args):
+    """Queue a start/stop/restart job for a node and return the Job"""
+    return job_manager.submit(action, config['name'], NODE_ACTIONS[action], config, *args)
+
+
+@app.route('/nodes/<name>/start', methods=['POST'])
+def start_node(name):
+    """Start a node container in the background"""
+    config = get_node_config(name)
     
     if not config:
         flash(f'Node configuration "{name}" not found', 'error')
         return redirect(url_for('list_nodes'))
     
-    client = get_docker_client()
-    if not client:
-        return redirect(url_for('view_node', name=name))
-    
-    try:
-        postfix = "system" if config['type'] == 'system' else "user"
-        container_name = f"{APPNAME}-{name}-{postfix}"
-        
-        container = client.containers.get(container_name)
-        container.stop()
-        flash(f'Node "{name}" stopped successfully', 'success')
+    job = submit_node_action('start', config, request.form.get('image') or None)
+    flash(f'Starting node "{name}"...', 'info')
+    return redirect(url_for('view_node', name=name, job=job.id))
+
+
+@app.route('/nodes/<name>/stop', methods=['POST'])
+def stop_node(name):
+    """Stop a running node in the background"""
+    config = get_node_config(name)
     
-    except docker.errors.NotFound:
-        flash(f'Node "{name}" is not running', 'warning')
-    except Exception as e:
-        flash(f'Error stopping node: {str(e)}', 'error')
+    if not config:
+        flash(f'Node configuration "{name}" not found', 'error')
+        return redirect(url_for('list_nodes'))
     
-    return redirect(url_for('view_node', name=name))
+    job = submit_node_action('stop', config)
+    flash(f'Stopping node "{name}"...', 'info')
+    return redirect(url_for('view_node', name=name, job=job.id))
 
 
 @app.route('/nodes/<name>/restart', methods=['POST'])
 def restart_node(name):
-    """Restart a node"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+    """Restart a node in the background"""
+    config = get_node_config(name)
     
     if not config:
         flash(f'Node configuration "{name}" not found', 'error')
         return redirect(url_for('list_nodes'))
     
-    client = get_docker_client()
-    if not client:
-        return redirect(url_for('view_node', name=name))
+    job = submit_node_action('restart', config)
+    flash(f'Restarting node "{name}"...', 'info')
+    return redirect(url_for('view_node', name=name, job=job.id))
+
+
+@app.route('/nodes/<name>/logs')
+def view_logs(name):
+    """
+    View logs of a node, answered from its in-memory log buffer.
+    
+    Query parameters: level (minimum level, e.g. WARNING), grep (substring),
+    since (log cursor) and limit (number of lines).
+    """
+    config = get_node_config(name)
     
+    if not config:
+        return jsonify({'error': 'Node not found'}), 404
+    
+    level = request.args.get('level')
+    if level:
+        level = LOG_LEVELS.get(level.upper())
+        if level is None:
+            return jsonify({'error': f'Unknown log level, use one of {", ".join(LOG_LEVELS)}'}), 400
+    since = request.args.get('since')
+    if since:
+        since = parse_log_cursor(since)
+        if since is None:
+            return jsonify({'error': 'Invalid log cursor'}), 400
     try:
-        postfix = "system" if config['type'] == 'system' else "user"
-        container_name = f"{APPNAME}-{name}-{postfix}"
+        limit = max(1, int(request.args.get('limit', LOG_TAIL_LINES)))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    log_buffers.start()
+    host = get_node_host(config)
+    container_name = get_container_name(name, config['type'] == 'system')
+    log_format = (config['data'] or {}).get('logging', {}).get('format')
+    buffer = log_buffers.get(container_name) if host == DEFAULT_DOCKER_HOST else None
+    
+    if buffer is None:
+        client = get_docker_client(host)
+        if not client:
+            return jsonify({'error': 'Docker not available'}), 500
         
-        container = client.containers.get(container_name)
-        container.restart()
-        flash(f'Node "{name}" restarted successfully', 'success')
+        try:
+            container = docker_lookups().container(container_name, host)
+            if container is None:
+                return jsonify({'error': 'Container not running'}), 404
+            if host == DEFAULT_DOCKER_HOST:
+                buffer = log_buffers.load(container, log_format)
+            else:
+                # Only nodes on the default host are buffered, read the others on demand
+                buffer = LogRingBuffer(log_format, LOG_BUFFER_NODE_BYTES)
+                output = container.logs(timestamps=True, tail=LOG_BUFFER_INITIAL_LINES)
+                for line in iter_log_lines([output]):
+                    buffer.append(*split_log_timestamp(line))
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
     
-    except docker.errors.NotFound:
-        flash(f'Node "{name}" is not running', 'warning')
-    except Exception as e:
-        flash(f'Error restarting node: {str(e)}', 'error')
+    lines = buffer.query(level=level, grep=request.args.get('grep'), since=since, limit=limit)
+    return jsonify({
+        'logs': ''.join(line + '\n' for _, _, line in lines),
+        'lines': [{
+            'cursor': f'{stamp[0]}.{stamp[1]:09d}' if stamp else None,
+            'level': LOG_LEVEL_NAMES.get(line_level),
+            'line': line
+        } for stamp, line_level, line in lines],
+        'cursor': f'{buffer.cursor[0]}.{buffer.cursor[1]:09d}' if buffer.cursor else None
+    })
+
+
+@app.route('/nodes/<name>/logs/history')
+def log_history(name):
+    """
+    Page backwards through the log files of a node, also when it is stopped.
+    
+    Reads the node's log file and its rotated backups from disk. Without a
+    cursor the newest lines are returned; pass the returned cursor to get
+    the page before them. Query parameters: cursor and limit.
+    """
+    config = get_node_config(name)
+    
+    if not config:
+        return jsonify({'error': 'Node not found'}), 404
+    
+    cursor = request.args.get('cursor')
+    if cursor:
+        cursor = parse_log_file_cursor(cursor)
+        if cursor is None:
+            return jsonify({'error': 'Invalid log cursor'}), 400
+    try:
+        limit = min(max(1, int(request.args.get('limit', LOG_TAIL_LINES))), LOG_HISTORY_MAX_LINES)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    paths = get_node_log_files(config)
+    if not paths:
+        return jsonify({'error': 'No log files found'}), 404
+    
+    try:
+        lines, cursor = read_log_history(paths, cursor, limit)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 410
     
-    return redirect(url_for('view_node', name=name))
+    return jsonify({
+        'name': name,
+        'files': [path.name for path in paths],
+        'lines': lines,
+        'cursor': format_log_file_cursor(cursor) if cursor else None
+    })
 
 
-@app.route('/nodes/<name>/logs')
-def view_logs(name):
-    """View logs of a running node"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+@app.route('/nodes/<name>/logs/stream')
+def stream_logs(name):
+    """Stream logs of a running node as Server-Sent Events"""
+    config = get_node_config(name)
     
     if not config:
         return jsonify({'error': 'Node not found'}), 404
     
-    client = get_docker_client()
-    if not client:
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('since')
+    if cursor:
+        cursor = parse_log_cursor(cursor)
+        if cursor is None:
+            return jsonify({'error': 'Invalid log cursor'}), 400
+    
+    host = get_node_host(config)
+    if not get_docker_client(host):
         return jsonify({'error': 'Docker not available'}), 500
     
     try:
-        postfix = "system" if config['type'] == 'system' else "user"
-        container_name = f"{APPNAME}-{name}-{postfix}"
-        
-        container = client.containers.get(container_name)
-        logs = container.logs(tail=100).decode('utf-8')
-        
-        return jsonify({'logs': logs})
-    
-    except docker.errors.NotFound:
-        return jsonify({'error': 'Container not running'}), 404
+        container_name = get_container_name(name, config['type'] == 'system')
+        container = docker_lookups().container(container_name, host)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    if container is None:
+        return jsonify({'error': 'Container not running'}), 404
+    
+    if not long_request_slots.acquire('log_stream'):
+        # EventSource gives up on an error status; the page then polls instead
+        return jsonify({'error': 'Too many open log streams'}), 503
+    response = Response(stream_with_context(stream_container_logs(container, cursor)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also runs when the client goes away before the stream started
+    response.call_on_close(long_request_slots.release)
+    return response
 
 
 @app.route('/nodes/<name>/delete', methods=['POST'])
 def delete_node(name):
     """Delete a node configuration"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+    config = get_node_config(name)
     
     if not config:
         flash(f'Node configuration "{name}" not found', 'error')
         return redirect(url_for('list_nodes'))
     
     # Check if node is running
-    status = get_node_status(name, config['type'] == 'system')
+    status = get_node_status(name, config['type'] == 'system', get_node_host(config))
     if status == 'running':
         flash(f'Cannot delete running node. Please stop it first.', 'error')
         return redirect(url_for('view_node', name=name))
@@ -749,6 +3750,7 @@ def delete_node(name):
     try:
         # Delete configuration file
         os.remove(config['path'])
+        config_registry.invalidate(config['path'])
         flash(f'Node configuration "{name}" deleted successfully', 'success')
     except Exception as e:
         flash(f'Error deleting configuration: {str(e)}', 'error')
@@ -758,25 +3760,439 @@ def delete_node(name):
 
 @app.route('/api/nodes')
 def api_list_nodes():
-    """API endpoint to list all nodes"""
-    configs = get_node_configs()
-    for config in configs:
-        status = get_node_status(config['name'], config['type'] == 'system')
-        config['status'] = status
-    return jsonify(configs)
+    """
+    API endpoint to list all nodes
+    
+    Query parameters:
+        type: Only 'user' or 'system' nodes
+        status: Only nodes in this status, e.g. 'running' or 'stopped'
+        prefix: Only nodes whose name starts with this prefix
+        fields: Comma-separated fields to return, e.g. 'name,status'; all
+                but 'data' by default, as it holds the node's API key
+        limit: Page size; the X-Next-Cursor header (and a Link header)
+               points to the next page
+        cursor: Continue after the node this cursor was issued for
+    
+    Supports If-None-Match (304 when nothing changed) and ?wait=<seconds>
+    to long-poll for the next change.
+    """
+    node_type = request.args.get('type')
+    status = request.args.get('status')
+    prefix = request.args.get('prefix', '')
+    
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    fields = fields or DEFAULT_NODE_FIELDS
+    unknown_fields = set(fields) - set(NODE_FIELDS)
+    if unknown_fields:
+        return jsonify({'error': f'Unknown fields {", ".join(sorted(unknown_fields))}, '
+                                 f'use any of {", ".join(NODE_FIELDS)}'}), 400
+    
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        cursor = parse_node_cursor(cursor)
+        if cursor is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    def load_state():
+        return get_node_configs(), get_node_statuses()
+    
+    def build_payload(state):
+        configs, statuses = state
+        if limit is not None or cursor is not None:
+            configs.sort(key=node_sort_key)
+        configs = [config for config in configs
+                   if config['name'].startswith(prefix)
+                   and (not node_type or config['type'] == node_type)
+                   and (cursor is None or node_sort_key(config) > cursor)]
+        resolve_node_statuses(configs, statuses)
+        if status:
+            configs = [config for config in configs if config['status'] == status]
+        
+        headers = {}
+        if limit is not None and len(configs) > limit:
+            configs = configs[:limit]
+            next_cursor = f"{configs[-1]['type']}/{configs[-1]['name']}"
+            headers['X-Next-Cursor'] = next_cursor
+            next_url = url_for('api_list_nodes', **dict(request.args.items(), cursor=next_cursor))
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        
+        configs = [{field: config.get(field) for field in fields} for config in configs]
+        return configs, 200, headers
+    
+    def fingerprint(state):
+        configs, statuses = state
+        return config_fingerprint(configs), statuses_fingerprint(statuses)
+    
+    return conditional_state_response(load_state, build_payload, fingerprint)
+
+
+# Fields of a node in /api/nodes, the ones returned without fields=, and the order nodes are listed in
+NODE_FIELDS = ('name', 'type', 'status', 'host', 'path', 'data')
+DEFAULT_NODE_FIELDS = ('name', 'type', 'status', 'host', 'path')
+NODE_TYPE_ORDER = {'user': 0, 'system': 1}
+
+
+def node_sort_key(config):
+    """Sort key of a node in listings: user nodes first, then by name"""
+    return NODE_TYPE_ORDER.get(config['type'], len(NODE_TYPE_ORDER)), config['name']
+
+
+def parse_node_cursor(cursor):
+    """
+    Parse a node listing cursor of the form '<type>/<name>'.
+    
+    Returns:
+        tuple: The node_sort_key() to continue after, or None if invalid
+    """
+    node_type, _, name = cursor.partition('/')
+    if node_type not in NODE_TYPE_ORDER or not name:
+        return None
+    return node_sort_key({'type': node_type, 'name': name})
 
 
 @app.route('/api/nodes/<name>/status')
 def api_node_status(name):
-    """API endpoint to get node status"""
-    configs = get_node_configs()
-    config = next((c for c in configs if c['name'] == name), None)
+    """
+    API endpoint to get node status
+    
+    Supports If-None-Match (304 when nothing changed) and ?wait=<seconds>
+    to long-poll for the next change.
+    """
+    def load_state():
+        config = get_node_config(name)
+        if not config:
+            return None, None
+        return config, get_node_status(name, config['type'] == 'system', get_node_host(config))
+    
+    def build_payload(state):
+        config, status = state
+        if config is None:
+            return {'error': 'Node not found'}, 404
+        return {'name': name, 'status': status}
+    
+    def fingerprint(state):
+        config, status = state
+        return config_fingerprint([config] if config else []), status
+    
+    return conditional_state_response(load_state, build_payload, fingerprint)
+
+
+@app.route('/api/nodes/<name>/stats')
+def api_node_stats(name):
+    """
+    API endpoint with the resource usage history of a node and its algorithms.
+    
+    Answered from the background stats sampler; use ?points=<n> to limit the
+    number of points per container.
+    """
+    config = get_node_config(name)
+    if not config:
+        return jsonify({'error': 'Node not found'}), 404
+    
+    try:
+        limit = int(request.args.get('points', 0))
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        return jsonify({'error': 'points must be a non-negative integer'}), 400
+    limit = limit or None
+    
+    stats_sampler.start()
+    container_name = get_container_name(name, config['type'] == 'system')
+    series = stats_sampler.get(container_name)
+    return jsonify({
+        'name': name,
+        'interval': STATS_SAMPLE_INTERVAL,
+        'node': series.to_list(limit) if series else [],
+        'algorithms': {algorithm.container_name: algorithm.to_list(limit)
+                       for algorithm in stats_sampler.algorithm_series(name)}
+    })
+
+
+@app.route('/api/nodes/<name>/disk')
+def api_node_disk(name):
+    """
+    API endpoint with the disk usage of a node's log directory and volumes.
+    
+    Served from the background measurement; ?refresh=1 asks for a new
+    measurement without waiting for it.
+    """
+    config = get_node_config(name)
+    if not config:
+        return jsonify({'error': 'Node not found'}), 404
+    
+    disk_usage_monitor.start()
+    if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        disk_usage_monitor.request_refresh()
+    report = disk_usage_monitor.report(config)
+    if report is None:
+        return jsonify({'name': name, 'status': 'pending'}), 202
+    return jsonify(report)
+
+
+@app.route('/api/disk')
+def api_disk():
+    """API endpoint with the disk usage of all nodes, largest first, and filesystem usage"""
+    disk_usage_monitor.start()
+    if request.args.get('refresh', '').lower() in ('1', 'true', 'yes'):
+        disk_usage_monitor.request_refresh()
+    fleet = disk_usage_monitor.fleet()
+    if fleet is None:
+        return jsonify({'status': 'pending'}), 202
+    return jsonify(fleet)
+
+
+@app.route('/api/nodes/<name>/<action>', methods=['POST'])
+def api_node_action(name, action):
+    """API endpoint to start, stop or restart a node as a background job"""
+    if action not in NODE_ACTIONS:
+        return jsonify({'error': f'Unknown action "{action}"'}), 404
     
+    config = get_node_config(name)
     if not config:
         return jsonify({'error': 'Node not found'}), 404
     
-    status = get_node_status(name, config['type'] == 'system')
-    return jsonify({'name': name, 'status': status})
+    args = []
+    if action == 'start':
+        payload = request.get_json(silent=True) or {}
+        args.append(payload.get('image') or request.form.get('image') or None)
+    
+    job = submit_node_action(action, config, *args)
+    return jsonify({'job_id': job.id, 'url': url_for('api_job', job_id=job.id)}), 202
+
+
+@app.route('/api/nodes/bulk', methods=['POST'])
+def api_bulk_node_action():
+    """
+    API endpoint to start, stop or restart many nodes at once.
+    
+    Expects JSON with an 'action' and either a list of 'names' or a
+    'selector' ({'type': 'user'|'system', 'status': e.g. 'running'}).
+    Each node becomes a background job on the shared job pool; by default
+    the request waits for all of them and returns per-node outcomes and
+    timings. With "wait": false, or when all long request slots are taken,
+    it returns the job ids right away with status 202.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'A JSON object with an action is required'}), 400
+    action = payload.get('action')
+    if action not in NODE_ACTIONS:
+        return jsonify({'error': f'action must be one of {", ".join(NODE_ACTIONS)}'}), 400
+    
+    names = payload.get('names')
+    selector = payload.get('selector')
+    if names is None and selector is None:
+        return jsonify({'error': 'Either names or selector is required'}), 400
+    if names is not None and (not isinstance(names, list) or
+                              not all(isinstance(name, str) for name in names)):
+        return jsonify({'error': 'names must be a list of node names'}), 400
+    if names is None and not isinstance(selector, dict):
+        return jsonify({'error': 'selector must be an object'}), 400
+    try:
+        timeout = float(payload.get('timeout', BULK_ACTION_TIMEOUT))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timeout must be a number'}), 400
+    
+    results = []
+    configs = []
+    if names is not None:
+        for name in names:
+            config = get_node_config(name)
+            if config:
+                configs.append(config)
+            else:
+                results.append({'name': name, 'status': 'failed', 'error': 'Node not found'})
+    else:
+        configs = get_node_configs()
+        if selector.get('type'):
+            configs = [c for c in configs if c['type'] == selector['type']]
+        if selector.get('status'):
+            resolve_node_statuses(configs, get_node_statuses())
+            configs = [c for c in configs if c['status'] == selector['status']]
+    
+    args = [payload.get('image') or None] if action == 'start' else []
+    jobs = [submit_node_action(action, config, *args) for config in configs]
+    
+    # Without a free long request slot, answer as if "wait": false was sent
+    waiting = payload.get('wait', True) and long_request_slots.acquire('bulk_action')
+    if not waiting:
+        return jsonify({
+            'action': action,
+            'jobs': [{'name': job.node_name, 'job_id': job.id,
+                      'url': url_for('api_job', job_id=job.id)} for job in jobs]
+        }), 202
+    
+    deadline = time.monotonic() + timeout
+    try:
+        for job in jobs:
+            job.wait(max(0, deadline - time.monotonic()))
+    finally:
+        long_request_slots.release()
+    for job in jobs:
+        results.append({
+            'name': job.node_name,
+            'job_id': job.id,
+            'status': job.status,
+            'result': job.result,
+            'error': job.error,
+            'queued_seconds': round((job.started or time.time()) - job.created, 3),
+            'duration_seconds': round(job.finished - job.started, 3) if job.finished else None
+        })
+    
+    return jsonify({
+        'action': action,
+        'succeeded': len([r for r in results if r['status'] == 'succeeded']),
+        'failed': len([r for r in results if r['status'] == 'failed']),
+        'results': results
+    })
+
+
+YAML_MIMETYPES = ('application/yaml', 'application/x-yaml', 'text/yaml', 'text/x-yaml')
+
+
+@app.route('/api/nodes/bulk-create', methods=['POST'])
+def api_bulk_create_nodes():
+    """
+    API endpoint to create many node configurations at once.
+    
+    Expects a JSON or YAML body with a list of node specs, either as the
+    body itself or under 'nodes'. A spec has the fields of the create form:
+    'name', 'server_url' and 'api_key' (required), 'port', 'api_path',
+    'task_dir', 'databases' (list of {'label', 'uri', 'type'}) and
+    'docker_host'. With "encryption": true a key pair is taken from the key
+    pool, and the ones the pool lacks are generated in parallel in its
+    worker processes; 'private_key' supplies an existing PEM key instead.
+    Existing configurations are kept unless "overwrite": true is given
+    next to 'nodes'. Returns per-node outcomes, including the public key of
+    generated key pairs.
+    """
+    try:
+        if request.mimetype in YAML_MIMETYPES:
+            payload = yaml.load(request.get_data(as_text=True), Loader=YAML_LOADER)
+        else:
+            payload = request.get_json(silent=True)
+    except yaml.YAMLError as e:
+        return jsonify({'error': f'Invalid YAML: {e}'}), 400
+    
+    overwrite = False
+    if isinstance(payload, dict):
+        overwrite = bool(payload.get('overwrite', False))
+        try:
+            timeout = float(payload.get('timeout', BULK_ACTION_TIMEOUT))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'timeout must be a number'}), 400
+        payload = payload.get('nodes')
+    else:
+        timeout = BULK_ACTION_TIMEOUT
+    if not isinstance(payload, list) or not payload:
+        return jsonify({'error': 'A non-empty list of node specs is required'}), 400
+    
+    # Validate every spec first, so keys are only generated for nodes that will be created
+    results = []
+    names = set()
+    for spec in payload:
+        name = spec.get('name') if isinstance(spec, dict) else None
+        result = {'name': name, 'status': 'failed'}
+        results.append(result)
+        if not isinstance(spec, dict):
+            result['error'] = 'Node spec must be an object'
+        elif not isinstance(name, str) or not NODE_NAME_PATTERN.match(name):
+            result['error'] = 'name is required and may only contain letters, digits, hyphens and underscores'
+        elif name in names:
+            result['error'] = 'Duplicate name in request'
+        elif not (spec.get('server_url') and isinstance(spec['server_url'], str)
+                  and spec.get('api_key') and isinstance(spec['api_key'], str)):
+            result['error'] = 'server_url and api_key are required'
+        elif spec.get('docker_host') and not isinstance(spec['docker_host'], str):
+            result['error'] = 'docker_host must be the name of a Docker host'
+        elif spec.get('docker_host') and spec['docker_host'] not in DOCKER_HOSTS:
+            result['error'] = f"Unknown Docker host: {spec['docker_host']}"
+        elif not overwrite and get_node_config(name):
+            result['error'] = 'Node configuration already exists'
+        else:
+            result['status'] = 'pending'
+        if isinstance(name, str):
+            names.add(name)
+    
+    pending = [(spec, result) for spec, result in zip(payload, results) if result['status'] == 'pending']
+    generate = [result['name'] for spec, result in pending
+                if spec.get('encryption') and not spec.get('private_key')]
+    key_pairs = dict(zip(generate, rsa_key_pool.take_many(len(generate)))) if generate else {}
+    
+    deadline = time.monotonic() + timeout
+    for spec, result in pending:
+        name = result['name']
+        started = time.perf_counter()
+        try:
+            encryption = bool(spec.get('private_key')) or name in key_pairs
+            databases = spec.get('databases')
+            if databases is None:
+                databases = [{'label': spec.get('db_label', 'default'),
+                              'uri': spec.get('db_uri'),
+                              'type': spec.get('db_type', 'csv')}]
+            # Build the configuration first, so an invalid spec leaves no key behind
+            config = build_node_config(
+                name, spec['server_url'], spec['api_key'], port=spec.get('port'),
+                api_path=spec.get('api_path', '/api'),
+                task_dir=spec.get('task_dir', '/mnt/data/tasks'),
+                databases=databases,
+                private_key_path=get_private_key_path(name) if encryption else None,
+                docker_host=spec.get('docker_host'))
+            
+            if spec.get('private_key'):
+                save_private_key(name, spec['private_key'])
+            elif name in key_pairs:
+                try:
+                    private_key_pem, public_key_pem = key_pairs[name].result(
+                        max(0, deadline - time.monotonic()))
+                except TimeoutError:
+                    raise RuntimeError('Timed out generating the key pair')
+                save_private_key(name, private_key_pem)
+                result['public_key'] = public_key_pem
+            
+            result['path'] = str(save_node_config(name, config))
+            result['encryption'] = encryption
+            result['status'] = 'created'
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e)
+        result['duration_seconds'] = round(time.perf_counter() - started, 3)
+    
+    return jsonify({
+        'created': len([r for r in results if r['status'] == 'created']),
+        'failed': len([r for r in results if r['status'] == 'failed']),
+        'results': results
+    })
+
+
+@app.route('/api/jobs')
+def api_list_jobs():
+    """API endpoint to list recent jobs, optionally for one node"""
+    return jsonify(job_manager.describe_all(request.args.get('node')))
+
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """API endpoint to get the steps, progress and result of a job"""
+    job = job_manager.describe(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/api/server/version')
@@ -784,11 +4200,12 @@ def api_server_version():
     """API endpoint to check a Vantage6 server's version"""
     server_url = request.args.get('server_url')
     api_path = request.args.get('api_path', '/api')
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
     
     if not server_url:
         return jsonify({'error': 'server_url parameter is required'}), 400
     
-    version, error = get_server_version(server_url, api_path)
+    version, error = get_server_version(server_url, api_path, refresh=refresh)
     
     if error:
         return jsonify({
@@ -807,6 +4224,17 @@ def api_server_version():
     })
 
 
+@app.route('/api/servers')
+def api_servers():
+    """API endpoint with the connectivity history of all configured servers"""
+    server_prober.start()
+    summaries = server_prober.summaries()
+    if request.args.get('history', '1').lower() in ('0', 'false', 'no'):
+        for summary in summaries:
+            del summary['history']
+    return jsonify(summaries)
+
+
 @app.route('/api/encryption/generate-key', methods=['POST'])
 def api_generate_encryption_key():
     """API endpoint to generate a new RSA key pair for encryption"""
@@ -832,5 +4260,25 @@ def api_generate_encryption_key():
         }), 500
 
 
+def start_background_workers():
+    """
+    Start all background workers of this process.
+    
+    Called by gunicorn for every worker (see gunicorn.conf.py); routes also
+    start the workers they depend on lazily, so this is safe to call twice.
+    """
+    for watcher in node_state_watchers.values():
+        watcher.start()
+    log_buffers.start()
+    stats_sampler.start()
+    image_prefetcher.start()
+    image_index.start()
+    server_prober.start()
+    disk_usage_monitor.start()
+    rsa_key_pool.start()
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; in production run: gunicorn -c gunicorn.conf.py app:app
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_ENV') == 'development',
+            threaded=True)
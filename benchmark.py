@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot paths of the node manager.
+
+Exercises get_node_configs(), the dashboard (index), the node list,
+/api/nodes, the log view and start_node against an in-process fake Docker
+Engine API and a local fake vantage6 /api/version server, for a growing
+number of node configurations and running containers. Every scenario runs
+in a fresh process, so caches and background workers start cold.
+
+With --hosts N, nodes are spread round-robin over N fake Docker daemons,
+configured as DOCKER_HOSTS.
+
+Reports p50/p99 latency and the number of Docker API calls made per request
+(calls from background threads are not counted; start_node counts the calls
+of its job, as it waits for the job to finish).
+
+Usage:
+    python benchmark.py
+    python benchmark.py --configs 10,100,1000 --running 0,0.5 --latency-ms 2
+    python benchmark.py --hosts 4 --latency-ms 5
+    python benchmark.py --json > bench_output.txt
+"""
+import argparse
+import json
+import os
+import queue
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+OPERATIONS = ('get_node_configs', 'index', 'list_nodes', 'api_list_nodes', 'view_logs', 'start_node')
+NODE_IMAGE = 'harbor2.vantage6.ai/infrastructure/node:4.7.1'
+LOG_LINES_PER_CONTAINER = 200
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Keep-alive request handler without access logs or Nagle delays"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without this, delayed ACKs add ~40 ms
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeDockerDaemon:
+    """
+    Minimal Docker Engine API over HTTP, covering what the node manager uses.
+
+    Containers, images and volumes live in memory; container changes are
+    published on /events. Every request sleeps for the simulated latency
+    first.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.containers = {}
+        self.images = {NODE_IMAGE}
+        self.volumes = set()
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.url = f'tcp://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='fake-docker', daemon=True).start()
+
+    def add_container(self, name, labels, state='running', image=NODE_IMAGE):
+        container_id = uuid.uuid4().hex * 2
+        with self.lock:
+            self.containers[container_id] = {
+                'Id': container_id, 'Name': name, 'Image': image, 'State': state,
+                'Labels': labels, 'Created': int(time.time())
+            }
+        self.publish('create', container_id)
+        if state == 'running':
+            self.publish('start', container_id)
+        return container_id
+
+    def remove_container(self, ref):
+        container = self.find(ref)
+        if container:
+            self.publish('destroy', container['Id'])
+            with self.lock:
+                self.containers.pop(container['Id'], None)
+        return container
+
+    def find(self, ref):
+        with self.lock:
+            for container in self.containers.values():
+                if ref in (container['Id'], container['Name']) or container['Id'].startswith(ref):
+                    return container
+        return None
+
+    def publish(self, action, container_id):
+        with self.lock:
+            container = self.containers.get(container_id)
+            if container is None:
+                return
+            event = {
+                'Type': 'container', 'Action': action, 'status': action, 'id': container_id,
+                'Actor': {'ID': container_id, 'Attributes': dict(
+                    container['Labels'], name=container['Name'], image=container['Image'])},
+                'time': int(time.time()), 'timeNano': time.time_ns()
+            }
+            for subscriber in self.subscribers:
+                subscriber.put(event)
+
+    def summary(self, container):
+        return {
+            'Id': container['Id'], 'Names': [f"/{container['Name']}"], 'Image': container['Image'],
+            'State': container['State'], 'Status': container['State'], 'Created': container['Created'],
+            'Labels': container['Labels']
+        }
+
+    def inspect(self, container):
+        return {
+            'Id': container['Id'], 'Name': f"/{container['Name']}", 'Image': f"sha256:{'0' * 64}",
+            'Created': time.strftime('%Y-%m-%dT%H:%M:%S.000000000Z', time.gmtime(container['Created'])),
+            'State': {'Status': container['State'], 'Running': container['State'] == 'running'},
+            'Config': {'Tty': True, 'Image': container['Image'], 'Labels': container['Labels']}
+        }
+
+    def logs(self, container, tail):
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(container['Created']))
+        lines = [f"{stamp}.{i:09d}Z {stamp.replace('T', ' ')},000 - node           - "
+                 f"{'WARNING ' if i % 10 == 0 else 'INFO    '} - {container['Name']} message {i}\n"
+                 for i in range(LOG_LINES_PER_CONTAINER)]
+        if tail.isdigit():
+            lines = lines[-int(tail):]
+        return ''.join(lines)
+
+    def _handler_class(self):
+        daemon = self
+
+        class Handler(QuietHandler):
+            def send_json(self, body, status=200):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_text(self, text, status=200, content_type='text/plain'):
+                data = text.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def not_found(self):
+                self.send_json({'message': 'No such object'}, 404)
+
+            def read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def route(self, method):
+                time.sleep(daemon.latency)
+                url = urlparse(self.path)
+                path = re.sub(r'^/v[0-9.]+', '', url.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                for pattern, handler in self.ROUTES.get(method, ()):
+                    match = re.fullmatch(pattern, path)
+                    if match:
+                        return handler(self, query, *match.groups())
+                self.not_found()
+
+            def do_GET(self):
+                self.route('GET')
+
+            def do_POST(self):
+                self.route('POST')
+
+            def do_DELETE(self):
+                self.route('DELETE')
+
+            def ping(self, query):
+                self.send_text('OK')
+
+            def version(self, query):
+                self.send_json({'ApiVersion': '1.43', 'MinAPIVersion': '1.12', 'Version': '24.0.0'})
+
+            def list_containers(self, query):
+                labels = json.loads(query.get('filters', '{}')).get('label', [])
+                with daemon.lock:
+                    containers = list(daemon.containers.values())
+                summaries = []
+                for container in containers:
+                    if query.get('all') not in ('1', 'true', 'True') and container['State'] != 'running':
+                        continue
+                    if all(label.split('=', 1)[0] in container['Labels'] and
+                           ('=' not in label or container['Labels'][label.split('=', 1)[0]] == label.split('=', 1)[1])
+                           for label in labels):
+                        summaries.append(daemon.summary(container))
+                self.send_json(summaries)
+
+            def inspect_container(self, query, ref):
+                container = daemon.find(ref)
+                if container is None:
+                    return self.not_found()
+                self.send_json(daemon.inspect(container))
+
+            def container_logs(self, query, ref):
+                container = daemon.find(ref)
+                if container is None:
+                    return self.not_found()
+                logs = daemon.logs(container, query.get('tail', 'all'))
+                if query.get('follow') not in ('1', 'true', 'True'):
+                    return self.send_text(logs, content_type='application/vnd.docker.raw-stream')
+                # Followed streams stay open like on a real daemon, just without new lines
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/vnd.docker.raw-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    data = logs.encode()
+                    self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                    self.wfile.flush()
+                    self.rfile.read()
+                except OSError:
+                    pass
+
+            def create_container(self, query):
+                body = self.read_body()
+                if body.get('Image') not in daemon.images:
+                    return self.send_json({'message': 'No such image'}, 404)
+                container_id = daemon.add_container(query['name'], body.get('Labels') or {},
+                                                    state='created', image=body['Image'])
+                self.send_json({'Id': container_id, 'Warnings': []}, 201)
+
+            def start_container(self, query, ref):
+                container = daemon.find(ref)
+                if container is None:
+                    return self.not_found()
+                container['State'] = 'running'
+                daemon.publish('start', container['Id'])
+                self.send_text('', 204)
+
+            def stop_container(self, query, ref):
+                container = daemon.find(ref)
+                if container is None:
+                    return self.not_found()
+                container['State'] = 'exited'
+                daemon.publish('die', container['Id'])
+                daemon.publish('stop', container['Id'])
+                self.send_text('', 204)
+
+            def delete_container(self, query, ref):
+                if daemon.remove_container(ref) is None:
+                    return self.not_found()
+                self.send_text('', 204)
+
+            def list_images(self, query):
+                with daemon.lock:
+                    tags = sorted(daemon.images)
+                self.send_json([{'Id': f'sha256:{i:064x}', 'RepoTags': [tag]} for i, tag in enumerate(tags)])
+
+            def inspect_image(self, query, name):
+                if name not in daemon.images:
+                    return self.not_found()
+                self.send_json({'Id': f"sha256:{'0' * 64}", 'RepoTags': [name]})
+
+            def pull_image(self, query):
+                image = f"{query['fromImage']}:{query.get('tag', 'latest')}"
+                with daemon.lock:
+                    daemon.images.add(image)
+                self.send_text(json.dumps({'status': f'Downloaded newer image for {image}'}) + '\n')
+
+            def inspect_volume(self, query, name):
+                if name not in daemon.volumes:
+                    return self.not_found()
+                self.send_json({'Name': name})
+
+            def create_volume(self, query):
+                name = self.read_body().get('Name')
+                with daemon.lock:
+                    daemon.volumes.add(name)
+                self.send_json({'Name': name}, 201)
+
+            def events(self, query):
+                # Only container events are published; other streams stay silent
+                subscriber = queue.Queue()
+                if 'container' in json.loads(query.get('filters', '{}')).get('type', ['container']):
+                    with daemon.lock:
+                        daemon.subscribers.append(subscriber)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    while True:
+                        data = json.dumps(subscriber.get()).encode() + b'\n'
+                        self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    with daemon.lock:
+                        if subscriber in daemon.subscribers:
+                            daemon.subscribers.remove(subscriber)
+
+            ROUTES = {
+                'GET': [
+                    (r'/_ping', ping),
+                    (r'/version', version),
+                    (r'/containers/json', list_containers),
+                    (r'/containers/([^/]+)/json', inspect_container),
+                    (r'/containers/([^/]+)/logs', container_logs),
+                    (r'/images/json', list_images),
+                    (r'/images/(.+)/json', inspect_image),
+                    (r'/volumes/([^/]+)', inspect_volume),
+                    (r'/events', events),
+                ],
+                'POST': [
+                    (r'/containers/create', create_container),
+                    (r'/containers/([^/]+)/start', start_container),
+                    (r'/containers/([^/]+)/stop', stop_container),
+                    (r'/images/create', pull_image),
+                    (r'/volumes/create', create_volume),
+                ],
+                'DELETE': [
+                    (r'/containers/([^/]+)', delete_container),
+                ],
+            }
+
+        return Handler
+
+
+def start_version_server():
+    """Serve a fake vantage6 server's /api/version; returns its URL"""
+
+    class Handler(QuietHandler):
+        def do_GET(self):
+            data = json.dumps({'version': '4.7.1'}).encode()
+            self.send_response(200 if self.path.endswith('/version') else 404)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-server', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def write_configs(config_dir, data_dir, count, server_url, hosts=1):
+    """Write count node configurations, round-robin over hosts; returns their names"""
+    names = [f'node-{i:04d}' for i in range(count)]
+    for i, name in enumerate(names):
+        with open(os.path.join(config_dir, f'{name}.yaml'), 'w') as f:
+            if hosts > 1:
+                f.write(f'docker_host: host-{i % hosts}\n')
+            f.write(f"""api_key: {uuid.uuid4().hex}
+server_url: {server_url}
+port: 443
+api_path: /api
+task_dir: /mnt/data/tasks
+databases:
+- label: default
+  uri: /mnt/data/{name}.csv
+  type: csv
+encryption:
+  enabled: false
+  private_key: ''
+logging:
+  level: INFO
+  file: {data_dir}/{name}/log/{name}.log
+  use_console: true
+  backup_count: 5
+  max_size: 1024
+  format: '%(asctime)s - %(name)-14s - %(levelname)-8s - %(message)s'
+  datefmt: '%Y-%m-%d %H:%M:%S'
+""")
+    return names
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_scenario(configs, running, latency, iterations, hosts=1):
+    """
+    Run all operations for one scenario in this process.
+
+    Must run in a fresh process: the app reads its directories and Docker
+    host from the environment on import. The configs and log directories
+    of the scenario are removed afterwards.
+    """
+    workdir = tempfile.mkdtemp(prefix='node-manager-bench-')
+    try:
+        return measure_scenario(workdir, configs, running, latency, iterations, hosts)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure_scenario(workdir, configs, running, latency, iterations, hosts):
+    """Set up a scenario in workdir and measure every operation"""
+    config_dir = os.path.join(workdir, 'node')
+    data_dir = os.path.join(workdir, 'data')
+    os.makedirs(config_dir)
+    os.makedirs(os.path.join(workdir, 'system'))
+
+    daemons = [FakeDockerDaemon(latency) for _ in range(hosts)]
+    for daemon in daemons:
+        daemon.start()
+    server_url = start_version_server()
+    names = write_configs(config_dir, data_dir, configs, server_url, hosts)
+    daemon_of = {name: daemons[i % hosts] for i, name in enumerate(names)}
+    running_names = names[:running]
+    stopped_names = names[running:]
+    for name in running_names:
+        daemon_of[name].add_container(f'vantage6-{name}-user',
+                                      {'vantage6-type': 'node', 'system': 'False', 'name': name})
+
+    os.environ.update({
+        'VANTAGE6_CONFIG_DIR': config_dir,
+        'VANTAGE6_SYSTEM_CONFIG_DIR': os.path.join(workdir, 'system'),
+        'VANTAGE6_DATA_DIR': data_dir,
+        'DOCKER_HOST': daemons[0].url,
+        'IMAGE_PREFETCH_ENABLED': 'false',
+        'SERVER_PROBE_ENABLED': 'false',
+        'RSA_KEY_POOL_SIZE': '0',
+    })
+    if hosts > 1:
+        os.environ['DOCKER_HOSTS'] = ','.join(f'host-{i}={daemon.url}' for i, daemon in enumerate(daemons))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app
+
+    # Nothing is mounted into the fake daemon, so host paths are the local paths
+    app.container_path_to_host_path = str
+
+    # Count Docker calls made by the benchmark thread and by node jobs
+    instrument = app.instrument_docker_client
+
+    def count_docker_calls(client):
+        client = instrument(client)
+        send = client.api.send
+
+        def counting_send(*args, **kwargs):
+            thread = threading.current_thread()
+            if thread is main_thread or thread.name.startswith(('job', 'docker-fanout')):
+                calls[0] += 1
+            return send(*args, **kwargs)
+
+        client.api.send = counting_send
+        return client
+
+    main_thread = threading.current_thread()
+    calls = [0]
+    app.instrument_docker_client = count_docker_calls
+    http = app.app.test_client()
+
+    def start_node(i):
+        name = stopped_names[i % len(stopped_names)]
+        response = http.post(f'/nodes/{name}/start')
+        job_id = parse_qs(urlparse(response.headers['Location']).query)['job'][0]
+        app.job_manager.get(job_id).wait(60)
+        return name
+
+    operations = {
+        'get_node_configs': lambda i: app.get_node_configs(),
+        'index': lambda i: http.get('/'),
+        'list_nodes': lambda i: http.get('/nodes'),
+        'api_list_nodes': lambda i: http.get('/api/nodes'),
+    }
+    if running_names:
+        operations['view_logs'] = lambda i: http.get(f'/nodes/{running_names[i % len(running_names)]}/logs')
+    if stopped_names:
+        operations['start_node'] = start_node
+
+    # Let the events watchers sync before measuring, like a server that has been up for a while
+    app.list_node_containers()
+    deadline = time.monotonic() + 10
+    while (any(watcher.snapshot() is None for watcher in app.node_state_watchers.values())
+           and time.monotonic() < deadline):
+        time.sleep(0.01)
+    # ... and the log buffers of running nodes on the default host to be filled
+    def buffered(name):
+        buffer = app.log_buffers.get(f'vantage6-{name}-user')
+        return buffer is not None and buffer.cursor is not None
+
+    app.log_buffers.start()
+    deadline = time.monotonic() + 60
+    buffered_names = [name for name in running_names if daemon_of[name] is daemons[0]]
+    while not all(buffered(name) for name in buffered_names) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    results = {}
+    for operation, run in operations.items():
+        run(0)
+        if operation == 'start_node':
+            daemon_of[stopped_names[0]].remove_container(f'vantage6-{stopped_names[0]}-user')
+        durations = []
+        call_counts = []
+        for i in range(iterations):
+            calls[0] = 0
+            started = time.perf_counter()
+            result = run(i + 1)
+            durations.append(time.perf_counter() - started)
+            call_counts.append(calls[0])
+            if operation == 'start_node':
+                # Remove the started container, so the next start does the full work again
+                daemon_of[result].remove_container(f'vantage6-{result}-user')
+        results[operation] = {
+            'p50_ms': percentile(durations, 0.5) * 1000,
+            'p99_ms': percentile(durations, 0.99) * 1000,
+            'docker_calls': sum(call_counts) / len(call_counts),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--configs', default='10,100,1000',
+                        help='Comma-separated numbers of node configurations (default: 10,100,1000)')
+    parser.add_argument('--running', default='0.5',
+                        help='Comma-separated fractions of nodes with a running container (default: 0.5)')
+    parser.add_argument('--latency-ms', type=float, default=1.0,
+                        help='Simulated Docker daemon latency per API call (default: 1)')
+    parser.add_argument('--iterations', type=int, default=30,
+                        help='Measured requests per operation (default: 30)')
+    parser.add_argument('--hosts', type=int, default=1,
+                        help='Number of fake Docker hosts to spread the nodes over (default: 1)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        configs, running = (int(value) for value in args.scenario.split(','))
+        results = run_scenario(configs, running, args.latency_ms / 1000, args.iterations, args.hosts)
+        print(json.dumps(results))
+        return
+
+    if not args.json:
+        print(f"{'configs':>7} {'running':>7}  {'operation':<17} {'p50 ms':>9} {'p99 ms':>9} {'docker calls':>12}")
+    for configs in (int(value) for value in args.configs.split(',')):
+        for fraction in (float(value) for value in args.running.split(',')):
+            running = int(configs * fraction)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--scenario', f'{configs},{running}',
+                 '--latency-ms', str(args.latency_ms), '--iterations', str(args.iterations),
+                 '--hosts', str(args.hosts)],
+                check=True, capture_output=True, text=True).stdout
+            results = json.loads(output.strip().splitlines()[-1])
+            for operation in OPERATIONS:
+                if operation not in results:
+                    continue
+                result = results[operation]
+                if args.json:
+                    print(json.dumps(dict(result, configs=configs, running=running, hosts=args.hosts,
+                                          operation=operation)))
+                else:
+                    print(f"{configs:>7} {running:>7}  {operation:<17} {result['p50_ms']:>9.2f} "
+                          f"{result['p99_ms']:>9.2f} {result['docker_calls']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Command-line interface of the node manager, for cron jobs and automation.
+
+Works on the same node configurations and Docker hosts as the web interface,
+without a running server. `list` and `status` only read the configuration
+files and make one container listing call per Docker host, so they start
+fast; `start`, `stop` and `logs` load the full application on demand.
+
+Usage:
+    python cli.py list [--type user|system] [--status running] [--json]
+    python cli.py status [NAME...] [--json]
+    python cli.py start NAME... [--image IMAGE] [--json]
+    python cli.py stop NAME... [--json]
+    python cli.py logs NAME [--tail N] [--follow] [--json]
+
+Exit codes: 0 on success, 1 if a node is not found or an action fails, and
+for `status` 3 if any of the nodes is not running.
+
+`start` and `stop` run their jobs with the job state and per-node locks in
+NODE_MANAGER_STATE_DIR, the same directory the web server uses under
+gunicorn, so they never overlap a job of the web interface on the same node.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import node_core
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_NOT_RUNNING = 3
+
+
+def load_app():
+    """Import the web application, with the Docker SDK and the job runner"""
+    # Share job state and node locks with the web server (see gunicorn.conf.py)
+    os.environ.setdefault('JOB_STATE_DIR', os.path.join(
+        os.environ.get('NODE_MANAGER_STATE_DIR', '/tmp/vantage6-node-manager'), 'jobs'))
+    import app
+    return app
+
+
+def resolve_statuses(configs):
+    """
+    Set the 'host' and 'status' of configs, listing each Docker host once.
+
+    Hosts are listed with the standard library; only TLS and SSH hosts load
+    the Docker SDK. Nodes on hosts that cannot be listed get status 'unknown'.
+    """
+    hosts = {node_core.get_node_host(config) for config in configs} & set(node_core.DOCKER_HOSTS)
+    containers = node_core.HostListing()
+    for host in sorted(hosts):
+        try:
+            summaries = node_core.list_containers_direct(host)
+            if summaries is None:
+                summaries = load_app().query_node_containers(host)
+        except Exception as e:
+            print(f'Docker host {host} not available: {e}', file=sys.stderr)
+            containers.unavailable.add(host)
+            continue
+        containers.extend(summaries)
+    return node_core.resolve_node_statuses(configs, node_core.node_statuses(containers))
+
+
+def describe_node(config):
+    """Fields of a node shown by list and status"""
+    data = config['data'] or {}
+    return {
+        'name': config['name'],
+        'type': config['type'],
+        'host': config['host'],
+        'status': config['status'],
+        'server_url': data.get('server_url'),
+        'path': config['path']
+    }
+
+
+def print_table(rows, columns):
+    """Print dicts as a plain text table"""
+    widths = {column: max([len(column)] + [len(str(row[column] or '-')) for row in rows])
+              for column in columns}
+    print('  '.join(column.upper().ljust(widths[column]) for column in columns).rstrip())
+    for row in rows:
+        print('  '.join(str(row[column] or '-').ljust(widths[column]) for column in columns).rstrip())
+
+
+def find_configs(names):
+    """Look up configs by name; returns (configs, names that were not found)"""
+    configs = []
+    missing = []
+    for name in names:
+        config = node_core.get_node_config(name)
+        if config:
+            configs.append(config)
+        else:
+            missing.append(name)
+    return configs, missing
+
+
+def command_list(args):
+    configs = node_core.get_node_configs()
+    if args.type:
+        configs = [config for config in configs if config['type'] == args.type]
+    nodes = [describe_node(config) for config in resolve_statuses(configs)]
+    if args.status:
+        nodes = [node for node in nodes if node['status'] == args.status]
+
+    if args.json:
+        print(json.dumps(nodes))
+    else:
+        print_table(nodes, ('name', 'type', 'host', 'status', 'server_url'))
+    return EXIT_OK
+
+
+def command_status(args):
+    if args.names:
+        configs, missing = find_configs(args.names)
+    else:
+        configs, missing = node_core.get_node_configs(), []
+    nodes = [describe_node(config) for config in resolve_statuses(configs)]
+    for name in missing:
+        print(f'Node configuration "{name}" not found', file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(nodes + [{'name': name, 'status': 'not-found'} for name in missing]))
+    else:
+        for node in nodes:
+            print(f"{node['name']}: {node['status']}")
+
+    if missing:
+        return EXIT_FAILED
+    if any(node['status'] != 'running' for node in nodes):
+        return EXIT_NOT_RUNNING
+    return EXIT_OK
+
+
+def command_action(args):
+    configs, missing = find_configs(args.names)
+    results = [{'node': name, 'status': 'failed', 'error': 'Node configuration not found'}
+               for name in missing]
+
+    timed_out = False
+    if configs:
+        app = load_app()
+        extra = [args.image] if args.action == 'start' else []
+        jobs = [app.submit_node_action(args.action, config, *extra) for config in configs]
+        # The jobs run in parallel, so --timeout bounds the wait for all of them together
+        deadline = time.monotonic() + args.timeout
+        for job in jobs:
+            finished = job.wait(max(0, deadline - time.monotonic()))
+            result = job.to_dict()
+            if not finished:
+                timed_out = True
+                result.update(status='failed', error=f'Timed out after {args.timeout:g} seconds')
+                # The job dies with this process, do not leave it 'running' for the web interface
+                if job.store:
+                    job.store.save(result)
+            results.append(result)
+
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for result in results:
+            print(f"{result['node']}: {result['status']}" + (f" - {result['error']}" if result['error'] else ''))
+            for message in result.get('messages', []):
+                print(f"  [{message['category']}] {message['message']}")
+
+    if timed_out:
+        # Job threads are joined at interpreter exit, so leave without waiting for them
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(EXIT_FAILED)
+    return EXIT_OK if all(result['status'] == 'succeeded' for result in results) else EXIT_FAILED
+
+
+def command_logs(args):
+    config = node_core.get_node_config(args.name)
+    if not config:
+        print(f'Node configuration "{args.name}" not found', file=sys.stderr)
+        return EXIT_FAILED
+
+    app = load_app()
+    container_name = node_core.get_container_name(config['name'], config['type'] == 'system')
+    try:
+        client = app.get_shared_docker_client(node_core.get_node_host(config))
+        container = client.containers.get(container_name)
+    except app.docker.errors.NotFound:
+        print(f'Container {container_name} not found', file=sys.stderr)
+        return EXIT_FAILED
+    except Exception as e:
+        print(f'Docker not available: {e}', file=sys.stderr)
+        return EXIT_FAILED
+
+    if args.follow:
+        chunks = container.logs(stream=True, follow=True, tail=args.tail, timestamps=args.json)
+    else:
+        chunks = [container.logs(tail=args.tail, timestamps=args.json)]
+    try:
+        for line in app.iter_log_lines(chunks):
+            if args.json:
+                # One JSON object per line, with the cursor format of the web log APIs
+                stamp, message = app.split_log_timestamp(line)
+                cursor = f'{stamp[0]}.{stamp[1]:09d}' if stamp else None
+                print(json.dumps({'cursor': cursor, 'line': message}), flush=args.follow)
+            else:
+                print(line, flush=args.follow)
+    except KeyboardInterrupt:
+        pass
+    return EXIT_OK
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help='List node configurations and their status')
+    list_parser.add_argument('--type', choices=('user', 'system'), help='Only nodes of this type')
+    list_parser.add_argument('--status', help='Only nodes with this status, e.g. running')
+    list_parser.set_defaults(handler=command_list)
+
+    status_parser = commands.add_parser('status', help='Show the status of nodes (default: all)')
+    status_parser.add_argument('names', nargs='*', metavar='NAME')
+    status_parser.set_defaults(handler=command_status)
+
+    for action in ('start', 'stop'):
+        action_parser = commands.add_parser(action, help=f'{action.capitalize()} nodes and wait for the result')
+        action_parser.add_argument('names', nargs='+', metavar='NAME')
+        action_parser.add_argument('--timeout', type=float, default=600,
+                                   help='Seconds to wait for all nodes (default: 600)')
+        if action == 'start':
+            action_parser.add_argument('--image', help='Node image (default: detected from the server version)')
+        action_parser.set_defaults(handler=command_action, action=action)
+
+    logs_parser = commands.add_parser('logs', help='Print the container logs of a node')
+    logs_parser.add_argument('name', metavar='NAME')
+    logs_parser.add_argument('--tail', type=int, default=100, help='Number of lines (default: 100)')
+    logs_parser.add_argument('--follow', '-f', action='store_true', help='Keep printing new lines')
+    logs_parser.set_defaults(handler=command_logs)
+
+    # Accept --json after the command as well
+    for subparser in (list_parser, status_parser, logs_parser) + tuple(
+            commands.choices[action] for action in ('start', 'stop')):
+        subparser.add_argument('--json', action='store_true', default=argparse.SUPPRESS,
+                               help='Print machine-readable JSON')
+
+    args = parser.parse_args()
+    try:
+        return args.handler(args)
+    except BrokenPipeError:
+        # Output piped into e.g. head
+        sys.stderr.close()
+        return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for running the Vantage6 Node Manager in production
+
+Usage: gunicorn -c gunicorn.conf.py app:app
+
+Uses threaded workers, so long requests (log streams, long-polls, bulk
+actions) only occupy one thread each. They share LONG_REQUEST_SLOTS slots
+per worker, half of WEB_THREADS by default, so they never take all threads
+and pages and the health check stay responsive. Raise WEB_THREADS to allow
+more open node pages at once.
+
+Every worker process keeps its own caches, which all validate themselves
+(config mtimes, version TTLs, Docker events), and runs its own background
+workers for the in-memory views it serves (log buffers, container stats,
+container states). Jobs and their per-node locks are kept in JOB_STATE_DIR,
+shared with other workers and with cli.py. With more than one worker,
+host-wide background work (image pre-pulling, server
+probes, disk usage walks) runs in a single elected worker
+(BACKGROUND_LOCK_FILE), which shares its results with the others through
+SHARED_STATE_DIR.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_WORKERS', '1'))
+threads = int(os.environ.get('WEB_THREADS', '16'))
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+# Read by app.py when the workers import it
+state_dir = os.environ.get('NODE_MANAGER_STATE_DIR', '/tmp/vantage6-node-manager')
+os.makedirs(state_dir, exist_ok=True)
+# Job state and node locks, also used by cli.py
+os.environ.setdefault('JOB_STATE_DIR', os.path.join(state_dir, 'jobs'))
+if workers > 1:
+    os.environ.setdefault('BACKGROUND_LOCK_FILE', os.path.join(state_dir, 'background.lock'))
+    os.environ.setdefault('SHARED_STATE_DIR', os.path.join(state_dir, 'shared'))
+
+
+def post_worker_init(worker):
+    """Start the background workers once the worker has loaded the app"""
+    from app import start_background_workers
+    start_background_workers()
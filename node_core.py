@@ -0,0 +1,391 @@
+"""
+Core of the Vantage6 Node Manager without web or Docker SDK dependencies.
+
+Node configurations, Docker host settings and node state mapping, shared by
+the web application (app.py) and the command-line interface (cli.py). Only
+the standard library and PyYAML are imported here, so command-line tools
+that only read configurations and container states start fast.
+"""
+import hashlib
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+import yaml
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+# Configuration - use environment variables for container flexibility
+VANTAGE6_CONFIG_DIR = Path(os.environ.get('VANTAGE6_CONFIG_DIR', '/root/.config/vantage6/node'))
+VANTAGE6_SYSTEM_CONFIG_DIR = Path(os.environ.get('VANTAGE6_SYSTEM_CONFIG_DIR', '/etc/vantage6/node'))
+VANTAGE6_DATA_DIR = Path(os.environ.get('VANTAGE6_DATA_DIR', '/data'))
+APPNAME = 'vantage6'
+
+
+def parse_docker_hosts(value):
+    """
+    Parse Docker hosts given as name=url pairs.
+    
+    Args:
+        value: Comma-separated pairs, e.g.
+               'local=unix:///var/run/docker.sock,gpu=tcp://gpu:2375'
+    
+    Returns:
+        dict: Host name to Docker URL; {'local': None}, a host configured
+              from the environment, if value is empty
+    
+    Raises:
+        ValueError: If an entry is not a name=url pair
+    """
+    hosts = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, separator, url = entry.partition('=')
+        if not separator or not name.strip() or not url.strip():
+            raise ValueError(f'Invalid DOCKER_HOSTS entry "{entry}", expected name=url')
+        hosts[name.strip()] = url.strip()
+    return hosts or {'local': None}
+
+
+# Nodes run on the host named by 'docker_host' in their config, or on the first host
+DOCKER_HOSTS = parse_docker_hosts(os.environ.get('DOCKER_HOSTS', ''))
+DEFAULT_DOCKER_HOST = next(iter(DOCKER_HOSTS))
+DOCKER_HOST_TIMEOUT = float(os.environ.get('DOCKER_HOST_TIMEOUT', '5'))
+# Timeout of single Docker API calls, instead of the Docker SDK's 60 seconds, so an
+# unresponsive host fails fast; streams (logs, events, image pulls) are not limited
+DOCKER_CALL_TIMEOUT = float(os.environ.get('DOCKER_CALL_TIMEOUT', DOCKER_HOST_TIMEOUT * 3))
+
+# Node names are used in file and container names
+NODE_NAME_PATTERN = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+
+class StateVersion:
+    """
+    Version counter over node configurations and container states.
+    
+    The config registry and the container state watcher bump the version
+    whenever something they track changes, which wakes up long-poll
+    requests waiting on it. The counter is per process; ETags are derived
+    from the state itself (see state_etag()) so they match across workers.
+    """
+    
+    def __init__(self):
+        self.value = 0
+        self.changed_at = time.time()
+        self._fingerprints = {}
+        self._changed = threading.Condition()
+    
+    def bump(self):
+        """Record a change and wake up waiting requests"""
+        with self._changed:
+            self.value += 1
+            self.changed_at = time.time()
+            self._changed.notify_all()
+    
+    def observe(self, key, fingerprint):
+        """Bump the version if the fingerprint stored under key changed"""
+        with self._changed:
+            if self._fingerprints.get(key) == fingerprint:
+                return
+            self._fingerprints[key] = fingerprint
+        self.bump()
+    
+    def wait(self, version, timeout):
+        """
+        Wait until the version differs from the given one.
+        
+        Returns:
+            bool: True if the version changed, False on timeout
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self.value != version, timeout)
+
+
+state_version = StateVersion()
+
+
+def state_etag(fingerprint):
+    """
+    ETag for a piece of node state, the same in every process.
+    
+    Args:
+        fingerprint: Value describing the state, built from strings,
+                     numbers, None and (sorted) lists or tuples of them,
+                     so its repr does not depend on the process
+    """
+    return hashlib.sha1(repr(fingerprint).encode('utf-8')).hexdigest()[:20]
+
+
+class ConfigRegistry:
+    """
+    In-memory registry of node configuration files with a name index.
+    
+    Every entry remembers the mtime and size of the file it was parsed from,
+    so a file is only re-parsed when it changed on disk. Listing still stats
+    the config directories to pick up added and removed files; looking up a
+    single node only stats that node's candidate files.
+    """
+    
+    def __init__(self, directories):
+        """
+        Args:
+            directories: List of (Path, config_type) tuples, in lookup order
+        """
+        self.directories = directories
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def _load(self, config_file, config_type, stat):
+        """Return the entry for a file, re-parsing it only if it changed"""
+        key = str(config_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._entries.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        
+        entry = None
+        try:
+            with open(config_file, 'r') as f:
+                config_data = yaml.load(f, Loader=YAML_LOADER)
+            entry = {
+                'name': Path(config_file).stem,
+                'path': key,
+                'type': config_type,
+                'data': config_data
+            }
+        except Exception as e:
+            print(f"Error loading {config_file}: {e}")
+        
+        # Broken files are cached too, so they are not re-parsed on every call
+        self._entries[key] = (signature, entry)
+        state_version.bump()
+        return entry
+    
+    def list(self):
+        """Get all configurations, user configurations first"""
+        configs = []
+        seen = set()
+        with self._lock:
+            for directory, config_type in self.directories:
+                try:
+                    dir_entries = sorted(os.scandir(directory), key=lambda e: e.name)
+                except OSError:
+                    continue
+                for dir_entry in dir_entries:
+                    if not dir_entry.name.endswith('.yaml') or not dir_entry.is_file():
+                        continue
+                    seen.add(dir_entry.path)
+                    entry = self._load(dir_entry.path, config_type, dir_entry.stat())
+                    if entry:
+                        configs.append(dict(entry))
+            
+            # Forget files that were removed from disk
+            for key in list(self._entries):
+                if key not in seen:
+                    del self._entries[key]
+                    state_version.bump()
+        return configs
+    
+    def get(self, name):
+        """Get a single configuration by node name, or None if not found"""
+        # Names come from URLs, API payloads and the command line; never let
+        # them point outside the config directories
+        if not isinstance(name, str) or not NODE_NAME_PATTERN.match(name):
+            return None
+        with self._lock:
+            for directory, config_type in self.directories:
+                config_file = os.path.join(directory, f'{name}.yaml')
+                try:
+                    stat = os.stat(config_file)
+                except OSError:
+                    if self._entries.pop(config_file, None) is not None:
+                        state_version.bump()
+                    continue
+                entry = self._load(config_file, config_type, stat)
+                if entry:
+                    return dict(entry)
+        return None
+    
+    def signature(self, config_file):
+        """(mtime, size) of a file as it was last loaded, or None"""
+        cached = self._entries.get(str(config_file))
+        return cached[0] if cached else None
+    
+    def invalidate(self, config_file):
+        """Drop a cached entry, e.g. right after the file was written"""
+        with self._lock:
+            self._entries.pop(str(config_file), None)
+
+
+# Prefer the libyaml-backed loader when PyYAML was built with it
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+config_registry = ConfigRegistry([
+    (VANTAGE6_CONFIG_DIR, 'user'),
+    (VANTAGE6_SYSTEM_CONFIG_DIR, 'system'),
+])
+
+
+def get_node_configs():
+    """Get all available node configurations"""
+    return config_registry.list()
+
+
+def get_node_config(name):
+    """Get a single node configuration by name, or None if it does not exist"""
+    return config_registry.get(name)
+
+
+def write_file_atomic(path, content, mode=0o666):
+    """
+    Write a file through a temporary file and a rename.
+    
+    Readers such as get_node_configs() see either the old or the new file,
+    never a partially written one.
+    
+    Args:
+        path: Path of the file to write
+        content: Text to write, or bytes to write unchanged
+        mode: Permissions of the new file, before the umask
+    """
+    path = Path(path)
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    file_mode = 'wb' if isinstance(content, bytes) else 'w'
+    try:
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode), file_mode) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def get_container_name(node_name, system_folders=False):
+    """Get the Docker container name used for a node"""
+    postfix = "system" if system_folders else "user"
+    return f"{APPNAME}-{node_name}-{postfix}"
+
+
+def get_node_host(config):
+    """Get the name of the Docker host a node runs on"""
+    return (config.get('data') or {}).get('docker_host') or DEFAULT_DOCKER_HOST
+
+
+class HostListing(list):
+    """Container summaries from several Docker hosts, with the hosts that could not be listed"""
+    
+    def __init__(self, summaries=(), unavailable=()):
+        super().__init__(summaries)
+        self.unavailable = set(unavailable)
+
+
+class HostStatuses(dict):
+    """Container states by (host, container name), with the hosts that could not be listed"""
+    
+    def __init__(self, statuses=(), unavailable=()):
+        super().__init__(statuses)
+        self.unavailable = set(unavailable)
+
+
+def node_statuses(containers):
+    """
+    Map container summaries to a (host, container name) -> state map.
+    
+    Args:
+        containers: Container summaries with their 'Host', e.g. a HostListing
+    
+    Returns:
+        HostStatuses: (Docker host, container name) to state (e.g. 'running',
+                      'exited')
+    """
+    statuses = HostStatuses(unavailable=getattr(containers, 'unavailable', ()))
+    for summary in containers:
+        host = summary.get('Host', DEFAULT_DOCKER_HOST)
+        for container_name in summary.get('Names') or []:
+            statuses[host, container_name.lstrip('/')] = summary.get('State', 'unknown')
+    return statuses
+
+
+def resolve_node_statuses(configs, statuses):
+    """Set the 'host' and 'status' of every config from a get_node_statuses() map"""
+    for config in configs:
+        host = get_node_host(config)
+        config['host'] = host
+        if statuses is None or host in statuses.unavailable or host not in DOCKER_HOSTS:
+            config['status'] = 'unknown'
+        else:
+            container_name = get_container_name(config['name'], config['type'] == 'system')
+            config['status'] = statuses.get((host, container_name), 'stopped')
+    return configs
+
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket, as used by a local Docker daemon"""
+    
+    def __init__(self, socket_path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def list_containers_direct(host=None, timeout=DOCKER_HOST_TIMEOUT):
+    """
+    List the node containers of a Docker host with the standard library only.
+    
+    Makes the same single, label-filtered listing call as the web
+    application, without importing the Docker SDK. Supports plain HTTP over
+    a Unix socket or TCP; TLS and SSH hosts are left to the SDK.
+    
+    Args:
+        host: Name of the Docker host, or None for the default host
+        timeout: Socket timeout in seconds
+    
+    Returns:
+        list: Container summaries with their 'Host' set, or None if the
+              host's connection type is not supported
+    
+    Raises:
+        OSError: If the daemon cannot be reached or answers with an error
+    """
+    host = host or DEFAULT_DOCKER_HOST
+    base_url = DOCKER_HOSTS.get(host)
+    from_env = base_url is None
+    url = urlsplit(base_url or os.environ.get('DOCKER_HOST') or 'unix:///var/run/docker.sock')
+    if url.scheme == 'unix':
+        connection = UnixHTTPConnection(url.path, timeout)
+    elif url.scheme in ('tcp', 'http') and not (from_env and os.environ.get('DOCKER_TLS_VERIFY')):
+        connection = http.client.HTTPConnection(url.hostname, url.port or 2375, timeout=timeout)
+    else:
+        return None
+    
+    filters = quote(json.dumps({'label': [f'{APPNAME}-type=node']}))
+    try:
+        connection.request('GET', f'/containers/json?all=1&filters={filters}')
+        response = connection.getresponse()
+        body = response.read()
+    except http.client.HTTPException as e:
+        raise OSError(f'Invalid response from Docker host {host}: {e}')
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise OSError(f'Docker host {host} answered with HTTP {response.status}')
+    
+    containers = json.loads(body)
+    for summary in containers:
+        summary['Host'] = host
+    return containers
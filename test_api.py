@@ -0,0 +1,109 @@
+"""
+Tests for request validation of the JSON API
+"""
+import os
+import stat
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    config_dir = tmp_path / 'node'
+    monkeypatch.setattr(app, 'VANTAGE6_CONFIG_DIR', config_dir)
+    return config_dir
+
+
+@pytest.mark.parametrize('payload, error', [
+    ([], 'A JSON object with an action is required'),
+    (['start'], 'A JSON object with an action is required'),
+    ('start', 'A JSON object with an action is required'),
+    ({'action': 'start', 'names': 'node'}, 'names must be a list of node names'),
+    ({'action': 'start', 'names': ['node', 1]}, 'names must be a list of node names'),
+    ({'action': 'start', 'selector': 'running'}, 'selector must be an object'),
+    ({'action': 'start', 'names': [], 'timeout': 'abc'}, 'timeout must be a number'),
+    ({'action': 'start', 'names': [], 'timeout': [1]}, 'timeout must be a number'),
+    ({'action': 'start'}, 'Either names or selector is required'),
+])
+def test_bulk_action_rejects_invalid_payload(client, monkeypatch, payload, error):
+    submitted = []
+    monkeypatch.setattr(app, 'submit_node_action', lambda *args: submitted.append(args))
+
+    response = client.post('/api/nodes/bulk', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert not submitted
+
+
+def test_bulk_create_rejects_invalid_timeout(client, config_dir):
+    spec = {'name': 'node', 'server_url': 'http://localhost', 'api_key': 'key'}
+    response = client.post('/api/nodes/bulk-create',
+                           json={'nodes': [spec], 'timeout': 'abc', 'overwrite': True})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'timeout must be a number'
+    assert not config_dir.exists()
+
+
+def test_bulk_create_leaves_no_key_for_invalid_spec(client, config_dir):
+    spec = {'name': 'node', 'server_url': 'http://localhost', 'api_key': 'key',
+            'port': 'abc', 'private_key': 'PRIVATE KEY'}
+    response = client.post('/api/nodes/bulk-create', json={'nodes': [spec], 'overwrite': True})
+
+    result = response.get_json()['results'][0]
+    assert result['status'] == 'failed'
+    assert not (config_dir / 'private_keys' / 'node_private_key.pem').exists()
+    assert not (config_dir / 'node.yaml').exists()
+
+
+def test_bulk_create_saves_supplied_key(client, config_dir):
+    spec = {'name': 'node', 'server_url': 'http://localhost', 'api_key': 'key',
+            'private_key': 'PRIVATE KEY\n'}
+    response = client.post('/api/nodes/bulk-create', json={'nodes': [spec], 'overwrite': True})
+
+    result = response.get_json()['results'][0]
+    assert result['status'] == 'created'
+    key_file = config_dir / 'private_keys' / 'node_private_key.pem'
+    assert key_file.read_text() == 'PRIVATE KEY\n'
+    assert stat.S_IMODE(os.stat(key_file).st_mode) == 0o600
+    assert (config_dir / 'node.yaml').exists()
+    # No temporary files are left next to the key
+    assert os.listdir(config_dir / 'private_keys') == ['node_private_key.pem']
+
+
+def test_bulk_create_reports_invalid_specs(client, config_dir):
+    valid = {'name': 'node', 'server_url': 'http://localhost', 'api_key': 'key'}
+    response = client.post('/api/nodes/bulk-create', json={'overwrite': True, 'nodes': [
+        'node',
+        ['node'],
+        dict(valid, docker_host=['local']),
+        dict(valid, name='other', docker_host={'name': 'local'}),
+        dict(valid, name='third', docker_host='nowhere'),
+        dict(valid, name='fourth', server_url=['http://localhost']),
+        dict(valid, name='../evil'),
+    ]})
+
+    assert response.status_code == 200
+    assert [result['error'] for result in response.get_json()['results']] == [
+        'Node spec must be an object',
+        'Node spec must be an object',
+        'docker_host must be the name of a Docker host',
+        'docker_host must be the name of a Docker host',
+        'Unknown Docker host: nowhere',
+        'server_url and api_key are required',
+        'name is required and may only contain letters, digits, hyphens and underscores',
+    ]
+    assert not config_dir.exists()
+
+
+def test_bulk_create_rejects_body_without_specs(client, config_dir):
+    for payload in ({}, {'nodes': []}, {'nodes': 'node'}, [], 'node'):
+        response = client.post('/api/nodes/bulk-create', json=payload)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'A non-empty list of node specs is required'
@@ -0,0 +1,113 @@
+"""
+Tests for the commands and exit codes of cli.py
+"""
+import json
+import sys
+import time
+
+import pytest
+
+import app
+import cli
+import node_core
+
+CONFIGS = [{'name': name, 'type': 'user', 'path': f'/{name}.yaml',
+            'data': {'server_url': 'http://localhost'}} for name in ('a', 'b', 'c')]
+
+
+@pytest.fixture
+def nodes(monkeypatch, tmp_path):
+    """Nodes a, b and c, of which only a is running"""
+    monkeypatch.setenv('JOB_STATE_DIR', str(tmp_path))
+    monkeypatch.setattr(node_core, 'get_node_configs', lambda: [dict(config) for config in CONFIGS])
+    monkeypatch.setattr(node_core, 'get_node_config', lambda name: next(
+        (dict(config) for config in CONFIGS if config['name'] == name), None))
+    monkeypatch.setattr(node_core, 'list_containers_direct', lambda host: [
+        {'Names': ['/vantage6-a-user'], 'State': 'running', 'Host': host},
+        {'Names': ['/vantage6-b-user'], 'State': 'exited', 'Host': host}])
+
+
+def run(monkeypatch, capsys, *argv):
+    """Run cli.py with arguments; returns (exit code, JSON output)"""
+    monkeypatch.setattr(sys, 'argv', ['cli.py', '--json', *argv])
+    code = cli.main()
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_list(nodes, monkeypatch, capsys):
+    code, listed = run(monkeypatch, capsys, 'list')
+    assert code == cli.EXIT_OK
+    assert [(node['name'], node['status']) for node in listed] == [
+        ('a', 'running'), ('b', 'exited'), ('c', 'stopped')]
+
+    code, listed = run(monkeypatch, capsys, 'list', '--status', 'running')
+    assert code == cli.EXIT_OK
+    assert [node['name'] for node in listed] == ['a']
+
+
+def test_list_with_unavailable_host(nodes, monkeypatch, capsys):
+    def unavailable(host):
+        raise OSError('Connection refused')
+
+    monkeypatch.setattr(node_core, 'list_containers_direct', unavailable)
+    code, listed = run(monkeypatch, capsys, 'list')
+    assert code == cli.EXIT_OK
+    assert {node['status'] for node in listed} == {'unknown'}
+
+
+@pytest.mark.parametrize('names, exit_code', [
+    (['a'], cli.EXIT_OK),
+    (['a', 'b'], cli.EXIT_NOT_RUNNING),
+    ([], cli.EXIT_NOT_RUNNING),
+    (['a', 'missing'], cli.EXIT_FAILED),
+])
+def test_status_exit_codes(nodes, monkeypatch, capsys, names, exit_code):
+    code, statuses = run(monkeypatch, capsys, 'status', *names)
+    assert code == exit_code
+    if 'missing' in names:
+        assert statuses[-1] == {'name': 'missing', 'status': 'not-found'}
+
+
+@pytest.fixture
+def jobs(nodes, monkeypatch):
+    """Run node actions as jobs that take half a second, one at a time; node c fails"""
+    manager = app.JobManager(1, 10)
+
+    def run_action(job, config):
+        time.sleep(0.5)
+        if config['name'] == 'c':
+            raise RuntimeError('no such image')
+
+    monkeypatch.setattr(app, 'submit_node_action',
+                        lambda action, config, *args: manager.submit(action, config['name'],
+                                                                     run_action, config))
+
+    def exit_now(code):
+        raise SystemExit(code)
+
+    monkeypatch.setattr(cli.os, '_exit', exit_now)
+
+
+@pytest.mark.parametrize('names, exit_code', [
+    (['a', 'b'], cli.EXIT_OK),
+    (['a', 'c'], cli.EXIT_FAILED),
+    (['a', 'missing'], cli.EXIT_FAILED),
+])
+def test_start_exit_codes(jobs, monkeypatch, capsys, names, exit_code):
+    code, results = run(monkeypatch, capsys, 'start', *names)
+    assert code == exit_code
+    assert len(results) == len(names)
+
+
+def test_start_timeout_covers_all_nodes(jobs, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['cli.py', '--json', 'start', 'a', 'b', 'c',
+                                      '--timeout', '1.2'])
+    started = time.monotonic()
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main()
+
+    assert exit_info.value.code == cli.EXIT_FAILED
+    assert time.monotonic() - started < 1.5
+    results = json.loads(capsys.readouterr().out)
+    assert [result['status'] for result in results] == ['succeeded', 'succeeded', 'failed']
+    assert results[-1]['error'] == 'Timed out after 1.2 seconds'
@@ -0,0 +1,96 @@
+"""
+Tests for ETags, conditional GET and long-polling of the node state APIs
+"""
+import threading
+import time
+
+import app
+from node_core import HostStatuses, state_etag, state_version
+
+
+def test_state_etag_depends_on_state_only():
+    def fingerprint(signature):
+        return [('/a.yaml', signature)], ([(('local', 'vantage6-a-user'), 'running')], [])
+
+    assert state_etag(fingerprint((1, 2))) == state_etag(fingerprint((1, 2)))
+    assert state_etag(fingerprint((1, 2))) != state_etag(fingerprint((1, 3)))
+
+
+def state_response(state):
+    """conditional_state_response() for the state dict, in the current request context"""
+    return app.conditional_state_response(
+        lambda: dict(state),
+        lambda loaded: {'state': loaded},
+        lambda loaded: sorted(loaded.items()))
+
+
+def test_conditional_state_response_not_modified():
+    state = {'a': 'running'}
+    with app.app.test_request_context('/'):
+        response = state_response(state)
+        assert response.status_code == 200
+        assert response.get_json() == {'state': state}
+        etag, weak = response.get_etag()
+        assert weak
+
+    with app.app.test_request_context('/', headers={'If-None-Match': f'W/"{etag}"'}):
+        assert state_response(state).status_code == 304
+
+    state['a'] = 'stopped'
+    with app.app.test_request_context('/', headers={'If-None-Match': f'W/"{etag}"'}):
+        response = state_response(state)
+        assert response.status_code == 200
+        assert response.get_etag()[0] != etag
+
+
+def test_conditional_state_response_wait_returns_on_change():
+    state = {'a': 'running'}
+    with app.app.test_request_context('/'):
+        etag = state_response(state).get_etag()[0]
+
+    def change():
+        state['a'] = 'stopped'
+        state_version.bump()
+
+    timer = threading.Timer(0.2, change)
+    timer.start()
+    try:
+        with app.app.test_request_context('/?wait=10', headers={'If-None-Match': f'W/"{etag}"'}):
+            started = time.monotonic()
+            response = state_response(state)
+            assert time.monotonic() - started < 5
+    finally:
+        timer.cancel()
+    assert response.status_code == 200
+    assert response.get_json() == {'state': {'a': 'stopped'}}
+
+
+def test_conditional_state_response_wait_times_out():
+    state = {'a': 'running'}
+    with app.app.test_request_context('/'):
+        etag = state_response(state).get_etag()[0]
+
+    with app.app.test_request_context('/?wait=0.3', headers={'If-None-Match': f'W/"{etag}"'}):
+        started = time.monotonic()
+        response = state_response(state)
+        assert time.monotonic() - started >= 0.3
+    assert response.status_code == 304
+
+
+def test_list_nodes_not_modified_until_status_changes(monkeypatch):
+    statuses = {('local', 'vantage6-a-user'): 'running'}
+    monkeypatch.setattr(app, 'get_node_configs',
+                        lambda: [{'name': 'a', 'type': 'user', 'path': '/a.yaml', 'data': {}}])
+    monkeypatch.setattr(app, 'get_node_statuses', lambda: HostStatuses(statuses))
+    client = app.app.test_client()
+
+    response = client.get('/api/nodes?fields=name,status')
+    assert response.get_json() == [{'name': 'a', 'status': 'running'}]
+    etag = response.headers['ETag']
+    response = client.get('/api/nodes?fields=name,status', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    statuses[('local', 'vantage6-a-user')] = 'exited'
+    response = client.get('/api/nodes?fields=name,status', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json() == [{'name': 'a', 'status': 'exited'}]
@@ -0,0 +1,75 @@
+"""
+Tests for the incremental directory usage totals of DirectoryUsageCache
+"""
+import os
+import shutil
+
+from app import DirectoryUsageCache, disk_bytes
+
+
+def make_tree(root):
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'c').mkdir()
+    (root / 'top.txt').write_bytes(b'x' * 100)
+    (root / 'a' / 'one.txt').write_bytes(b'x' * 5000)
+    (root / 'a' / 'b' / 'two.txt').write_bytes(b'x' * 10000)
+
+
+def du(path):
+    """Bytes of a tree on disk, counted the way DirectoryUsageCache does"""
+    total = disk_bytes(os.stat(path, follow_symlinks=False))
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            total += disk_bytes(os.stat(os.path.join(dirpath, name), follow_symlinks=False))
+    return total
+
+
+def test_usage_totals(tmp_path):
+    make_tree(tmp_path)
+    usage = DirectoryUsageCache().usage(tmp_path)
+
+    assert usage == {'bytes': du(tmp_path), 'files': 3, 'errors': 0, 'rescanned': 4}
+
+
+def test_usage_rescans_changed_directories_only(tmp_path):
+    make_tree(tmp_path)
+    cache = DirectoryUsageCache()
+    cache.usage(tmp_path)
+
+    assert cache.usage(tmp_path)['rescanned'] == 0
+
+    (tmp_path / 'a' / 'b' / 'three.txt').write_bytes(b'x' * 20000)
+    usage = cache.usage(tmp_path)
+    assert usage['rescanned'] == 1
+    assert usage['files'] == 4
+    assert usage['bytes'] == du(tmp_path)
+
+    assert cache.usage(tmp_path, full=True)['rescanned'] == 4
+
+
+def test_usage_forgets_removed_directories(tmp_path):
+    make_tree(tmp_path)
+    cache = DirectoryUsageCache()
+    cache.usage(tmp_path)
+
+    shutil.rmtree(tmp_path / 'a')
+    usage = cache.usage(tmp_path)
+    assert usage['files'] == 1
+    assert usage['bytes'] == du(tmp_path)
+    assert cache.subtree(tmp_path / 'a') is None
+    assert cache.subtree(tmp_path / 'a' / 'b') is None
+
+
+def test_subtree(tmp_path):
+    make_tree(tmp_path)
+    cache = DirectoryUsageCache()
+    assert cache.subtree(tmp_path / 'a') is None
+
+    cache.usage(tmp_path)
+    assert cache.subtree(tmp_path / 'a') == {'bytes': du(tmp_path / 'a'), 'files': 2, 'errors': 0}
+    assert cache.subtree(tmp_path / 'c')['files'] == 0
+
+
+def test_usage_of_missing_directory(tmp_path):
+    usage = DirectoryUsageCache().usage(tmp_path / 'missing')
+    assert usage == {'bytes': 0, 'files': 0, 'errors': 1, 'rescanned': 0}
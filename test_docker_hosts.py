@@ -0,0 +1,68 @@
+"""
+Tests for the configuration of Docker hosts and calls to unresponsive hosts
+"""
+import socket
+import threading
+import time
+
+import docker
+import pytest
+
+import app
+from node_core import parse_docker_hosts
+
+
+def test_parse_docker_hosts():
+    assert parse_docker_hosts('local=unix:///var/run/docker.sock, gpu = tcp://gpu:2375,') == {
+        'local': 'unix:///var/run/docker.sock', 'gpu': 'tcp://gpu:2375'}
+    assert parse_docker_hosts('') == {'local': None}
+    assert parse_docker_hosts('a=tcp://a:2375?x=1') == {'a': 'tcp://a:2375?x=1'}
+
+
+@pytest.mark.parametrize('value', ['gpu', 'local=unix:///var/run/docker.sock,gpu',
+                                   '=tcp://a:2375', 'a='])
+def test_parse_docker_hosts_names_invalid_entry(value):
+    with pytest.raises(ValueError, match='Invalid DOCKER_HOSTS entry'):
+        parse_docker_hosts(value)
+
+
+@pytest.fixture
+def silent_host(monkeypatch):
+    """A Docker host that accepts connections but never answers"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    connections = []
+
+    def accept():
+        while True:
+            try:
+                connections.append(listener.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    monkeypatch.setitem(app.DOCKER_HOSTS, 'far', f'tcp://127.0.0.1:{listener.getsockname()[1]}')
+    monkeypatch.setitem(app._docker_host_locks, 'far', threading.Lock())
+    monkeypatch.setitem(app.node_state_watchers, 'far', app.NodeStateWatcher('far'))
+    monkeypatch.setattr(app, 'DOCKER_CALL_TIMEOUT', 0.5)
+    yield 'far'
+    listener.close()
+    for connection in connections:
+        connection.close()
+
+
+def test_calls_to_silent_host_time_out(silent_host):
+    started = time.monotonic()
+    with pytest.raises(docker.errors.DockerException):
+        app.get_shared_docker_client(silent_host)
+    assert time.monotonic() - started < 5
+
+
+def test_status_on_silent_host_is_bounded(silent_host, monkeypatch):
+    # Keep the watcher out of sync, as it would be for a host that does not answer
+    monkeypatch.setattr(app.node_state_watchers[silent_host], 'start', lambda: None)
+    with app.app.test_request_context('/'):
+        started = time.monotonic()
+        assert app.get_node_status('node', host=silent_host) == 'unknown'
+        assert time.monotonic() - started < 5
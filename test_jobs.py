@@ -0,0 +1,126 @@
+"""
+Tests for background jobs, their per-node locks and the shared job store
+"""
+import threading
+import time
+
+import pytest
+
+from app import JobManager, JobStore
+
+
+def recorder(events, seconds=0.2):
+    """Job function that records when it runs"""
+    def run(job, label):
+        events.append(('start', label))
+        time.sleep(seconds)
+        events.append(('end', label))
+        return label
+    return run
+
+
+def test_jobs_on_one_node_do_not_overlap():
+    manager = JobManager(4, 10)
+    events = []
+    jobs = [manager.submit('start', 'node', recorder(events), label) for label in ('a', 'b', 'c')]
+    for job in jobs:
+        assert job.wait(5)
+
+    assert events == [('start', 'a'), ('end', 'a'), ('start', 'b'), ('end', 'b'),
+                      ('start', 'c'), ('end', 'c')]
+    assert [job.result for job in jobs] == ['a', 'b', 'c']
+
+
+def test_jobs_on_different_nodes_run_concurrently():
+    manager = JobManager(4, 10)
+    events = []
+    jobs = [manager.submit('start', name, recorder(events), name) for name in ('a', 'b')]
+    for job in jobs:
+        assert job.wait(5)
+
+    assert [event for event, _ in events] == ['start', 'start', 'end', 'end']
+
+
+def test_failed_job_records_step_and_error():
+    manager = JobManager(1, 10)
+
+    def run(job):
+        with job.step('Pull image'):
+            raise RuntimeError('no such image')
+
+    job = manager.submit('start', 'node', run)
+    assert job.wait(5)
+    described = manager.describe(job.id)
+    assert described['status'] == 'failed'
+    assert described['error'] == 'no such image'
+    assert described['steps'][0]['name'] == 'Pull image'
+    assert described['steps'][0]['status'] == 'failed'
+    assert described['messages'][-1]['category'] == 'error'
+
+
+def test_manager_forgets_oldest_finished_jobs():
+    manager = JobManager(1, 2)
+    jobs = [manager.submit('stop', 'node', lambda job: None) for _ in range(4)]
+    for job in jobs:
+        assert job.wait(5)
+    last = manager.submit('stop', 'node', lambda job: None)
+    assert last.wait(5)
+
+    assert manager.get(jobs[0].id) is None
+    assert [job_dict['id'] for job_dict in manager.describe_all()] == [jobs[-1].id, last.id]
+
+
+def test_store_shares_jobs_between_managers(tmp_path):
+    running = JobManager(1, 10, JobStore(tmp_path, 10))
+    other = JobManager(1, 10, JobStore(tmp_path, 10))
+    job = running.submit('restart', 'node', lambda job: 'done')
+    assert job.wait(5)
+
+    described = other.describe(job.id)
+    assert described['status'] == 'succeeded'
+    assert described['result'] == 'done'
+    assert [job_dict['id'] for job_dict in other.describe_all('node')] == [job.id]
+    assert other.describe_all('other') == []
+
+
+@pytest.mark.parametrize('job_id', ['../jobs', 'abc', '', None])
+def test_store_rejects_invalid_job_ids(tmp_path, job_id):
+    assert JobStore(tmp_path, 10).load(job_id) is None
+
+
+def test_store_prunes_finished_jobs_beyond_history(tmp_path):
+    store = JobStore(tmp_path, 2)
+    manager = JobManager(1, 10, store)
+    jobs = [manager.submit('stop', 'node', lambda job: None) for _ in range(4)]
+    for job in jobs:
+        assert job.wait(5)
+    store.prune()
+
+    assert [job_dict['id'] for job_dict in store.list()] == [job.id for job in jobs[-2:]]
+
+
+def test_store_locks_node_across_managers(tmp_path):
+    events = []
+    managers = [JobManager(1, 10, JobStore(tmp_path, 10)) for _ in range(2)]
+    jobs = [manager.submit('start', 'node', recorder(events), label)
+            for manager, label in zip(managers, ('a', 'b'))]
+    for job in jobs:
+        assert job.wait(5)
+
+    assert [event for event, _ in events] == ['start', 'end', 'start', 'end']
+
+
+def test_store_node_lock_is_exclusive(tmp_path):
+    store = JobStore(tmp_path, 10)
+    acquired = threading.Event()
+
+    def hold():
+        with store.node_lock('node'):
+            acquired.set()
+
+    with store.node_lock('node'):
+        thread = threading.Thread(target=hold)
+        thread.start()
+        assert not acquired.wait(0.2)
+    thread.join(5)
+    assert acquired.is_set()
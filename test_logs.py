@@ -0,0 +1,178 @@
+"""
+Tests for log parsing, the in-memory log buffers and paging through log files
+"""
+import os
+
+import pytest
+
+import app
+from app import LogRingBuffer, compile_log_format, read_log_history
+
+
+def node_line(level, message, name='node'):
+    return f'2025-01-01 12:00:00 - {name:<14} - {level:<8} - {message}'
+
+
+def test_compile_log_format_parses_default_format():
+    pattern = compile_log_format(app.DEFAULT_LOG_FORMAT)
+    fields = pattern.match(node_line('WARNING', 'disk - almost full')).groupdict()
+
+    assert fields['asctime'] == '2025-01-01 12:00:00'
+    assert fields['name'] == 'node'
+    assert fields['levelname'] == 'WARNING'
+    assert fields['message'] == 'disk - almost full'
+    assert pattern.match('Traceback (most recent call last):') is None
+
+
+def test_compile_log_format_custom_and_invalid():
+    pattern = compile_log_format('[%(levelname)s] %(message)s')
+    assert pattern.match('[ERROR] boom').group('levelname') == 'ERROR'
+    assert compile_log_format(None) is None
+
+
+def fill(buffer, lines):
+    for i, line in enumerate(lines, start=1):
+        buffer.append((i, 0), line)
+
+
+def test_log_buffer_query_filters():
+    buffer = LogRingBuffer(None, 1024 * 1024)
+    fill(buffer, [
+        node_line('INFO', 'starting'),
+        node_line('ERROR', 'task failed'),
+        'Traceback (most recent call last):',
+        node_line('DEBUG', 'task retried'),
+        node_line('WARNING', 'Task slow'),
+    ])
+
+    errors = buffer.query(level=app.LOG_LEVELS['ERROR'])
+    # The traceback takes the level of the line before it
+    assert [line for _, _, line in errors] == [node_line('ERROR', 'task failed'),
+                                              'Traceback (most recent call last):']
+    assert [stamp for stamp, _, _ in buffer.query(grep='TASK')] == [(2, 0), (4, 0), (5, 0)]
+    assert [stamp for stamp, _, _ in buffer.query(since=(3, 0))] == [(4, 0), (5, 0)]
+    assert [stamp for stamp, _, _ in buffer.query(limit=2)] == [(4, 0), (5, 0)]
+    assert [stamp for stamp, _, _ in buffer.query(level=app.LOG_LEVELS['WARNING'], grep='task',
+                                                  since=(1, 0), limit=1)] == [(5, 0)]
+
+
+def test_log_buffer_skips_lines_it_has():
+    buffer = LogRingBuffer(None, 1024 * 1024)
+    fill(buffer, [node_line('ERROR', 'one'), node_line('INFO', 'two')])
+
+    assert buffer.append((2, 0), node_line('ERROR', 'two again')) == 0
+    # A skipped line does not change the level continuation lines take
+    buffer.append((3, 0), 'continuation')
+    assert buffer.query()[-1][1] == app.LOG_LEVELS['INFO']
+    assert len(buffer.query()) == 3
+
+
+def test_log_buffer_evicts_oldest_lines():
+    buffer = LogRingBuffer(None, 3 * (LogRingBuffer.LINE_OVERHEAD + 10))
+    fill(buffer, [f'line {i:05d}' for i in range(10)])
+
+    assert [line for _, _, line in buffer.query()] == ['line 00007', 'line 00008', 'line 00009']
+    assert buffer.size <= buffer.max_bytes
+
+
+def write_log(path, first, count):
+    path.write_text(''.join(f'line {i}\n' for i in range(first, first + count)))
+
+
+def rotate(log_dir, backup_count):
+    """Rotate like logging.handlers.RotatingFileHandler"""
+    oldest = log_dir / f'node.log.{backup_count}'
+    if oldest.exists():
+        os.remove(oldest)
+    for i in range(backup_count - 1, 0, -1):
+        if (log_dir / f'node.log.{i}').exists():
+            os.rename(log_dir / f'node.log.{i}', log_dir / f'node.log.{i + 1}')
+    os.rename(log_dir / 'node.log', log_dir / 'node.log.1')
+
+
+def log_paths(log_dir, backup_count):
+    return [log_dir / 'node.log'] + [log_dir / f'node.log.{i}' for i in range(1, backup_count + 1)]
+
+
+def test_read_log_history_pages_across_backups(tmp_path):
+    write_log(tmp_path / 'node.log.1', 0, 5)
+    write_log(tmp_path / 'node.log', 5, 5)
+    paths = log_paths(tmp_path, 2)
+
+    lines, cursor = read_log_history(paths, limit=3)
+    assert lines == ['line 7', 'line 8', 'line 9']
+    lines, cursor = read_log_history(paths, cursor, limit=3)
+    assert lines == ['line 4', 'line 5', 'line 6']
+    lines, cursor = read_log_history(paths, cursor, limit=10)
+    assert lines == [f'line {i}' for i in range(4)]
+    assert cursor is None
+
+
+def test_read_log_history_cursor_survives_rotation(tmp_path):
+    write_log(tmp_path / 'node.log', 0, 10)
+    paths = log_paths(tmp_path, 3)
+    lines, cursor = read_log_history(paths, limit=4)
+    assert lines == ['line 6', 'line 7', 'line 8', 'line 9']
+
+    # The file moves to node.log.1 and a new node.log is started
+    rotate(tmp_path, 3)
+    write_log(tmp_path / 'node.log', 10, 3)
+    lines, cursor = read_log_history(paths, cursor, limit=4)
+    assert lines == ['line 2', 'line 3', 'line 4', 'line 5']
+
+
+def test_read_log_history_rotated_out(tmp_path):
+    write_log(tmp_path / 'node.log', 0, 10)
+    paths = log_paths(tmp_path, 1)
+    _, cursor = read_log_history(paths, limit=4)
+
+    rotate(tmp_path, 1)
+    write_log(tmp_path / 'node.log', 10, 10)
+    rotate(tmp_path, 1)
+    write_log(tmp_path / 'node.log', 20, 10)
+    with pytest.raises(LookupError):
+        read_log_history(paths, cursor, limit=4)
+
+
+def test_log_history_route(tmp_path, monkeypatch):
+    write_log(tmp_path / 'node.log', 0, 10)
+    config = {'name': 'node', 'type': 'user', 'path': str(tmp_path / 'node.yaml'),
+              'data': {'logging': {'file': str(tmp_path / 'node.log'), 'backup_count': 1}}}
+    monkeypatch.setattr(app, 'get_node_config', lambda name: config if name == 'node' else None)
+    client = app.app.test_client()
+
+    page = client.get('/nodes/node/logs/history?limit=4').get_json()
+    assert page['lines'] == ['line 6', 'line 7', 'line 8', 'line 9']
+    assert page['files'] == ['node.log']
+    assert client.get('/nodes/node/logs/history?cursor=bad').status_code == 400
+    assert client.get('/nodes/other/logs/history').status_code == 404
+
+    rotate(tmp_path, 1)
+    write_log(tmp_path / 'node.log', 10, 10)
+    rotate(tmp_path, 1)
+    write_log(tmp_path / 'node.log', 20, 10)
+    response = client.get(f"/nodes/node/logs/history?cursor={page['cursor']}")
+    assert response.status_code == 410
+
+
+
+def test_read_log_history_skips_empty_backups(tmp_path):
+    write_log(tmp_path / 'node.log', 5, 3)
+    (tmp_path / 'node.log.1').write_text('')
+    write_log(tmp_path / 'node.log.2', 0, 5)
+    (tmp_path / 'node.log.3').write_text('')
+    paths = log_paths(tmp_path, 3)
+
+    lines, cursor = read_log_history(paths, limit=3)
+    assert lines == ['line 5', 'line 6', 'line 7']
+    assert app.parse_log_file_cursor(app.format_log_file_cursor(cursor)) == cursor
+    lines, cursor = read_log_history(paths, cursor, limit=5)
+    assert lines == [f'line {i}' for i in range(5)]
+    assert cursor is None
+
+
+def test_read_log_history_of_empty_log(tmp_path):
+    (tmp_path / 'node.log').write_text('')
+    (tmp_path / 'node.log.1').write_text('')
+
+    assert read_log_history(log_paths(tmp_path, 1), limit=3) == ([], None)
@@ -0,0 +1,71 @@
+"""
+Tests for the metrics and their Prometheus text rendering
+"""
+import app
+from app import Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, 'index')
+
+    samples = {(name, labels.get('le')): value for name, labels, value in histogram.samples()}
+    assert samples == {
+        ('latency_seconds_bucket', '0.1'): 2,
+        ('latency_seconds_bucket', '1.0'): 3,
+        ('latency_seconds_bucket', '+Inf'): 4,
+        ('latency_seconds_sum', None): 2.65,
+        ('latency_seconds_count', None): 4,
+    }
+
+
+def test_histogram_keeps_label_values_apart():
+    histogram = Histogram('latency_seconds', 'Latency', ('route',), buckets=(1,))
+    histogram.observe(0.5, 'index')
+    histogram.observe(0.5, 'index')
+    histogram.observe(0.5, 'api')
+
+    counts = {labels['route']: value for name, labels, value in histogram.samples()
+              if name == 'latency_seconds_count'}
+    assert counts == {'index': 2, 'api': 1}
+
+
+def test_histogram_time():
+    histogram = Histogram('block_seconds', 'Block', buckets=(10,))
+    with histogram.time():
+        pass
+
+    samples = {name: value for name, _, value in histogram.samples()}
+    assert samples['block_seconds_count'] == 1
+    assert 0 <= samples['block_seconds_sum'] < 10
+
+
+def test_render():
+    registry = MetricsRegistry()
+    calls = registry.counter('calls_total', 'Calls', ('operation',))
+    calls.inc('list')
+    calls.inc('list', amount=2)
+    calls.inc('with "quotes"\n')
+    registry.histogram('empty_seconds', 'Nothing observed')
+
+    assert registry.render().splitlines() == [
+        '# HELP calls_total Calls',
+        '# TYPE calls_total counter',
+        'calls_total{operation="list"} 3.0',
+        'calls_total{operation="with \\"quotes\\"\\n"} 1.0',
+        '# HELP empty_seconds Nothing observed',
+        '# TYPE empty_seconds histogram',
+    ]
+
+
+def test_metrics_endpoint():
+    app.SERVER_VERSION_ERRORS.inc()
+    response = app.app.test_client().get('/metrics')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE node_manager_server_version_errors_total counter' in text
+    assert '\nnode_manager_server_version_errors_total ' in text
+    assert '# TYPE node_manager_http_request_duration_seconds histogram' in text
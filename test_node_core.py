@@ -0,0 +1,84 @@
+"""
+Tests for the configuration registry in node_core.py
+"""
+import os
+
+import node_core
+from node_core import ConfigRegistry, state_version
+
+
+def write_config(path, text, mtime_ns=None):
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_registry_reuses_unchanged_files(tmp_path):
+    write_config(tmp_path / 'a.yaml', 'server_url: http://a\n')
+    registry = ConfigRegistry([(tmp_path, 'user')])
+
+    assert [config['name'] for config in registry.list()] == ['a']
+    version = state_version.value
+    assert registry.list()[0]['data'] == {'server_url': 'http://a'}
+    assert registry.get('a')['type'] == 'user'
+    # Nothing was parsed again
+    assert state_version.value == version
+
+
+def test_registry_reparses_on_mtime_change(tmp_path):
+    path = tmp_path / 'a.yaml'
+    write_config(path, 'port: 1\n', mtime_ns=1_000_000_000)
+    registry = ConfigRegistry([(tmp_path, 'user')])
+    assert registry.get('a')['data'] == {'port': 1}
+
+    # Same size, only the mtime tells the files apart
+    write_config(path, 'port: 2\n', mtime_ns=2_000_000_000)
+    assert registry.get('a')['data'] == {'port': 2}
+
+
+def test_registry_reparses_on_size_change(tmp_path):
+    path = tmp_path / 'a.yaml'
+    write_config(path, 'port: 1\n', mtime_ns=1_000_000_000)
+    registry = ConfigRegistry([(tmp_path, 'user')])
+    assert registry.list()[0]['data'] == {'port': 1}
+
+    write_config(path, 'port: 1000\n', mtime_ns=1_000_000_000)
+    assert registry.list()[0]['data'] == {'port': 1000}
+
+
+def test_registry_forgets_removed_files(tmp_path):
+    write_config(tmp_path / 'a.yaml', 'port: 1\n')
+    write_config(tmp_path / 'b.yaml', 'port: 2\n')
+    registry = ConfigRegistry([(tmp_path, 'user')])
+    assert len(registry.list()) == 2
+
+    os.remove(tmp_path / 'a.yaml')
+    assert [config['name'] for config in registry.list()] == ['b']
+    assert registry.get('a') is None
+
+
+def test_registry_prefers_user_configs(tmp_path):
+    user_dir, system_dir = tmp_path / 'user', tmp_path / 'system'
+    user_dir.mkdir()
+    system_dir.mkdir()
+    write_config(user_dir / 'a.yaml', 'port: 1\n')
+    write_config(system_dir / 'a.yaml', 'port: 2\n')
+    registry = ConfigRegistry([(user_dir, 'user'), (system_dir, 'system')])
+
+    assert registry.get('a')['type'] == 'user'
+    assert [config['type'] for config in registry.list()] == ['user', 'system']
+
+
+def test_registry_rejects_names_outside_config_dirs(tmp_path):
+    config_dir, other_dir = tmp_path / 'node', tmp_path / 'evil'
+    config_dir.mkdir()
+    other_dir.mkdir()
+    write_config(other_dir / 'pwn.yaml', 'port: 1\n')
+    write_config(config_dir / 'ok.yaml', 'port: 1\n')
+    registry = ConfigRegistry([(config_dir, 'user')])
+
+    for name in ('../evil/pwn', '..', '/etc/passwd', 'ok.yaml', '', None, ['ok']):
+        assert registry.get(name) is None
+    assert registry.get('ok')['name'] == 'ok'
+    assert node_core.NODE_NAME_PATTERN.match('node_1-a')
+
@@ -0,0 +1,59 @@
+"""
+Tests for filtering, paging and projection of /api/nodes
+"""
+import pytest
+
+import app
+from node_core import HostStatuses
+
+
+@pytest.fixture
+def client(monkeypatch):
+    configs = [{'name': name, 'type': node_type, 'path': f'/{name}.yaml',
+                'data': {'server_url': 'http://localhost', 'api_key': 'secret'}}
+               for name, node_type in (('b', 'user'), ('a', 'system'), ('a', 'user'), ('c', 'user'))]
+    monkeypatch.setattr(app, 'get_node_configs', lambda: [dict(config) for config in configs])
+    monkeypatch.setattr(app, 'get_node_statuses',
+                        lambda: HostStatuses({('local', 'vantage6-a-user'): 'running'}))
+    return app.app.test_client()
+
+
+def test_default_fields_leave_out_configuration(client):
+    nodes = client.get('/api/nodes').get_json()
+
+    assert len(nodes) == 4
+    assert all(set(node) == set(app.DEFAULT_NODE_FIELDS) for node in nodes)
+    assert 'secret' not in client.get('/api/nodes').get_data(as_text=True)
+
+
+def test_configuration_on_request(client):
+    nodes = client.get('/api/nodes?fields=name,data&prefix=c').get_json()
+
+    assert nodes == [{'name': 'c', 'data': {'server_url': 'http://localhost', 'api_key': 'secret'}}]
+    assert client.get('/api/nodes?fields=name,api_key').status_code == 400
+
+
+def test_filters(client):
+    assert client.get('/api/nodes?status=running&fields=name,type').get_json() == [
+        {'name': 'a', 'type': 'user'}]
+    assert [node['name'] for node in client.get('/api/nodes?type=system').get_json()] == ['a']
+
+
+def test_paging(client):
+    response = client.get('/api/nodes?limit=2&fields=name,type')
+    assert response.get_json() == [{'name': 'a', 'type': 'user'}, {'name': 'b', 'type': 'user'}]
+    assert response.headers['X-Next-Cursor'] == 'user/b'
+
+    cursor = response.headers['X-Next-Cursor']
+    response = client.get(f'/api/nodes?limit=2&fields=name,type&cursor={cursor}')
+    assert response.get_json() == [{'name': 'c', 'type': 'user'}, {'name': 'a', 'type': 'system'}]
+    assert 'X-Next-Cursor' not in response.headers
+    assert client.get('/api/nodes?cursor=other/a').status_code == 400
+
+
+@pytest.mark.parametrize('limit', ['abc', '0', '-1', '1.5'])
+def test_rejects_invalid_limit(client, limit):
+    response = client.get(f'/api/nodes?limit={limit}')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'limit must be a positive integer'
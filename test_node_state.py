@@ -0,0 +1,77 @@
+"""
+Tests for the Docker events driven node state table
+"""
+from app import NodeStateWatcher
+from node_core import state_version
+
+
+def event(action, container_id='abc123', time=1000, **attributes):
+    attributes.setdefault('name', 'vantage6-node-user')
+    return {'Type': 'container', 'Action': action, 'time': time,
+            'Actor': {'ID': container_id, 'Attributes': attributes}}
+
+
+def synced_watcher(*summaries):
+    watcher = NodeStateWatcher('local')
+    watcher._containers = {summary['Id']: summary for summary in summaries}
+    watcher._in_sync = True
+    return watcher
+
+
+def test_snapshot_is_none_until_in_sync():
+    assert NodeStateWatcher('local').snapshot() is None
+    assert synced_watcher().snapshot() == []
+
+
+def test_event_adds_unknown_container():
+    watcher = synced_watcher()
+    version = state_version.value
+    watcher.apply_event(event('start', image='node:4.5',
+                              **{'vantage6-type': 'node', 'name': 'vantage6-a-user'}))
+
+    assert watcher.snapshot() == [{
+        'Id': 'abc123',
+        'Names': ['/vantage6-a-user'],
+        'Image': 'node:4.5',
+        'Created': 1000,
+        'Host': 'local',
+        'State': 'running',
+        'StateChangedAt': 1000,
+        'Labels': {'vantage6-type': 'node'}
+    }]
+    assert state_version.value > version
+
+
+def test_events_update_state_and_name():
+    watcher = synced_watcher({'Id': 'abc123', 'Names': ['/vantage6-a-user'], 'State': 'running'})
+
+    watcher.apply_event(event('die', time=1001))
+    assert watcher.snapshot()[0]['State'] == 'exited'
+    assert watcher.snapshot()[0]['StateChangedAt'] == 1001
+
+    watcher.apply_event(event('rename', name='vantage6-b-user'))
+    assert watcher.snapshot()[0]['Names'] == ['/vantage6-b-user']
+
+    watcher.apply_event(event('destroy'))
+    assert watcher.snapshot() == []
+
+
+def test_unchanged_state_does_not_bump_version():
+    watcher = synced_watcher({'Id': 'abc123', 'Names': ['/vantage6-a-user'], 'State': 'running'})
+    version = state_version.value
+
+    watcher.apply_event(event('restart'))
+    watcher.apply_event(event('exec_start: sh -c true'))
+    watcher.apply_event(event('destroy', container_id='unknown'))
+    assert state_version.value == version
+    assert watcher.snapshot()[0]['State'] == 'running'
+
+
+def test_old_event_format_and_events_without_id():
+    watcher = synced_watcher({'Id': 'abc123', 'Names': ['/vantage6-a-user'], 'State': 'running'})
+
+    watcher.apply_event({'status': 'pause', 'id': 'abc123', 'time': 1002})
+    assert watcher.snapshot()[0]['State'] == 'paused'
+
+    watcher.apply_event({'Action': 'start', 'Actor': {}})
+    assert len(watcher.snapshot()) == 1
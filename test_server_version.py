@@ -0,0 +1,67 @@
+"""
+Tests for the cache of server version lookups
+"""
+import threading
+import time
+
+import pytest
+
+import app
+from app import get_server_version
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replace version requests with a fake, and return the requests made"""
+    fetches = []
+    responses = {'http://up': ('4.5.0', None), 'http://down': (None, 'Connection refused')}
+
+    def fetch_server_version(server_url, api_path):
+        fetches.append((server_url, api_path))
+        time.sleep(0.1)
+        return responses[server_url]
+
+    monkeypatch.setattr(app, 'fetch_server_version', fetch_server_version)
+    monkeypatch.setattr(app, '_server_version_cache', {})
+    monkeypatch.setattr(app, 'SERVER_VERSION_CACHE_TTL', 0.5)
+    monkeypatch.setattr(app, 'SERVER_VERSION_NEGATIVE_TTL', 0.2)
+    return fetches
+
+
+def test_version_is_cached_until_ttl(fetches):
+    assert get_server_version('http://up') == ('4.5.0', None)
+    assert get_server_version('http://up/', 'api/') == ('4.5.0', None)
+    assert len(fetches) == 1
+
+    time.sleep(0.5)
+    assert get_server_version('http://up') == ('4.5.0', None)
+    assert len(fetches) == 2
+
+
+def test_failures_are_cached_shorter(fetches):
+    assert get_server_version('http://down') == (None, 'Connection refused')
+    assert get_server_version('http://down') == (None, 'Connection refused')
+    assert len(fetches) == 1
+
+    time.sleep(0.2)
+    get_server_version('http://down')
+    assert len(fetches) == 2
+
+
+def test_refresh_skips_cache(fetches):
+    get_server_version('http://up')
+    get_server_version('http://up', refresh=True)
+    assert len(fetches) == 2
+
+
+def test_concurrent_lookups_share_one_request(fetches):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_server_version('http://up')))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [('4.5.0', None)] * 5
+    assert fetches == [('http://up', '/api')]
@@ -0,0 +1,44 @@
+"""
+Tests for results of the elected background worker shared with other workers
+"""
+import pytest
+
+import app
+from app import ImagePrefetcher
+
+
+@pytest.fixture
+def shared_state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'SHARED_STATE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_image_states_are_shared_with_other_workers(shared_state_dir):
+    leader, follower = ImagePrefetcher(1, 60), ImagePrefetcher(1, 60)
+    config = {'name': 'node', 'type': 'user'}
+    assert follower.node_image_state(config) == (None, None)
+
+    leader._prefetching = True
+    leader._node_images = {('node', 'user'): 'harbor2.vantage6.ai/infrastructure/node:4.5'}
+    leader._set_state('harbor2.vantage6.ai/infrastructure/node:4.5', 'pulling')
+    leader.publish()
+    assert follower.node_image_state(config) == ('harbor2.vantage6.ai/infrastructure/node:4.5',
+                                                 'pulling')
+
+    leader._set_state('harbor2.vantage6.ai/infrastructure/node:4.5', 'ready')
+    leader.publish()
+    states = follower.states()
+    assert follower.node_image_state(config, states) == (
+        'harbor2.vantage6.ai/infrastructure/node:4.5', 'ready')
+    assert leader.node_image_state(config) == follower.node_image_state(config)
+    assert follower.node_image_state({'name': 'other', 'type': 'user'}, states) == (None, None)
+
+
+def test_image_states_without_shared_state_dir(monkeypatch):
+    monkeypatch.setattr(app, 'SHARED_STATE_DIR', None)
+    prefetcher = ImagePrefetcher(1, 60)
+    prefetcher._node_images = {('node', 'system'): 'node:4.5'}
+    prefetcher._set_state('node:4.5', 'error')
+    prefetcher.publish()
+
+    assert prefetcher.node_image_state({'name': 'node', 'type': 'system'}) == ('node:4.5', 'error')
@@ -0,0 +1,116 @@
+"""
+Tests for container stats parsing, the downsampled stats series and /api/nodes/<name>/stats
+"""
+import pytest
+
+import app
+from app import ContainerStatsSeries, StatsSampler, parse_container_stats
+
+
+def docker_stats(total_usage, system_usage, memory_stats, networks=None, blkio=None):
+    return {
+        'read': '2025-01-01T12:00:00Z',
+        'cpu_stats': {'cpu_usage': {'total_usage': total_usage}, 'system_cpu_usage': system_usage,
+                      'online_cpus': 2},
+        'precpu_stats': {'cpu_usage': {'total_usage': 1000}, 'system_cpu_usage': 10000},
+        'memory_stats': memory_stats,
+        'networks': networks or {},
+        'blkio_stats': {'io_service_bytes_recursive': blkio}
+    }
+
+
+def test_parse_container_stats_cgroup_v1():
+    stats = docker_stats(
+        2000, 20000,
+        {'usage': 500, 'limit': 4096, 'stats': {'rss': 300, 'cache': 100}},
+        networks={'eth0': {'rx_bytes': 10, 'tx_bytes': 20}, 'eth1': {'rx_bytes': 1, 'tx_bytes': 2}},
+        blkio=[{'op': 'Read', 'value': 7}, {'op': 'Write', 'value': 9}, {'op': 'Total', 'value': 16}])
+
+    assert parse_container_stats(stats) == {
+        'cpu_percent': 20.0,
+        'memory_rss': 300,
+        'memory_limit': 4096,
+        'net_rx': 11,
+        'net_tx': 22,
+        'block_read': 7,
+        'block_write': 9
+    }
+
+
+def test_parse_container_stats_cgroup_v2():
+    stats = docker_stats(2000, 20000, {'usage': 500, 'limit': 4096, 'stats': {'anon': 250}},
+                         blkio=[{'op': 'read', 'value': 3}, {'op': 'write', 'value': 4}])
+    sample = parse_container_stats(stats)
+
+    assert sample['memory_rss'] == 250
+    assert (sample['block_read'], sample['block_write']) == (3, 4)
+
+
+def test_parse_container_stats_without_detail():
+    sample = parse_container_stats({'cpu_stats': {}, 'precpu_stats': {},
+                                    'memory_stats': {'usage': 500, 'stats': {'inactive_file': 200}}})
+
+    assert sample['cpu_percent'] == 0.0
+    assert sample['memory_rss'] == 300
+    assert (sample['net_rx'], sample['block_read']) == (0, 0)
+
+
+def sample(cpu_percent, memory_rss, net_rx=0):
+    return {'cpu_percent': cpu_percent, 'memory_rss': memory_rss, 'memory_limit': 4096,
+            'net_rx': net_rx, 'net_tx': 0, 'block_read': 0, 'block_write': 0}
+
+
+def test_series_downsamples_to_one_point_per_interval():
+    series = ContainerStatsSeries('vantage6-node-user', {}, 10, 5)
+    series.add(sample(10, 100, net_rx=0), now=1000)
+    series.add(sample(20, 200, net_rx=500), now=1003)
+    series.add(sample(30, 300, net_rx=1000), now=1005)
+
+    assert series.to_list() == [{'t': 1005, 'cpu_percent': 20.0, 'memory_rss': 300,
+                                 'memory_limit': 4096}]
+
+    series.add(sample(40, 400, net_rx=3000), now=1010)
+    point = series.to_list()[-1]
+    assert point['cpu_percent'] == 40.0
+    assert point['net_rx_rate'] == 400.0
+
+
+def test_series_keeps_latest_points():
+    series = ContainerStatsSeries('vantage6-node-user', {}, 3, 1)
+    for i in range(1, 6):
+        series.add(sample(i, i), now=1000 + i)
+
+    assert [point['memory_rss'] for point in series.to_list()] == [3, 4, 5]
+    assert [point['memory_rss'] for point in series.to_list(2)] == [4, 5]
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    sampler = StatsSampler(10, 1)
+    monkeypatch.setattr(sampler, 'start', lambda: None)
+    monkeypatch.setattr(app, 'stats_sampler', sampler)
+    monkeypatch.setattr(app, 'get_node_config',
+                        lambda name: {'name': name, 'type': 'user'} if name == 'node' else None)
+    series = sampler._series['vantage6-node-user'] = ContainerStatsSeries(
+        'vantage6-node-user', {}, 10, 1)
+    for i in range(1, 4):
+        series.add(sample(i, i), now=1000 + i)
+    return sampler
+
+
+def test_stats_endpoint_limits_points(sampler):
+    client = app.app.test_client()
+
+    assert len(client.get('/api/nodes/node/stats').get_json()['node']) == 2
+    assert len(client.get('/api/nodes/node/stats?points=0').get_json()['node']) == 2
+    points = client.get('/api/nodes/node/stats?points=1').get_json()['node']
+    assert [point['memory_rss'] for point in points] == [3]
+    assert client.get('/api/nodes/other/stats').status_code == 404
+
+
+@pytest.mark.parametrize('points', ['-1', 'abc', '1.5'])
+def test_stats_endpoint_rejects_invalid_points(sampler, points):
+    response = app.app.test_client().get(f'/api/nodes/node/stats?points={points}')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'points must be a non-negative integer'